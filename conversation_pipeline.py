@@ -7,7 +7,7 @@ import os
 from conv.engine import start_conversation, conversation_turn
 
 # --- Pipeline principal (SIN resets ni prints) ---
-from processing_pipeline import CONFIG, main as run_pipeline
+from processing_pipeline import CONFIG, main as run_pipeline, prewarm_extractor
 
 # --- Utils para resetear dominios y logs (solo aquí) ---
 from utils.reset import reset_domain_sqlite, reset_domain_neo4j
@@ -77,6 +77,9 @@ def main() -> None:
     # Reset de BD + logs SOLO al ejecutar este script
     _reset_all_at_start(CONFIG["sqlite_db_path"], CONFIG)
 
+    # Pre-calentar el extractor (kggen) mientras el usuario escribe
+    prewarm_extractor(CONFIG)
+
     # Inicializamos conversación
     greeting, state = start_conversation()
     print(f"Bot: {greeting}")
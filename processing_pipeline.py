@@ -6,6 +6,7 @@ from typing import List, Tuple, Optional, Dict, Any
 
 from triplets2bd.engine import run_triplets_to_bd
 from triplets2bd.utils.types import EngineOptions
+from utils.config import settings
 
 try:
     from text2triplets.texts import ALL_TEXTS
@@ -47,14 +48,23 @@ He pensado en apuntarme a natación, aunque me cuesta organizarme.
     "extractor_mode": "llm",
     "extractor_model": None,
     "drop_invalid": True,
+    # Textos largos: trocear por turnos/frases y extraer en paralelo (solo modo "llm")
+    "extractor_chunked": False,
+    "extractor_max_chunk_tokens": 400,
 
     # Backend de inyección
     "backend": "sql",
     "bd_mode": "deterministic",
     "reset": False,  # ESTE FLAG YA NO SE USA AQUÍ
+    "canonicalize": False,  # fusionar alias de entidades antes de escribir
+    # Incremental: el extractor ve los hechos ya guardados del usuario y solo se escriben los nuevos
+    "incremental": False,
 
     # SQLite
     "sqlite_db_path": "./data/users/demo.sqlite",
+    # Un fichero por usuario (<shards_dir>/<usuario>.sqlite) en lugar de sqlite_db_path
+    "shard_by_user": False,
+    "shards_dir": "./data/shards",
 
     # Neo4j (no se usan aquí, pero se dejan por compatibilidad)
     "neo4j_uri": None,
@@ -93,11 +103,23 @@ def _extract_triplets(
     drop_invalid: bool,
     print_triplets: bool,
     sqlite_db_path: str,
+    chunked: bool = False,
+    max_chunk_tokens: int = 400,
+    known_facts=None,
 ) -> List[Triplet]:
     if extractor == "kggen":
         from text2triplets.kg_base import run_kg, KGConfig, DEFAULT_CONTEXT
+        # kg_base no tiene canal de log SQLite; el cliente KGGen se reutiliza entre llamadas
+        extra_kwargs: Dict[str, Any] = {}
     else:
         from text2triplets.text2triplet import run_kg, KGConfig, DEFAULT_CONTEXT
+        extra_kwargs = {
+            "sqlite_db_path": sqlite_db_path,
+            "reset_log": False,
+            "chunked": chunked,
+            "max_chunk_tokens": max_chunk_tokens,
+            "known_facts": known_facts,
+        }
 
     cfg = KGConfig(model=model) if model else None
 
@@ -107,11 +129,22 @@ def _extract_triplets(
         cfg=cfg,
         drop_invalid=drop_invalid,
         print_triplets=print_triplets,
-        sqlite_db_path=sqlite_db_path,
-        reset_log=False,
+        **extra_kwargs,
     )
 
 
+def prewarm_extractor(cfg: Dict[str, Any] = CONFIG, *, background: bool = True) -> None:
+    """
+    Hook de arranque: con extractor_mode="kggen" importa kg_gen y construye el
+    cliente compartido antes del primer paquetito (en segundo plano por defecto).
+    """
+    if cfg.get("extractor_mode") != "kggen":
+        return
+    from text2triplets.kg_base import prewarm, KGConfig
+    model = cfg.get("extractor_model")
+    prewarm(KGConfig(model=model) if model else None, background=background)
+
+
 def _maybe_conv2text(
     conversation_text: str,
     max_sentences: int,
@@ -161,6 +194,17 @@ def _get_conversation_text(cfg: Dict[str, Any]) -> str:
     return cfg["TEXT_RAW"]
 
 
+def _conversation_user_id(conversation_text: str) -> Optional[str]:
+    """persona.user_id del usuario de la conversación (user_<nombre>), o None."""
+    from conv2text.io.parsers import detect_user_tag
+    from triplets2bd.triplets2sql_rule_based.helpers import slugify
+
+    tag = detect_user_tag(conversation_text)
+    if not tag:
+        return None
+    return f"persona_{slugify(tag[len('user_'):])}"
+
+
 def _flush_pipeline_log(lines: List[str]) -> None:
     text = "\n".join(lines)
     with open(PIPELINE_LOG_PATH, "w", encoding="utf-8") as f:
@@ -231,7 +275,27 @@ def main() -> None:
     log(text_for_extractor)
     log("========================================")
 
+    # SQLite del run: fija o el shard del usuario de la conversación
+    user_id = _conversation_user_id(conversation)
+    sqlite_db_path = cfg["sqlite_db_path"]
+    shard_user: Optional[str] = None
+    shards_dir: Optional[str] = None
+    if cfg.get("shard_by_user", False):
+        from triplets2bd.utils.shards import shard_path
+        shard_user = user_id or settings.USER_BASE_ID
+        shards_dir = cfg.get("shards_dir", "./data/shards")
+        sqlite_db_path = shard_path(shard_user, shards_dir)
+        log(f"\n[shards] SQLite del usuario: {sqlite_db_path}")
+
     # --- 4) text2triplet: extracción de tripletas ---
+    # Hechos de la SQLite: contexto del extractor con cualquier backend; el motor
+    # solo descarta los ya conocidos al escribir en esa misma SQLite (backend "sql")
+    known_facts = None
+    if cfg.get("incremental", False):
+        from triplets2bd.utils.known_facts import known_facts_snapshot
+        known_facts = known_facts_snapshot(sqlite_db_path, user_id)
+        log(f"\n[incremental] Hechos ya guardados: {len(known_facts)}")
+
     t0 = time.perf_counter()
     triplets_in = _extract_triplets(
         text=text_for_extractor,
@@ -239,7 +303,10 @@ def main() -> None:
         model=cfg["extractor_model"],
         drop_invalid=cfg["drop_invalid"],
         print_triplets=False,  # no queremos prints en consola
-        sqlite_db_path=cfg["sqlite_db_path"],
+        sqlite_db_path=sqlite_db_path,
+        chunked=cfg.get("extractor_chunked", False),
+        max_chunk_tokens=cfg.get("extractor_max_chunk_tokens", 400),
+        known_facts=known_facts,
     )
     extract_time_s = time.perf_counter() - t0
     log(f"\nExtracción completada en {extract_time_s:.2f}s")
@@ -249,13 +316,17 @@ def main() -> None:
         backend=cfg["backend"],
         mode=cfg["bd_mode"],
         reset=False,           # el reset ya no se hace aquí
-        sqlite_db_path=cfg["sqlite_db_path"],
+        sqlite_db_path=sqlite_db_path,
         reset_log=False,       # el log se gestiona fuera (en pipeline_conv)
+        canonicalize=cfg.get("canonicalize", False),
+        facts_user_id=user_id,
+        shard_user=shard_user,
+        shards_dir=shards_dir,   # conexiones del shard por la caché de utils.shards
     )
 
     log("\nInyectando en la BD…")
     t0 = time.perf_counter()
-    res = run_triplets_to_bd(triplets_in, opts)
+    res = run_triplets_to_bd(triplets_in, opts, known_facts=known_facts)
     inject_time_s = time.perf_counter() - t0
 
     log("\n=== RESULTADO BD ===")
@@ -1,16 +1,19 @@
 # kg_base.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, List, Tuple, Iterable
+from typing import Optional, List, Tuple, Iterable, Dict, TYPE_CHECKING
+import threading
 import time
 import unicodedata
 import json
 import re
 from datetime import datetime
 
-from kg_gen import KGGen
 from utils.config import settings
 
+if TYPE_CHECKING:  # kg_gen es pesado: se importa solo al construir el primer cliente
+    from kg_gen import KGGen
+
 # Usa tu constants.py como fuente de verdad
 from utils.constants import (
     ALLOWED_REL,          # {"padece", "toma", "realiza"}
@@ -85,12 +88,50 @@ class KGConfig:
     temperature: float = 0.0
     api_key: Optional[str] = settings.OPENAI_API_KEY
 
-def _make_kg(cfg: KGConfig) -> KGGen:
+def _make_kg(cfg: KGConfig) -> "KGGen":
+    from kg_gen import KGGen  # import perezoso (tarda segundos)
     print(f"[kg_base] Inicializando KGGen con model='{cfg.model}', temp={cfg.temperature}")
     kg = KGGen(model=cfg.model, temperature=cfg.temperature, api_key=cfg.api_key)
     print("[kg_base] KGGen listo.")
     return kg
 
+# --------- Caché de proceso de clientes KGGen ----------
+_KG_CACHE: Dict[Tuple[str, float, Optional[str]], "KGGen"] = {}
+_KG_LOCK = threading.Lock()
+
+def get_kg(cfg: KGConfig | None = None) -> "KGGen":
+    """Devuelve el KGGen compartido para (modelo, temperatura); lo construye la primera vez."""
+    cfg = cfg or KGConfig()
+    key = (cfg.model, cfg.temperature, cfg.api_key)
+    kg = _KG_CACHE.get(key)
+    if kg is not None:
+        return kg
+    with _KG_LOCK:
+        kg = _KG_CACHE.get(key)
+        if kg is None:
+            kg = _make_kg(cfg)
+            _KG_CACHE[key] = kg
+    return kg
+
+def prewarm(cfg: KGConfig | None = None, *, background: bool = False) -> Optional[threading.Thread]:
+    """
+    Importa kg_gen y construye el cliente por adelantado (p.ej. al arrancar el conversador),
+    para que el primer paquetito no pague ese coste. Con background=True no bloquea.
+    """
+    if not background:
+        get_kg(cfg)
+        return None
+
+    def _warm():
+        try:
+            get_kg(cfg)
+        except Exception as e:
+            print(f"[kg_base] Aviso: pre-calentamiento fallido ({e})")
+
+    t = threading.Thread(target=_warm, name="kg_base-prewarm", daemon=True)
+    t.start()
+    return t
+
 # --------- Utilidades de normalización ----------
 def _strip_accents(s: str) -> str:
     return "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
@@ -156,7 +197,7 @@ def _extract_triplets_from_llm_response(response_text: str) -> List[Tuple[str, s
     
     return triplets
 
-def _call_llm_directly(kg: KGGen, input_text: str, context: str) -> List[Tuple[str, str, str]]:
+def _call_llm_directly(kg: "KGGen", input_text: str, context: str) -> List[Tuple[str, str, str]]:
     """Llama al LLM directamente y parsea la respuesta para extraer tripletas"""
     try:
         # Usar kg_gen para obtener una respuesta de texto plano
@@ -228,7 +269,7 @@ def run_kg(
 ) -> List[Tuple[str, str, str]]:
     cfg = cfg or KGConfig()
     print("[kg_base] Preparando generación…")
-    kg = _make_kg(cfg)
+    kg = get_kg(cfg)
 
     print("[kg_base] Llamando al LLM directamente…")
     t0 = time.time()
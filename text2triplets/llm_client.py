@@ -1,7 +1,7 @@
 # llm_client.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import requests
 import os
 
@@ -55,6 +55,13 @@ class LLMClient:
     
 
     def chat(self, messages: List[Dict[str, str]], temperature: Optional[float] = None) -> str:
+        content, _ = self.chat_with_usage(messages, temperature)
+        return content
+
+    def chat_with_usage(
+        self, messages: List[Dict[str, str]], temperature: Optional[float] = None
+    ) -> Tuple[str, Dict[str, int]]:
+        """Como chat(), pero devuelve también el bloque 'usage' (tokens) si el servidor lo envía."""
         model_name = _normalize_model_name(self.cfg.model)
         payload = {
             "model": model_name,
@@ -78,7 +85,11 @@ class LLMClient:
             )
             if not isinstance(content, str):
                 content = str(content)
-            return content
+            usage = {
+                k: int(v) for k, v in (data.get("usage") or {}).items()
+                if k in ("prompt_tokens", "completion_tokens", "total_tokens") and v is not None
+            }
+            return content, usage
         except Exception as e:
             raise RuntimeError(f"[llm_client] Error en chat: {e}")
 
@@ -89,3 +100,10 @@ class LLMClient:
             {"role": "user", "content": input_data},
         ]
         return self.chat(messages)
+
+    def generate_with_usage(self, *, input_data: str, context: str) -> Tuple[str, Dict[str, int]]:
+        messages = [
+            {"role": "system", "content": context},
+            {"role": "user", "content": input_data},
+        ]
+        return self.chat_with_usage(messages)
@@ -46,6 +46,12 @@ def main():
     parser.add_argument("--no-drop", action="store_true",
                         help="No descartar tripletas inválidas (se mostrarán igual).")
 
+    # Flags de extracción por trozos (solo modo llm)
+    parser.add_argument("--chunked", action="store_true",
+                        help="Trocea el texto por turnos/frases y extrae los trozos en paralelo.")
+    parser.add_argument("--max-chunk-tokens", type=int, default=400,
+                        help="Tamaño máximo aproximado (tokens) de cada trozo (por defecto: 400).")
+
     # Flags de logging/SQLite
     parser.add_argument("--sqlite-db", default="./data/users/demo.sqlite",
                         help="Ruta a la base de datos SQLite para log/contenido.")
@@ -88,6 +94,8 @@ def main():
         common_kwargs.update(
             sqlite_db_path=args.sqlite_db,
             reset_log=not args.no_reset_log,
+            chunked=args.chunked,
+            max_chunk_tokens=args.max_chunk_tokens,
         )
 
     # Añadir opciones de report si se soporta
@@ -0,0 +1,65 @@
+# text2triplets/tests/test_runner.py
+from __future__ import annotations
+import threading
+import time
+
+from text2triplets import tests_text2triplet_runner as runner
+from text2triplets import text2triplet as t2t
+
+
+class SlowKG:
+    """LLM de pega con usage; tarda un poco para que las repeticiones coincidan en el tiempo."""
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_with_usage(self, *, input_data, context):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        return '("Luis", "padece", "insomnio")', {"total_tokens": 10}
+
+
+CASE = {"name": "A1", "text": "Luis padece insomnio.", "expected": [("Luis", "padece", "insomnio")]}
+
+
+def test_repeticiones_concurrentes_comparten_una_llamada(tmp_path, monkeypatch):
+    kg = SlowKG()
+    monkeypatch.setattr(runner, "_make_kg", lambda cfg: kg)
+    bench = runner.run_benchmark(
+        ["fake"], cases=[CASE], workers=4, repeats=4,
+        cache_path=str(tmp_path / "cache.json"), cache_mode="record", print_details=False,
+    )
+    assert kg.calls == 1
+    model = bench["models"]["fake"]
+    per_case = model["per_case"]["A1"]
+    assert per_case["runs"] == 4 and per_case["cached"] == 3 and per_case["errors"] == 0
+    assert set(per_case["latency_s"]) >= {"p50", "p95"}
+    assert per_case["mean_f1"] == 1.0
+    assert model["summary"]["tokens"]["total_tokens"] == 40
+
+
+def test_replay_sin_grabar_es_error_del_caso(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner, "_make_kg", lambda cfg: SlowKG())
+    bench = runner.run_benchmark(
+        ["fake"], cases=[CASE], workers=1,
+        cache_path=str(tmp_path / "vacia.json"), cache_mode="replay", print_details=False,
+    )
+    res = bench["models"]["fake"]["cases"][0]
+    assert res["error"] and "KeyError" in res["error"]
+    assert res["got"] == [] and bench["models"]["fake"]["summary"]["errors"] == 1
+
+
+def test_cada_caso_pasa_por_run_kg(tmp_path, monkeypatch):
+    calls = []
+    real = t2t.run_kg
+
+    def spy(text, **kw):
+        calls.append(text)
+        return real(text, **kw)
+
+    monkeypatch.setattr(runner, "run_kg", spy)
+    monkeypatch.setattr(runner, "_make_kg", lambda cfg: SlowKG())
+    runner.run_benchmark(["fake"], cases=[CASE], workers=1, print_details=False)
+    assert calls == [CASE["text"]]
@@ -0,0 +1,77 @@
+# text2triplets/tests/test_text2triplet.py
+from __future__ import annotations
+import threading
+
+from text2triplets import text2triplet as t2t
+
+
+class FakeKG:
+    """LLMClient de pega: responde por contenido del trozo y registra las llamadas."""
+
+    def __init__(self, answers, fail_on=None):
+        self.answers = answers
+        self.fail_on = fail_on
+        self.inputs = []
+        self._lock = threading.Lock()
+
+    def generate(self, input_data, context):
+        with self._lock:
+            self.inputs.append(input_data)
+        if self.fail_on and self.fail_on in input_data:
+            raise RuntimeError("timeout")
+        return "\n".join(line for key, line in self.answers if key in input_data)
+
+
+def test_trozos_por_frases_sin_pasar_del_limite():
+    text = "Ana toma ibuprofeno. " * 10 + "Luis realiza yoga."
+    chunks = t2t._split_into_chunks(text, max_tokens=12)
+    assert len(chunks) > 1
+    assert all(t2t._estimate_tokens(c.replace("\n", " ")) <= 12 for c in chunks)
+    assert " ".join(c.replace("\n", " ") for c in chunks) == text.strip()
+
+
+def test_trozos_por_turnos_agrupan_pregunta_y_respuesta():
+    conv = "LLM: ¿Qué tomas?\nuser_ana: Ibuprofeno.\nLLM: ¿Haces deporte?\nuser_ana: Yoga."
+    assert t2t._split_units(conv) == [
+        "LLM: ¿Qué tomas?\nuser_ana: Ibuprofeno.",
+        "LLM: ¿Haces deporte?\nuser_ana: Yoga.",
+    ]
+
+
+def test_nombres_sin_palabras_de_inicio_de_frase():
+    text = (
+        "Ana García toma ibuprofeno. Además toma paracetamol. Hoy realiza yoga. "
+        "Después Luis padece mareos.\nuser_marta: hola"
+    )
+    assert t2t._person_names(text) == ["Marta", "Ana García", "Luis"]
+
+
+def test_cabecera_de_personas_y_ultimo_sujeto():
+    inputs = t2t._chunk_inputs(["Ana toma ibuprofeno.", "Además toma paracetamol."])
+    assert inputs[0].startswith("[Personas mencionadas en el texto completo: Ana]\n")
+    assert "[Si una frase no nombra al sujeto, se refiere a: Ana]" in inputs[1]
+    assert t2t._chunk_inputs(["sin nombres."]) == ["sin nombres."]
+
+
+def test_extraccion_por_trozos_en_paralelo_con_un_fallo():
+    kg = FakeKG(
+        [("ibuprofeno", '("Ana", "toma", "ibuprofeno")'), ("yoga", '("Ana", "realiza", "yoga")')],
+        fail_on="mareos",
+    )
+    chunks = ["Ana toma ibuprofeno.", "Ana padece mareos.", "Ana realiza yoga."]
+    triplets, errors = t2t._call_llm_chunked(kg, chunks, "ctx", max_workers=3)
+    assert errors == 1
+    assert triplets == [("ana", "toma", "ibuprofeno"), ("ana", "realiza", "yoga")]
+    assert len(kg.inputs) == 3
+
+
+def test_run_kg_por_trozos_sin_duplicados(tmp_path, monkeypatch):
+    kg = FakeKG([("Ana", '("Ana", "toma", "ibuprofeno")\n("Ana", "realiza", "yoga")')])
+    monkeypatch.setattr(t2t, "_make_kg", lambda cfg: kg)
+    text = "Ana toma ibuprofeno. Ana realiza yoga. " * 4
+    out = t2t.run_kg(
+        text, print_triplets=False, sqlite_db_path=str(tmp_path / "log.sqlite"),
+        chunked=True, max_chunk_tokens=10,
+    )
+    assert len(kg.inputs) > 1
+    assert out == [("ana", "toma", "ibuprofeno"), ("ana", "realiza", "yoga")]
@@ -1,17 +1,33 @@
 # tests_text2triplet_runner.py
-# Ejecuta baterías de pruebas para text2triplet.run_kg sin pytest.
+# Ejecuta baterías de pruebas / benchmark del extractor de text2triplet sin pytest.
+#   - casos en paralelo (--workers)
+#   - respuestas grabadas y reutilizables (--cache, --cache-mode)
+#   - cada caso pasa por run_kg (el mismo camino que producción)
+#   - latencias p50/p90/p95, tokens y F1 por modelo; p50/p95 por caso entre
+#     repeticiones (--repeats); resultados en JSON (--out)
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
 import time
-from typing import List, Tuple, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple, Dict, Any, Optional
 
 # Importaciones tolerantes (package vs script)
 try:
     # Si está en un paquete (p.ej. python -m pkg.tests_text2triplet_runner)
-    from .text2triplet import run_kg, KGConfig, DEFAULT_CONTEXT, _normalize_triplets
+    from .text2triplet import (
+        KGConfig, DEFAULT_CONTEXT, _make_kg, _normalize_triplets, run_kg,
+    )
 except Exception:
     # Import absoluto (p.ej. python tests_text2triplet_runner.py)
-    from text2triplet import run_kg, KGConfig, DEFAULT_CONTEXT, _normalize_triplets  # type: ignore
+    from text2triplet import (  # type: ignore
+        KGConfig, DEFAULT_CONTEXT, _make_kg, _normalize_triplets, run_kg,
+    )
 
 
 Triplet = Tuple[str, str, str]
@@ -63,80 +79,17 @@ def _lint_expected_subjects(expected: List[Triplet], case_name: str) -> None:
                   f"no parece nombre propio. Revisa el texto esperado.")
 
 
-def run_case(
-    name: str,
-    text: str,
-    expected_human: List[Triplet],
-    *,
-    context: str = DEFAULT_CONTEXT,
-    cfg: KGConfig | None = None,
-    drop_invalid: bool = True,
-    print_details: bool = True,
-) -> Dict[str, Any]:
-    """Ejecuta un caso y devuelve dict con métricas y detalles."""
-    _lint_expected_subjects(expected_human, name)
-
-    # Normalizamos expected con la misma lógica interna
-    expected_norm = _normalize_expected(expected_human)
-    expected_set = _as_set(expected_norm)
-
-    t0 = time.time()
-    got = run_kg(
-        input_text=text,
-        context=context,
-        cfg=cfg,
-        drop_invalid=drop_invalid,
-        print_triplets=False,  # silenciamos el volcado interno
-    )
-    dt = time.time() - t0
-    got_set = _as_set(got)
-
-    metrics = _metrics(expected_set, got_set)
-    failed = list(expected_set - got_set)
-    extra = list(got_set - expected_set)
-
-    if print_details:
-        print(f"\n=== CASO: {name} ===")
-        print(f"Texto: {text}")
-        print(f"Tiempo: {dt:.2f}s")
-        print("\nEsperado (normalizado):")
-        print(_pretty(sorted(expected_set)))
-        print("\nObtenido:")
-        print(_pretty(sorted(got_set)))
-        if failed:
-            print("\nFaltan (FN):")
-            print(_pretty(sorted(failed)))
-        if extra:
-            print("\nSobrantes (FP):")
-            print(_pretty(sorted(extra)))
-        print("\nMétricas: "
-              f"precision={metrics['precision']:.2f}, recall={metrics['recall']:.2f}, f1={metrics['f1']:.2f}")
-
-    return {
-        "name": name,
-        "text": text,
-        "time": dt,
-        "expected": sorted(expected_set),
-        "got": sorted(got_set),
-        "missing": sorted(failed),
-        "extra": sorted(extra),
-        "metrics": metrics,
-    }
-
-
-def run_all_tests(model_override: str | None = None) -> Dict[str, Any]:
-    """Ejecuta la batería de pruebas. Devuelve resumen con nota (0–10)."""
-    cfg = KGConfig(model=model_override) if model_override else None
-
-    cases: List[Dict[str, Any]] = []
-
+# ---------------------------------------------------------------------
+# Casos de prueba (nombre, texto, esperado)
+# ---------------------------------------------------------------------
+CASES: List[Dict[str, Any]] = [
     # --- C (narrativo rico, sujeto con nombre en todas las oraciones) ---
-    cases.append(run_case(
-        "C1 - Juan: rutina + síntoma con inicio/gravedad + medicación contextual",
-        ("Resumen: Juan realiza caminar cada mañana antes de trabajar y Juan realiza yoga dos veces por semana. "
-         "Desde el 01/03/2024 Juan padece dolor de rodilla de gravedad moderada. "
-         "Cuando aparece el dolor, Juan toma ibuprofeno cuando duele."),
-        expected_human=[
+    {
+        "name": "C1 - Juan: rutina + síntoma con inicio/gravedad + medicación contextual",
+        "text": ("Resumen: Juan realiza caminar cada mañana antes de trabajar y Juan realiza yoga dos veces por semana. "
+                 "Desde el 01/03/2024 Juan padece dolor de rodilla de gravedad moderada. "
+                 "Cuando aparece el dolor, Juan toma ibuprofeno cuando duele."),
+        "expected": [
             ("Juan", "realiza", "caminar"),
             ("caminar", "frecuencia", "diaria"),
             ("Juan", "realiza", "yoga"),
@@ -147,113 +100,497 @@ def run_all_tests(model_override: str | None = None) -> Dict[str, Any]:
             ("Juan", "toma", "ibuprofeno"),
             ("ibuprofeno", "se toma", "cuando duele"),
         ],
-        cfg=cfg
-    ))
-
+    },
     # --- B (mixtos, frecuentes) ---
-    cases.append(run_case(
-        "B1 - María: actividad + síntoma con gravedad",
-        "María realiza caminar diariamente y María padece dolor lumbar moderado.",
-        expected_human=[
+    {
+        "name": "B1 - María: actividad + síntoma con gravedad",
+        "text": "María realiza caminar diariamente y María padece dolor lumbar moderado.",
+        "expected": [
             ("María", "realiza", "caminar"),
             ("caminar", "frecuencia", "diaria"),
             ("María", "padece", "dolor lumbar"),
             ("dolor lumbar", "gravedad", "moderada"),
         ],
-        cfg=cfg
-    ))
-
-    cases.append(run_case(
-        "B2 - Carlos: medicación con indicación + actividad con frecuencia",
-        "Carlos toma ibuprofeno cuando duele y Carlos realiza yoga varias veces por semana.",
-        expected_human=[
+    },
+    {
+        "name": "B2 - Carlos: medicación con indicación + actividad con frecuencia",
+        "text": "Carlos toma ibuprofeno cuando duele y Carlos realiza yoga varias veces por semana.",
+        "expected": [
             ("Carlos", "toma", "ibuprofeno"),
             ("ibuprofeno", "se toma", "cuando duele"),
             ("Carlos", "realiza", "yoga"),
             ("yoga", "frecuencia", "varias_por_semana"),
             # La categoría de actividad puede no estar en el texto; la omitimos para no sesgar recall.
         ],
-        cfg=cfg
-    ))
-
-    cases.append(run_case(
-        "B3 - José: combinación completa con medicación pautada",
-        "José padece insomnio y José toma paracetamol cada 8 horas. José realiza correr semanalmente.",
-        expected_human=[
+    },
+    {
+        "name": "B3 - José: combinación completa con medicación pautada",
+        "text": "José padece insomnio y José toma paracetamol cada 8 horas. José realiza correr semanalmente.",
+        "expected": [
             ("José", "padece", "insomnio"),
             ("José", "toma", "paracetamol"),
             ("paracetamol", "se toma", "cada 8 horas"),
             ("José", "realiza", "correr"),
             ("correr", "frecuencia", "semanal"),
         ],
-        cfg=cfg
-    ))
-
+    },
     # --- A (básicos) ---
-    cases.append(run_case(
-        "A1 - Luis: síntoma simple",
-        "Luis padece insomnio.",
-        expected_human=[
+    {
+        "name": "A1 - Luis: síntoma simple",
+        "text": "Luis padece insomnio.",
+        "expected": [
             ("Luis", "padece", "insomnio"),
         ],
-        cfg=cfg
-    ))
-
-    cases.append(run_case(
-        "A2 - Marcos: actividad simple",
-        "Marcos realiza yoga.",
-        expected_human=[
+    },
+    {
+        "name": "A2 - Marcos: actividad simple",
+        "text": "Marcos realiza yoga.",
+        "expected": [
             ("Marcos", "realiza", "yoga"),
         ],
-        cfg=cfg
-    ))
-
+    },
     # --- D (edge cases con nombre explícito para no confundir al extractor) ---
-    cases.append(run_case(
-        "D1 - Juan: negación explícita de medicación",
-        "Juan no toma ninguna medicación actualmente.",
-        expected_human=[
+    {
+        "name": "D1 - Juan: negación explícita de medicación",
+        "text": "Juan no toma ninguna medicación actualmente.",
+        "expected": [
             # Debe ser vacío
         ],
-        cfg=cfg
-    ))
-
-    cases.append(run_case(
-        "D2 - Juan: recomendación/hipótesis (no hecho real)",
-        "El médico le recomendó a Juan tomar ibuprofeno si aparece dolor. Pero el no lo va a tomar",
-        expected_human=[
+    },
+    {
+        "name": "D2 - Juan: recomendación/hipótesis (no hecho real)",
+        "text": "El médico le recomendó a Juan tomar ibuprofeno si aparece dolor. Pero el no lo va a tomar",
+        "expected": [
             # No debe generar 'Juan toma ibuprofeno'
         ],
-        cfg=cfg
-    ))
-
-    cases.append(run_case(
-        "D3 - María: fecha inválida en propiedad (se conserva el hecho principal)",
-        "María padece cefalea desde el 2024/13/40.",
-        expected_human=[
+    },
+    {
+        "name": "D3 - María: fecha inválida en propiedad (se conserva el hecho principal)",
+        "text": "María padece cefalea desde el 2024/13/40.",
+        "expected": [
             # La fecha es inválida y debe descartarse. Se mantiene solo el hecho del síntoma.
             ("María", "padece", "cefalea"),
         ],
-        cfg=cfg
-    ))
+    },
+]
+
+
+# ---------------------------------------------------------------------
+# Respuestas grabadas (record/replay)
+# ---------------------------------------------------------------------
+class ResponseCache:
+    """
+    Caché JSON de respuestas del LLM, clave = hash(modelo, contexto, texto).
+      - mode="off":    siempre llama al LLM
+      - mode="record": reutiliza lo grabado y graba lo que falte
+      - mode="replay": solo lo grabado (un caso sin grabar es un error)
+    Las peticiones concurrentes con la misma clave (repeticiones de un caso) esperan
+    a la primera en vez de fallar la caché todas a la vez.
+    """
+
+    def __init__(self, path: Optional[str], mode: str = "off"):
+        self.path = path
+        self.mode = mode if path else "off"
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        if self.mode != "off" and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+
+    @staticmethod
+    def key(model: str, context: str, text: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, context, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.mode == "off":
+            return None
+        with self._lock:
+            return self._data.get(key)
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        if self.mode != "record":
+            return
+        with self._lock:
+            self._data[key] = entry
+
+    def fetch(self, key: str, call: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Devuelve (entrada, grabada); sin grabar invoca `call` una sola vez por clave."""
+        if self.mode == "off":
+            return call(), False
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            hit = self.get(key)
+            if hit is not None:
+                return hit, True
+            if self.mode == "replay":
+                raise KeyError(f"respuesta no grabada: {key[:12]}")
+            entry = call()
+            self.put(key, entry)
+            return entry, False
+
+    def save(self) -> None:
+        if self.mode != "record":
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+
+
+# ---------------------------------------------------------------------
+# Ejecución de un caso
+# ---------------------------------------------------------------------
+class _RecordingKG:
+    """
+    Cliente que recibe run_kg en el benchmark: sirve cada petición desde la caché
+    o desde el LLM real y acumula uso, latencia grabada y errores del run.
+    """
+
+    def __init__(self, kg, model: str, cache: ResponseCache):
+        self.kg = kg
+        self.model = model
+        self.cache = cache
+        self.usage: Dict[str, int] = {}
+        self.recorded_s = 0.0
+        self.calls = 0
+        self.hits = 0
+        self.errors: List[str] = []
+        self._lock = threading.Lock()   # run_kg por trozos llama en paralelo
+
+    def _call(self, input_data: str, context: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        response, usage = self.kg.generate_with_usage(input_data=input_data, context=context)
+        latency = time.perf_counter() - t0
+        return {"model": self.model, "response": response, "usage": usage, "latency_s": latency}
+
+    def generate(self, *, input_data: str, context: str) -> str:
+        key = ResponseCache.key(self.model, context, input_data)
+        try:
+            entry, hit = self.cache.fetch(key, lambda: self._call(input_data, context))
+        except Exception as e:
+            with self._lock:
+                self.errors.append(f"{type(e).__name__}: {e}")
+            raise   # run_kg lo registra y sigue sin tripletas
+        with self._lock:
+            self.calls += 1
+            if hit:
+                self.hits += 1
+                self.recorded_s += float(entry.get("latency_s", 0.0))
+            for k, v in entry.get("usage", {}).items():
+                self.usage[k] = self.usage.get(k, 0) + v
+        return entry["response"]
+
+
+def _run_case_once(
+    kg,
+    model: str,
+    name: str,
+    text: str,
+    expected_human: List[Triplet],
+    *,
+    context: str,
+    drop_invalid: bool,
+    cache: ResponseCache,
+    log_db: str,
+) -> Dict[str, Any]:
+    # Normalizamos expected con la misma lógica interna
+    expected_set = _as_set(_normalize_expected(expected_human))
+
+    client = _RecordingKG(kg, model, cache)
+    t0 = time.perf_counter()
+    try:
+        valid = run_kg(
+            text, context=context, print_triplets=False, drop_invalid=drop_invalid,
+            sqlite_db_path=log_db, reset_log=False, kg=client,
+        )
+    except Exception as e:
+        valid = []
+        client.errors.append(f"{type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - t0
+    # Con respuestas grabadas se usa la latencia medida al grabar (comparable entre modelos)
+    cached = client.calls > 0 and client.hits == client.calls
+    latency = client.recorded_s if cached else elapsed
+    got_set = _as_set(valid)
 
-    # --- Resumen ---
-    f1s = [c["metrics"]["f1"] for c in cases]
+    metrics = _metrics(expected_set, got_set)
+    return {
+        "name": name,
+        "text": text,
+        "model": model,
+        "time": latency,
+        "cached": cached,
+        "error": "; ".join(client.errors) or None,
+        "usage": client.usage,
+        "expected": sorted(expected_set),
+        "got": sorted(got_set),
+        "missing": sorted(expected_set - got_set),
+        "extra": sorted(got_set - expected_set),
+        "metrics": metrics,
+    }
+
+
+def _print_case(res: Dict[str, Any]) -> None:
+    metrics = res["metrics"]
+    print(f"\n=== CASO: {res['name']} ({res['model']}) ===")
+    print(f"Texto: {res['text']}")
+    print(f"Tiempo: {res['time']:.2f}s{' (cacheado)' if res['cached'] else ''}")
+    if res["error"]:
+        print(f"Error: {res['error']}")
+    print("\nEsperado (normalizado):")
+    print(_pretty(res["expected"]))
+    print("\nObtenido:")
+    print(_pretty(res["got"]))
+    if res["missing"]:
+        print("\nFaltan (FN):")
+        print(_pretty(res["missing"]))
+    if res["extra"]:
+        print("\nSobrantes (FP):")
+        print(_pretty(res["extra"]))
+    print("\nMétricas: "
+          f"precision={metrics['precision']:.2f}, recall={metrics['recall']:.2f}, f1={metrics['f1']:.2f}")
+
+
+def run_case(
+    name: str,
+    text: str,
+    expected_human: List[Triplet],
+    *,
+    context: str = DEFAULT_CONTEXT,
+    cfg: KGConfig | None = None,
+    drop_invalid: bool = True,
+    print_details: bool = True,
+    cache: Optional[ResponseCache] = None,
+) -> Dict[str, Any]:
+    """Ejecuta un caso y devuelve dict con métricas y detalles."""
+    _lint_expected_subjects(expected_human, name)
+    cfg = cfg or KGConfig()
+    with tempfile.TemporaryDirectory() as tmp:
+        res = _run_case_once(
+            _make_kg(cfg), cfg.model, name, text, expected_human,
+            context=context, drop_invalid=drop_invalid, cache=cache or ResponseCache(None),
+            log_db=os.path.join(tmp, "log.sqlite"),
+        )
+    if print_details:
+        _print_case(res)
+    return res
+
+
+# ---------------------------------------------------------------------
+# Agregados
+# ---------------------------------------------------------------------
+def _percentile(values: List[float], p: float) -> float:
+    """Percentil con interpolación lineal (p en 0–100)."""
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = (len(xs) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def _latency_stats(results: List[Dict[str, Any]]) -> Dict[str, float]:
+    latencies = [r["time"] for r in results if not r["error"]]
+    return {
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50": _percentile(latencies, 50),
+        "p90": _percentile(latencies, 90),
+        "p95": _percentile(latencies, 95),
+        "max": max(latencies) if latencies else 0.0,
+    }
+
+
+def _summarize_cases(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Agregado por caso entre repeticiones (latencias y F1 medio)."""
+    by_case: Dict[str, List[Dict[str, Any]]] = {}
+    for r in results:
+        by_case.setdefault(r["name"], []).append(r)
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, runs in by_case.items():
+        f1s = [r["metrics"]["f1"] for r in runs]
+        out[name] = {
+            "runs": len(runs),
+            "errors": sum(1 for r in runs if r["error"]),
+            "cached": sum(1 for r in runs if r["cached"]),
+            "latency_s": _latency_stats(runs),
+            "mean_f1": sum(f1s) / len(f1s),
+        }
+    return out
+
+
+def _summarize_model(model: str, results: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    f1s = [r["metrics"]["f1"] for r in results]
     mean_f1 = sum(f1s) / len(f1s) if f1s else 0.0
-    nota = round(mean_f1 * 10, 2)
+    tokens = {
+        k: sum(r["usage"].get(k, 0) for r in results)
+        for k in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    return {
+        "model": model,
+        "cases": len(results),
+        "errors": sum(1 for r in results if r["error"]),
+        "cached": sum(1 for r in results if r["cached"]),
+        "wall_s": wall_s,
+        "latency_s": _latency_stats(results),
+        "tokens": tokens,
+        "mean_f1": mean_f1,
+        "nota": round(mean_f1 * 10, 2),
+    }
+
+
+def pick_fastest(summaries: List[Dict[str, Any]], f1_floor: float) -> Optional[str]:
+    """Modelo con menor p50 entre los que alcanzan el F1 mínimo (None si ninguno)."""
+    ok = [s for s in summaries if s["mean_f1"] >= f1_floor and s["errors"] == 0]
+    if not ok:
+        return None
+    return min(ok, key=lambda s: (s["latency_s"]["p50"], -s["mean_f1"]))["model"]
+
+
+# ---------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------
+def run_benchmark(
+    models: List[Optional[str]],
+    *,
+    cases: Optional[List[Dict[str, Any]]] = None,
+    context: str = DEFAULT_CONTEXT,
+    workers: int = 4,
+    repeats: int = 1,
+    cache_path: Optional[str] = None,
+    cache_mode: str = "off",
+    results_path: Optional[str] = None,
+    f1_floor: Optional[float] = None,
+    print_details: bool = True,
+) -> Dict[str, Any]:
+    """
+    Ejecuta todos los casos para cada modelo (en paralelo dentro de cada modelo).
+    `None` en models = modelo por defecto de KGConfig (.env).
+    """
+    cases = cases if cases is not None else CASES
+    for c in cases:
+        _lint_expected_subjects(c["expected"], c["name"])
+    cache = ResponseCache(cache_path, cache_mode)
+    log_dir = tempfile.TemporaryDirectory()   # log de fallos de run_kg (se descarta)
+    log_db = os.path.join(log_dir.name, "log.sqlite")
+
+    per_model: Dict[str, Dict[str, Any]] = {}
+    for model in models:
+        cfg = KGConfig(model=model) if model else KGConfig()
+        kg = _make_kg(cfg)
+        jobs = [c for c in cases for _ in range(max(1, repeats))]
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [
+                pool.submit(
+                    _run_case_once, kg, cfg.model, c["name"], c["text"], c["expected"],
+                    context=context, drop_invalid=True, cache=cache, log_db=log_db,
+                )
+                for c in jobs
+            ]
+            results = [f.result() for f in futures]
+        wall_s = time.perf_counter() - t0
+
+        if print_details:
+            for r in results:
+                _print_case(r)
+        per_model[cfg.model] = {
+            "summary": _summarize_model(cfg.model, results, wall_s),
+            "per_case": _summarize_cases(results),
+            "cases": results,
+        }
+
+    cache.save()
+    log_dir.cleanup()
+
+    summaries = [m["summary"] for m in per_model.values()]
+    out: Dict[str, Any] = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "workers": workers,
+        "repeats": repeats,
+        "cache_mode": cache.mode,
+        "models": per_model,
+    }
+    if f1_floor is not None:
+        out["f1_floor"] = f1_floor
+        out["fastest_meeting_floor"] = pick_fastest(summaries, f1_floor)
+
+    print("\n=== RESUMEN BENCHMARK ===")
+    for s in summaries:
+        lat = s["latency_s"]
+        print(
+            f"- {s['model']}: F1={s['mean_f1']:.2f} (nota {s['nota']:.2f}) | "
+            f"p50={lat['p50']:.2f}s p90={lat['p90']:.2f}s p95={lat['p95']:.2f}s | "
+            f"tokens={s['tokens']['total_tokens']} | errores={s['errors']} | "
+            f"cacheados={s['cached']} | total={s['wall_s']:.2f}s"
+        )
+        if repeats > 1:
+            for name, c in per_model[s["model"]]["per_case"].items():
+                print(
+                    f"    · {name}: p50={c['latency_s']['p50']:.2f}s p95={c['latency_s']['p95']:.2f}s "
+                    f"F1={c['mean_f1']:.2f} ({c['runs']} runs, {c['errors']} errores)"
+                )
+    if f1_floor is not None:
+        print(f"\nModelo más rápido con F1 >= {f1_floor:.2f}: {out['fastest_meeting_floor'] or '(ninguno)'}")
+
+    if results_path:
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+        with open(results_path, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en: {results_path}")
+
+    return out
+
+
+def run_all_tests(model_override: str | None = None) -> Dict[str, Any]:
+    """Ejecuta la batería de pruebas. Devuelve resumen con nota (0–10)."""
+    bench = run_benchmark([model_override])
+    model_res = next(iter(bench["models"].values()))
+    cases = model_res["cases"]
+    mean_f1 = model_res["summary"]["mean_f1"]
+    nota = model_res["summary"]["nota"]
 
     print("\n=== RESUMEN GLOBAL ===")
     for c in cases:
-        name = c["name"]
-        f1 = c["metrics"]["f1"]
-        print(f"- {name}: F1={f1:.2f}")
+        print(f"- {c['name']}: F1={c['metrics']['f1']:.2f}")
     print(f"\nNota global (0-10): {nota:.2f}")
 
     return {"nota": nota, "mean_f1": mean_f1, "cases": cases}
 
 
-if __name__ == "__main__":
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark del extractor text2triplet (latencia, tokens y F1 por modelo).")
+    p.add_argument("--models", nargs="*", default=None,
+                   help="Modelos a comparar (por defecto: KG_TEST_MODEL o el del .env).")
+    p.add_argument("--workers", type=int, default=4, help="Casos en paralelo por modelo (por defecto: 4).")
+    p.add_argument("--repeats", type=int, default=1, help="Repeticiones de cada caso (por defecto: 1).")
+    p.add_argument("--cache", default=None, help="Fichero JSON de respuestas grabadas.")
+    p.add_argument("--cache-mode", choices=["off", "record", "replay"], default="record",
+                   help="Uso de --cache: record (reutiliza y graba), replay (solo grabadas) u off.")
+    p.add_argument("--out", default=None, help="Fichero JSON de resultados.")
+    p.add_argument("--f1-floor", type=float, default=None,
+                   help="F1 mínimo para elegir el modelo más rápido.")
+    p.add_argument("--quiet", action="store_true", help="No imprimir el detalle por caso.")
+    args = p.parse_args()
+
     # Permite override rápido por variable de entorno si hiciera falta
-    import os
-    model = os.environ.get("KG_TEST_MODEL", None)
-    run_all_tests(model_override=model)
+    models = args.models or [os.environ.get("KG_TEST_MODEL", None)]
+    run_benchmark(
+        models,
+        workers=args.workers,
+        repeats=args.repeats,
+        cache_path=args.cache,
+        cache_mode=args.cache_mode,
+        results_path=args.out,
+        f1_floor=args.f1_floor,
+        print_details=not args.quiet,
+    )
+
+
+if __name__ == "__main__":
+    main()
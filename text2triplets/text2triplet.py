@@ -2,6 +2,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, List, Tuple, Iterable
+from concurrent.futures import ThreadPoolExecutor
 import time
 import unicodedata
 import re
@@ -11,6 +12,7 @@ from utils.make_sqlite_report import make_content_only_report
 
 from utils.config import settings
 from triplets2bd.utils.sqlite_client import SqliteClient
+from triplets2bd.utils.known_facts import KnownFacts
 from .llm_client import LLMClient, LLMConfig
 # Usa tu constants.py como fuente de verdad
 from utils.constants import (
@@ -164,6 +166,37 @@ def _extract_triplets_from_llm_response(response_text: str) -> List[Tuple[str, s
 
     return triplets
 
+def _generate(kg: LLMClient, input_text: str, context: str) -> List[Tuple[str, str, str]]:
+    """Una petición al LLM y el parseo de su respuesta (lanza si falla la llamada)."""
+    response_text = kg.generate(
+        input_data=f"Texto: {input_text}\n\nExtrae las tripletas:",
+        context=context,
+    )
+    return _extract_triplets_from_llm_response(response_text)
+
+
+def _log_llm_error(log_conn, run_id: Optional[str], e: Exception, input_text: str, chunk: Optional[int] = None) -> None:
+    # Logueamos solo el error (sin INFO)
+    if log_conn is not None:
+        metadata = {"error": str(e), "input_preview": str(input_text)[:200]}
+        if chunk is not None:
+            metadata["chunk"] = chunk
+        try:
+            log_event(
+                log_conn,
+                level="ERROR",
+                message="llm call failed",
+                run_id=run_id,
+                stage="text2triplet_llm_generate",
+                reason=type(e).__name__,
+                metadata=metadata,
+            )
+        except Exception:
+            pass
+    where = f" (trozo {chunk})" if chunk is not None else ""
+    print(f"[text2triplet] Error llamando al LLM{where}: {e}")
+
+
 def _call_llm_directly(
     kg: LLMClient,
     input_text: str,
@@ -173,28 +206,9 @@ def _call_llm_directly(
     run_id: Optional[str] = None,
 ) -> List[Tuple[str, str, str]]:
     try:
-        response_text = kg.generate(
-            input_data=f"Texto: {input_text}\n\nExtrae las tripletas:",
-            context=context,
-        )
-        triplets = _extract_triplets_from_llm_response(response_text)
-        return triplets
+        return _generate(kg, input_text, context)
     except Exception as e:
-        # Logueamos solo el error (sin INFO)
-        if log_conn is not None:
-            try:
-                log_event(
-                    log_conn,
-                    level="ERROR",
-                    message="llm call failed",
-                    run_id=run_id,
-                    stage="text2triplet_llm_generate",
-                    reason=type(e).__name__,
-                    metadata={"error": str(e), "input_preview": str(input_text)[:200]},
-                )
-            except Exception:
-                pass
-        print(f"[text2triplet] Error llamando al LLM: {e}")
+        _log_llm_error(log_conn, run_id, e, input_text)
         return []
 
 def _normalize_triplets(triplets: Iterable[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
@@ -211,6 +225,130 @@ def _normalize_triplets(triplets: Iterable[Tuple[str, str, str]]) -> List[Tuple[
         out.append((s2, r2, o2))
     return out
 
+# --------- Extracción por trozos (textos largos) ----------
+# Un turno empieza en "LLM:" o "user_<nombre>:"; una frase termina en . ! ?
+_TURN_START_RE = re.compile(r"^\s*(?:LLM|user_[A-Za-z0-9_]+)\s*:", re.IGNORECASE | re.MULTILINE)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_USER_TAG_RE = re.compile(r"^\s*user_([A-Za-z0-9]+)", re.IGNORECASE | re.MULTILINE)
+# Nombre propio seguido de un verbo del esquema ("Juan realiza", "Ana García no toma")
+_SUBJECT_NAME_RE = re.compile(
+    r"\b([A-ZÁÉÍÓÚÑ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑ][a-záéíóúñü]+)*)\s+(?:no\s+)?"
+    r"(?:padece|toma|realiza|tiene|hace|practica|sufre)\b"
+)
+# Palabras que van en mayúscula por abrir la frase, no por ser nombres ("Además toma...", "Hoy realiza...")
+_NOT_NAMES = {
+    "ademas", "tambien", "hoy", "ayer", "manana", "ahora", "luego", "despues", "antes", "entonces",
+    "siempre", "nunca", "todavia", "aun", "ya", "solo", "casi", "cada", "hace", "desde", "cuando",
+    "pero", "y", "o", "si", "no", "tampoco", "asimismo", "actualmente", "normalmente",
+    "el", "la", "los", "las", "un", "una", "mi", "su", "tu", "yo", "ella", "ellos", "ellas",
+    "usted", "nadie", "alguien", "quien", "que", "esta", "este", "semanalmente", "diariamente",
+}
+
+
+def _estimate_tokens(s: str) -> int:
+    # Aproximación barata (~4 caracteres por token); no requiere tokenizer
+    return max(1, len(s) // 4)
+
+
+def _split_units(text: str) -> List[str]:
+    """Divide en turnos (si es una conversación LLM/user_) o en frases."""
+    starts = [m.start() for m in _TURN_START_RE.finditer(text)]
+    if starts:
+        # Agrupa cada pregunta "LLM:" con sus respuestas para no separar el contexto
+        bounds = [m.start() for m in re.finditer(r"^\s*LLM\s*:", text, re.IGNORECASE | re.MULTILINE)]
+        bounds = sorted(set([0] + (bounds or starts)))
+        bounds.append(len(text))
+        units = [text[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+    else:
+        units = [u.strip() for u in _SENTENCE_END_RE.split(text)]
+    return [u for u in units if u]
+
+
+def _split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """Empaqueta turnos/frases consecutivos en trozos de como mucho max_tokens."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for unit in _split_units(text):
+        n = _estimate_tokens(unit)
+        if current and size + n > max_tokens:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += n
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _person_names(text: str) -> List[str]:
+    """Personas mencionadas en el texto (etiquetas user_<nombre> y sujetos con nombre propio)."""
+    names: List[str] = []
+    for m in _USER_TAG_RE.finditer(text):
+        names.append(m.group(1).capitalize())
+    for m in _SUBJECT_NAME_RE.finditer(text):
+        words = m.group(1).split()
+        while words and _clean_text(words[0]) in _NOT_NAMES:
+            words.pop(0)   # "Además Juan toma" -> "Juan"; "Hoy realiza" -> nadie
+        if words:
+            names.append(" ".join(words))
+    return list(dict.fromkeys(names))
+
+
+def _chunk_inputs(chunks: List[str]) -> List[str]:
+    """
+    Añade a cada trozo el contexto de personas del texto completo, para que
+    las frases sin sujeto explícito se resuelvan igual que sin trocear.
+    """
+    all_names = _person_names("\n".join(chunks))
+    inputs: List[str] = []
+    last_name: Optional[str] = None
+    for chunk in chunks:
+        if all_names:
+            header = f"[Personas mencionadas en el texto completo: {', '.join(all_names)}]"
+            if last_name:
+                header += f"\n[Si una frase no nombra al sujeto, se refiere a: {last_name}]"
+            inputs.append(f"{header}\n{chunk}")
+        else:
+            inputs.append(chunk)
+        names_here = _person_names(chunk)
+        if names_here:
+            last_name = names_here[-1]
+    return inputs
+
+
+def _call_llm_chunked(
+    kg: LLMClient,
+    chunks: List[str],
+    context: str,
+    *,
+    max_workers: int,
+    log_conn=None,
+    run_id: Optional[str] = None,
+) -> Tuple[List[Tuple[str, str, str]], int]:
+    """
+    Extrae los trozos en paralelo. La latencia queda acotada por el trozo más lento.
+    Un trozo que falla se registra y no anula al resto.
+    Devuelve (tripletas de todos los trozos en orden, nº de trozos con error).
+    """
+    inputs = _chunk_inputs(chunks)
+    triplets: List[Tuple[str, str, str]] = []
+    errors = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(inputs)))) as pool:
+        futures = [pool.submit(_generate, kg, chunk_text, context) for chunk_text in inputs]
+        for i, fut in enumerate(futures):
+            try:
+                triplets.extend(fut.result())
+            except Exception as e:
+                errors += 1
+                _log_llm_error(log_conn, run_id, e, chunks[i], chunk=i)
+    return triplets, errors
+
+
+def _dedupe_triplets(triplets: Iterable[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
+    # Conserva el orden de aparición
+    return list(dict.fromkeys(triplets))
+
 # --------- Validación ----------
 def _validate_triplet(tri: Tuple[str, str, str]) -> tuple[bool, str]:
     s, r, o = tri
@@ -251,6 +389,14 @@ def run_kg(
     generate_report: bool = False,
     report_path: Optional[str] = None,
     report_sample_limit: int = 15,
+    # --- Extracción por trozos (textos largos) ---
+    chunked: bool = False,
+    max_chunk_tokens: int = 400,
+    max_workers: int = 4,
+    # --- Extracción incremental ---
+    known_facts: Optional[KnownFacts] = None,
+    # --- Cliente ya creado (benchmark / respuestas grabadas) ---
+    kg: Optional[LLMClient] = None,
 ) -> List[Tuple[str, str, str]]:
     """
     Extrae tripletas desde texto usando un LLM y aplica validación básica.
@@ -259,9 +405,21 @@ def run_kg(
       - El log se limpia por defecto al inicio salvo reset_log=False.
     Informe:
       - Si generate_report=True, se crea un informe del contenido de la SQLite indicada.
+    Trozos:
+      - Si chunked=True, el texto se parte por turnos/frases en trozos de como mucho
+        max_chunk_tokens que se extraen en paralelo (max_workers) y se fusionan sin duplicados.
+    Incremental:
+      - Si se pasa known_facts, el prompt incluye solo los hechos guardados que el texto
+        menciona (para resolver referencias) y se pide devolver únicamente hechos nuevos.
+    Cliente:
+      - kg sustituye al LLMClient creado desde cfg (cualquier objeto con generate()).
     """
     cfg = cfg or KGConfig()
-    kg = _make_kg(cfg)
+    if known_facts is not None:
+        block = known_facts.prompt_block(input_text)
+        if block:
+            context = f"{context}\n\n{block}"
+    kg = kg or _make_kg(cfg)
 
     # Canal de log (siempre SQLite)
     log_sql = SqliteClient(sqlite_db_path)
@@ -274,11 +432,18 @@ def run_kg(
         run_id = new_run_id("kg")
 
         t0 = time.time()
-        raw_triplets = _call_llm_directly(
-            kg, input_text, context,
-            log_conn=log_sql.conn,
-            run_id=run_id,
-        )
+        chunks = _split_into_chunks(input_text, max_chunk_tokens) if chunked else []
+        if len(chunks) > 1:
+            raw_triplets, chunk_errors = _call_llm_chunked(
+                kg, chunks, context, max_workers=max_workers, log_conn=log_sql.conn, run_id=run_id,
+            )
+            print(f"[text2triplet] Extracción por trozos: {len(chunks)} trozos, {chunk_errors} con error")
+        else:
+            raw_triplets = _call_llm_directly(
+                kg, input_text, context,
+                log_conn=log_sql.conn,
+                run_id=run_id,
+            )
         t1 = time.time()
         print("\n=== TEXTO DE ENTRADA ===")
         print(input_text)
@@ -286,7 +451,7 @@ def run_kg(
         print(f"[text2triplet] LLM completado en {t1 - t0:.2f}s")
         print(f"[text2triplet] Tripletas crudas extraídas: {len(raw_triplets)}")
 
-        norm = _normalize_triplets(raw_triplets)
+        norm = _dedupe_triplets(_normalize_triplets(raw_triplets))
 
         valid, rejected = _partition_valid_invalid(norm, drop_invalid=drop_invalid)
         t2 = time.time()
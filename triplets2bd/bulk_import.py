@@ -0,0 +1,106 @@
+# triplets2bd/bulk_import.py
+"""
+Importación masiva en streaming.
+
+Lee tripletas de un iterador (ver utils.io.iter_triplets_from_file), las agrupa
+en trozos acotados y pasa cada trozo por partición → compilación → ejecución
+con run_triplets_to_bd (un commit por trozo). La memoria no depende del tamaño
+de la entrada: de cada trozo solo se conservan contadores.
+
+Las propiedades cuya relación de anclaje llegó en un trozo anterior se
+completan reenviando esa relación (caché acotada de anclajes recientes).
+"""
+from __future__ import annotations
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Callable, Iterable, List, Optional
+
+from .engine import run_triplets_to_bd
+from .utils.io import chunked
+from .utils.types import BulkImportResult, EngineOptions, Triplet
+from utils.constants import PROPERTY_VERBS, RELATION_VERBS
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_ANCHORS = 200_000
+
+
+class _AnchorCache:
+    """nombre de entidad -> última relación que la creó (LRU acotado)."""
+
+    def __init__(self, max_size: int = MAX_ANCHORS):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, Triplet]" = OrderedDict()
+
+    def complete(self, chunk: List[Triplet]) -> List[Triplet]:
+        anchored = set()
+        for s, v, o in chunk:
+            if v.strip().lower() in RELATION_VERBS:
+                key = o.strip().lower()
+                anchored.add(key)
+                self._items[key] = (s, v, o)
+                self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+        extra: List[Triplet] = []
+        for s, v, o in chunk:
+            key = s.strip().lower()
+            if v.strip().lower() in PROPERTY_VERBS and key not in anchored:
+                anchor = self._items.get(key)
+                if anchor is not None:
+                    extra.append(anchor)
+                    anchored.add(key)
+        # Las relaciones van antes que las propiedades que anclan
+        return extra + chunk if extra else chunk
+
+
+def _print_progress(chunk_no: int, rows: int, elapsed: float) -> None:
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"[bulk] trozo {chunk_no} | {rows} tripletas | {elapsed:.1f}s | {rate:,.0f} tripletas/s")
+
+
+def run_bulk_import(
+    triplets: Iterable[Triplet],
+    opts: EngineOptions,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int, float], None]] = _print_progress,
+    progress_every: int = 10,
+) -> BulkImportResult:
+    """
+    Ejecuta run_triplets_to_bd por trozos de `chunk_size` tripletas.
+    El reset (BD y log) solo se aplica al primer trozo; no se genera informe ni
+    se renderiza el script de depuración.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser > 0")
+
+    first = replace(opts, generate_report=False, render_sql_script=False)
+    rest = replace(first, reset=False, reset_log=False)
+    anchors = _AnchorCache()
+
+    rows = chunks = executed = leftovers = 0
+    t0 = time.perf_counter()
+    for chunk in chunked(triplets, chunk_size):
+        res = run_triplets_to_bd(anchors.complete(chunk), first if chunks == 0 else rest)
+        chunks += 1
+        rows += len(chunk)
+        executed += res.executed_statements
+        leftovers += len(res.leftovers)
+        if progress is not None and chunks % progress_every == 0:
+            progress(chunks, rows, time.perf_counter() - t0)
+
+    elapsed = time.perf_counter() - t0
+    if progress is not None and chunks % progress_every:
+        progress(chunks, rows, elapsed)
+
+    return BulkImportResult(
+        backend=opts.backend,
+        mode=opts.mode,
+        rows=rows,
+        chunks=chunks,
+        executed_statements=executed,
+        leftovers=leftovers,
+        elapsed_s=elapsed,
+    )
@@ -0,0 +1,279 @@
+# triplets2bd/canonicalize.py
+"""
+Resolución de alias de entidades antes de compilar.
+
+"dolor de espalda", "dolor espalda" y "dolores de espalda" generan hoy tres ids
+distintos (slugify del texto exacto). Este módulo mantiene un índice en memoria
+de nombres conocidos por tipo (sembrado desde la BD y actualizado en cada run)
+y reescribe las tripletas sobre el nombre canónico, de modo que todas acaban en
+el mismo id.
+
+Similitud: conjunto de raíces (sin tildes, sin stopwords, plural → singular).
+Por defecto solo se fusionan nombres con el mismo conjunto; un umbral Jaccard
+< 1 admite además sustituir raíces, nunca añadir o quitar una ("dolor de
+espalda baja" no es "dolor de espalda").
+
+Los nombres nuevos de un lote no entran en el índice de proceso hasta que el
+motor confirma la escritura (canonicalize_triplets los devuelve aparte).
+"""
+from __future__ import annotations
+import threading
+import unicodedata
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from utils.schema_registry import NODES, RELATIONS, PROPERTY_SUBJECTS
+
+Triplet = Tuple[str, str, str]
+
+# Tipos con alias (las personas se identifican por nombre propio; no se fusionan)
+ALIAS_TYPES = PROPERTY_SUBJECTS
+
+# Verbo de relación -> tipo del objeto
+_REL_TARGET = {verb: r.target for verb, r in RELATIONS.items()}
+
+# Siembra: nombre de cada entidad con alias en SQLite y en Neo4j
+_SEED_SQL = {etype: f"SELECT {NODES[etype].name_prop} FROM {etype}" for etype in ALIAS_TYPES}
+_SEED_CYPHER = {
+    etype: f"MATCH (n:{NODES[etype].label}) RETURN n.{NODES[etype].name_prop} AS name" for etype in ALIAS_TYPES
+}
+
+_STOPWORDS = {
+    "de", "del", "la", "el", "los", "las", "en", "y", "a", "al",
+    "por", "con", "un", "una", "unos", "unas", "mi", "su",
+}
+
+DEFAULT_THRESHOLD = 1.0   # 1.0: mismo conjunto de raíces
+
+Signature = FrozenSet[str]
+
+
+def _strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+
+
+def _stem(token: str) -> str:
+    # Stemming ligero para español: solo plurales regulares
+    if len(token) > 4 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def signature(text: str) -> Signature:
+    clean = _strip_accents(text.strip().lower())
+    tokens = ["".join(c for c in t if c.isalnum()) for t in clean.split()]
+    return frozenset(_stem(t) for t in tokens if t and t not in _STOPWORDS)
+
+
+def _jaccard(a: Signature, b: Signature) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class AliasIndex:
+    """
+    Índice de nombres canónicos por tipo:
+      - exacto por firma (conjunto de raíces)
+      - candidatos por raíz (índice invertido) para la similitud Jaccard
+        (solo con threshold < 1 y entre firmas con el mismo nº de raíces)
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._by_sig: Dict[str, Dict[Signature, str]] = {t: {} for t in ALIAS_TYPES}
+        self._by_stem: Dict[str, Dict[str, Set[Signature]]] = {t: {} for t in ALIAS_TYPES}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._by_sig.values())
+
+    def _add(self, etype: str, name: str, sig: Signature) -> str:
+        canonical = " ".join(name.strip().lower().split())
+        self._by_sig[etype][sig] = canonical
+        for st in sig:
+            self._by_stem[etype].setdefault(st, set()).add(sig)
+        return canonical
+
+    def add(self, etype: str, name: str) -> None:
+        if etype not in self._by_sig or not name:
+            return
+        sig = signature(name)
+        if not sig:
+            return
+        with self._lock:
+            if sig not in self._by_sig[etype]:
+                self._add(etype, name, sig)
+
+    def add_all(self, names: Iterable[Tuple[str, str]]) -> None:
+        """Registra pares (tipo, nombre); el motor lo llama tras confirmar la escritura."""
+        for etype, name in names:
+            self.add(etype, name)
+
+    def names(self) -> List[Tuple[str, str]]:
+        """Pares (tipo, nombre canónico) del índice."""
+        with self._lock:
+            return [(etype, name) for etype in ALIAS_TYPES for name in self._by_sig[etype].values()]
+
+    def lookup(self, etype: str, name: str) -> Optional[str]:
+        """Nombre canónico conocido para `name` o None (no modifica el índice)."""
+        if etype not in self._by_sig:
+            return None
+        sig = signature(name)
+        if not sig:
+            return None
+        with self._lock:
+            return self._lookup(etype, sig)
+
+    def _lookup(self, etype: str, sig: Signature) -> Optional[str]:
+        exact = self._by_sig[etype].get(sig)
+        if exact is not None:
+            return exact
+        if self.threshold >= 1.0:
+            return None
+        candidates: Set[Signature] = set()
+        for st in sig:
+            candidates |= self._by_stem[etype].get(st, set())
+        best: Optional[Signature] = None
+        best_score = 0.0
+        # Orden estable para que el desempate sea determinista
+        for cand in sorted(candidates, key=sorted):
+            if len(cand) != len(sig):
+                continue   # una raíz de más o de menos es otra entidad
+            score = _jaccard(sig, cand)
+            if score > best_score:
+                best, best_score = cand, score
+        if best is not None and best_score >= self.threshold:
+            return self._by_sig[etype][best]
+        return None
+
+    def resolve(self, etype: str, name: str) -> str:
+        """Devuelve el nombre canónico; si no hay, registra `name` como nuevo canónico."""
+        if etype not in self._by_sig:
+            return name
+        sig = signature(name)
+        if not sig:
+            return name
+        with self._lock:
+            found = self._lookup(etype, sig)
+            if found is not None:
+                return found
+            return self._add(etype, name, sig)
+
+    def type_of(self, name: str) -> Optional[str]:
+        """Tipo en el que `name` ya es conocido (para sujetos de propiedades)."""
+        sig = signature(name)
+        if not sig:
+            return None
+        with self._lock:
+            for etype in ALIAS_TYPES:
+                if self._lookup(etype, sig) is not None:
+                    return etype
+        return None
+
+    # ---------------- Siembra desde BD ----------------
+    def seed_from_sqlite(self, conn) -> int:
+        """Carga nombres existentes de las tablas de dominio (si existen)."""
+        n = 0
+        for etype, q in _SEED_SQL.items():
+            try:
+                rows = conn.execute(q).fetchall()
+            except Exception:
+                continue  # tabla aún no creada
+            for (name,) in rows:
+                if name:
+                    self.add(etype, str(name))
+                    n += 1
+        return n
+
+    def seed_from_neo4j(self, db) -> int:
+        n = 0
+        for etype, q in _SEED_CYPHER.items():
+            for row in db.write(q, {}):
+                if row.get("name"):
+                    self.add(etype, str(row["name"]))
+                    n += 1
+        return n
+
+    def seed_from_memory(self, graph) -> int:
+        """Nombres de los nodos de un MemoryGraph."""
+        n = 0
+        for etype in ALIAS_TYPES:
+            for node in graph.nodes(etype):
+                name = node.get(NODES[etype].name_prop)
+                if name:
+                    self.add(etype, str(name))
+                    n += 1
+        return n
+
+
+# ---------------- Caché de índices por BD ----------------
+_INDEXES: Dict[str, AliasIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_alias_index(key: str, seed: Optional[Callable[[AliasIndex], object]] = None) -> AliasIndex:
+    """
+    Índice de proceso para una BD (key = ruta SQLite, URI Neo4j o grafo en memoria).
+    `seed` solo se invoca la primera vez; después el índice se actualiza en cada run.
+    """
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is None:
+            idx = AliasIndex()
+            if seed is not None:
+                seed(idx)
+            _INDEXES[key] = idx
+        return idx
+
+
+def drop_alias_index(key: str) -> None:
+    """Olvida el índice de una BD (p. ej. tras un reset de dominio)."""
+    with _INDEXES_LOCK:
+        _INDEXES.pop(key, None)
+
+
+def canonicalize_triplets(
+    triplets: List[Triplet],
+    index: AliasIndex,
+) -> Tuple[List[Triplet], List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """
+    Reescribe objetos de relaciones y sujetos de propiedades sobre el nombre canónico.
+    `index` no se modifica: los nombres nuevos se resuelven entre sí en un índice del
+    lote y se devuelven para index.add_all() cuando la escritura se confirme.
+    Devuelve (tripletas reescritas sin duplicados, [(original, canónico)], [(tipo, nombre nuevo)]).
+    """
+    # 1) Tipo de cada nombre según las relaciones del lote
+    types: Dict[str, str] = {}
+    for s, v, o in triplets:
+        etype = _REL_TARGET.get(v.strip().lower())
+        if etype:
+            types.setdefault(o.strip().lower(), etype)
+
+    mapping: Dict[str, str] = {}
+    batch = AliasIndex(index.threshold)
+
+    def _canon(name: str) -> str:
+        key = name.strip().lower()
+        if key in mapping:
+            return mapping[key]
+        etype = types.get(key) or index.type_of(key) or batch.type_of(key)
+        if etype:
+            mapping[key] = index.lookup(etype, key) or batch.resolve(etype, key)
+        else:
+            mapping[key] = name
+        return mapping[key]
+
+    out: List[Triplet] = []
+    for s, v, o in triplets:
+        v_l = v.strip().lower()
+        if v_l in _REL_TARGET:
+            out.append((s, v, _canon(o)))
+        elif v_l == "tiene":
+            out.append((s, v, o))
+        else:
+            out.append((_canon(s), v, o))
+
+    rewrites = sorted((k, c) for k, c in mapping.items() if c.strip().lower() != k)
+    return list(dict.fromkeys(out)), rewrites, batch.names()
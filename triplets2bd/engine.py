@@ -1,22 +1,43 @@
 # triplets2bd/engine.py
 from __future__ import annotations
-from typing import List, Tuple, Optional
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from dataclasses import replace
+from typing import List, Tuple, Optional, Callable, Dict, Any
 
-from .utils.types import EngineOptions, EngineResult, Triplet
+from .utils.types import EngineOptions, EngineResult, ExecutionReport, Triplet
 from .triplets2sql_rule_based import (
     partition_triplets_strict as partition_sql,
-    compile_sql_script,
+    compile_sql_plan,
+    plan_from_collector as sql_plan_from_collector,
+    SqlPlan,
 )
 from .triplets2cypher_rule_based import (
     partition_triplets_strict as partition_cypher,
-    compile_cypher_script,
+    compile_cypher_plan,
+    collect_triplets,
+    plan_from_collector as cypher_plan_from_collector,
+    CypherPlan,
 )
-from .llm_triplets_to_bd import bd_from_triplets
+from .llm_triplets_to_bd import bd_from_triplets, repair_statements
+from .canonicalize import AliasIndex, canonicalize_triplets, get_alias_index, drop_alias_index
+from .utils.known_facts import KnownFacts, known_facts_snapshot, invalidate_known_facts
+from .utils.query_cache import (
+    invalidate_queries, sql_target, neo4j_target, sql_plan_tags, cypher_plan_tags,
+)
+from .utils.memory_graph import get_memory_graph
+from .utils.shards import get_shard_manager, resolve_sqlite_path
+from .utils.rule_templates import apply_rule_templates, learn_rule_templates
+from .utils.sql_executor import execute_run, log_execution_failures
+from .utils.schema_sqlite_bootstrap import split_sql_statements
+from .write_behind import discard_pending, get_write_behind
 
 # Clientes / bootstrap
 from .utils.neo4j_client import Neo4jClient
-from .utils.schema_bootstrap import bootstrap as bootstrap_neo4j
+from .utils.neo4j_writer import write_plan, execute_statements, split_cypher_statements
+from .utils.schema_bootstrap import ensure_schema as bootstrap_neo4j
 from .utils.sqlite_client import SqliteClient
+from .utils.sqlite_writer import WriterClient, get_writer
 from .utils.schema_sqlite_bootstrap import bootstrap_sqlite
 
 # LOG (siempre SQLite; solo fallos)
@@ -57,16 +78,401 @@ def _warn_reset_failure(log_conn, run_id: str, target: str, exc: Exception | Non
         pass  # nunca romper por el log
 
 
-def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineResult:
+def _sqlite_alias_key(sqlite_db_path: str) -> str:
+    return "sqlite:" + os.path.abspath(sqlite_db_path)
+
+
+def _neo4j_alias_key() -> str:
+    from utils.config import settings
+    return "neo4j:" + (settings.NEO4J_URI or "")
+
+
+def _memory_alias_key(name: str) -> str:
+    return "memory:" + name
+
+
+def _canonicalize(
+    supported: List[Triplet],
+    key: str,
+    seed: Callable[[AliasIndex], object],
+    extras: Dict[str, Any],
+) -> Tuple[List[Triplet], Callable[[], None]]:
+    """
+    Reescribe alias sobre nombres canónicos (índice de proceso por BD). Devuelve también
+    la función que registra los nombres nuevos: llamarla solo tras confirmar la escritura.
+    """
+    index = get_alias_index(key, seed)
+    supported, rewrites, new_names = canonicalize_triplets(supported, index)
+    if rewrites:
+        extras["aliases"] = rewrites
+    return supported, lambda: index.add_all(new_names)
+
+
+def _det_written(report: ExecutionReport) -> bool:
+    """El plan determinista se escribió entero (ningún lote "det" revertido)."""
+    return not any(e["source"] == "det" for e in report.errors)
+
+
+def _drop_known(
+    supported: List[Triplet],
+    known: Optional[KnownFacts],
+    sqlite_db_path: str,
+    extras: Dict[str, Any],
+) -> List[Triplet]:
+    """
+    Diff contra los hechos guardados: no se recompilan tripletas ya conocidas.
+    Solo si la vista salió de la SQLite en la que se va a escribir (backend "sql").
+    """
+    if known is None or not len(known):
+        return supported
+    if known.source is not None and known.source != os.path.abspath(sqlite_db_path):
+        extras["known_facts_ignored"] = known.source
+        return supported
+    supported, dropped = known.diff(supported)
+    if dropped:
+        extras["known_dropped"] = dropped
+    return supported
+
+
+# Conversión LLM de sobrantes (hybrid): en segundo plano mientras se escribe lo determinista.
+# Una llamada que ya corre no se puede cancelar: con opts.llm_deadline_s la petición HTTP
+# lleva ese mismo timeout, así que una llamada abandonada libera su hilo al vencer el plazo
+# (sin plazo, hasta el timeout por defecto del cliente) y no deja a los runs siguientes
+# esperando detrás de trabajo descartado.
+LLM_WORKERS = 4
+_LLM_POOL = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm-leftovers")
+
+
+def _submit_llm(leftovers: List[Tuple[Triplet, str]], modo: str, timeout: Optional[float]) -> Future:
+    return _LLM_POOL.submit(bd_from_triplets, [t for (t, _) in leftovers], modo=modo, timeout=timeout)
+
+
+def _await_llm(
+    future: Future,
+    opts: EngineOptions,
+    log_conn,
+    run_id: str,
+    leftovers: List[Tuple[Triplet, str]],
+    extras: Dict[str, Any],
+) -> str:
+    """
+    Script LLM de los sobrantes. Si vence opts.llm_deadline_s o el LLM falla, los
+    sobrantes solo se registran en el log (lo determinista ya está confirmado).
+    """
+    try:
+        return future.result(timeout=opts.llm_deadline_s).strip()
+    except FuturesTimeout:
+        future.cancel()   # solo si no había empezado; si no, la corta el timeout HTTP
+        extras["llm_deadline_exceeded"] = True
+        insert_leftovers_log(
+            log_conn,
+            [(t, "llm_deadline") for (t, _) in leftovers],
+            run_id=run_id,
+            stage="triplet2bd_llm_fallback",
+            message=f"LLM sin respuesta en {opts.llm_deadline_s}s: sobrantes no aplicados",
+        )
+        return ""
+    except Exception as e:
+        extras["llm_error"] = f"{type(e).__name__}: {e}"
+        insert_leftovers_log(
+            log_conn,
+            [(t, "llm_error") for (t, _) in leftovers],
+            run_id=run_id,
+            stage="triplet2bd_llm_fallback",
+            message=f"LLM falló ({type(e).__name__}): sobrantes no aplicados",
+        )
+        return ""
+
+
+def _outcomes(report: ExecutionReport, offset: int = 0) -> Dict[int, Optional[Dict[str, Any]]]:
+    """Posición de cada sentencia ejecutada -> None (aplicada) o su error. Las omitidas no aparecen."""
+    out: Dict[int, Optional[Dict[str, Any]]] = {t["item"] + offset: None for t in report.timings if t["item"] is not None}
+    for e in report.errors:
+        out[e["item"] + offset] = {**e, "item": e["item"] + offset}
+    return out
+
+
+def _execute_llm_with_repair(
+    stmts: List[str],
+    run: Callable[[List[Tuple[str, str]]], ExecutionReport],
+    modo: str,
+    opts: EngineOptions,
+    extras: Dict[str, Any],
+) -> Tuple[List[str], ExecutionReport]:
+    """
+    Ejecuta las sentencias LLM y, si alguna falla, pide al modelo SOLO esas (con el
+    error de la BD) hasta opts.llm_repair_attempts veces. Las reparadas se insertan en
+    su sitio y se reejecuta desde la primera reparada (las posteriores pueden depender
+    de ella; son upserts/MERGE, así que repetirlas no duplica nada).
+    Los resultados van por posición (una sentencia repetida cuenta cada vez).
+    Devuelve (sentencias finales, informe con recuentos de la versión final).
+    """
+    report = run([("llm", s) for s in stmts])
+    results = _outcomes(report)
+    attempts = 0
+    while attempts < opts.llm_repair_attempts:
+        failing = sorted(i for i, e in results.items() if e is not None)
+        if not failing:
+            break
+        attempts += 1
+        try:
+            fixes = repair_statements([(stmts[i], results[i]["error"]) for i in failing], modo=modo)
+        except Exception as e:
+            extras["llm_repair_error"] = f"{type(e).__name__}: {e}"
+            break   # sin reparación: se quedan las fallidas tal cual
+        fix_at = {i: fix for i, fix in zip(failing, fixes) if fix and fix != stmts[i]}
+        if not fix_at:
+            break
+        first = min(fix_at)
+
+        # Sentencias anteriores a la primera reparada: conservan su resultado
+        kept = stmts[:first]
+        results = {i: r for i, r in results.items() if i < first}
+        tail: List[Tuple[str, str]] = []
+        for i in range(first, len(stmts)):
+            fix = fix_at.get(i)
+            if fix == "--SKIP--":
+                report.skipped += 1
+                continue
+            tail.append(("llm_repair" if fix else "llm_replay", fix or stmts[i]))
+        stmts = kept + [s for _, s in tail]
+
+        # Desde ahí, cada sentencia queda con el resultado de la reejecución
+        retry = run(tail)
+        report.timings.extend(retry.timings)
+        results.update(_outcomes(retry, offset=first))
+
+    if attempts:
+        errors = [results[i] for i in sorted(results) if results[i] is not None]
+        report.errors = errors
+        report.failed = sum(e["rows"] for e in errors)
+        report.executed = sum(1 for r in results.values() if r is None)
+        extras["llm_repair"] = {"attempts": attempts, "still_failing": report.failed}
+    return stmts, report
+
+
+def _write_neo4j(
+    db: Neo4jClient,
+    opts: EngineOptions,
+    det_cypher: Optional[CypherPlan],
+    tpl_script: str,
+    llm_future: Optional[Future],
+    llm_script: str,
+    leftovers: List[Tuple[Triplet, str]],
+    llm_leftovers: List[Tuple[Triplet, str]],
+    log_conn,
+    run_id: str,
+    extras: Dict[str, Any],
+) -> Tuple[int, str, ExecutionReport]:
+    """Escritura Neo4j de un plan ya compilado. Devuelve (ejecutadas, script LLM final, informe de plantillas y LLM)."""
+    executed = 0
+    queued = 0   # write-behind: encolado, aún sin escribir (no cuenta como ejecutado)
+    exec_report = ExecutionReport()
+
+    # 1) Determinista: se confirma ya, sin esperar al LLM
+    if opts.write_behind:
+        wb = get_write_behind()
+        queued += wb.enqueue_cypher(db.key[0], det_cypher)
+    elif det_cypher:
+        extras["neo4j_write"] = write_plan(db, det_cypher, opts.neo4j_chunk_rows, opts.neo4j_sessions)
+        executed += det_cypher.row_count
+
+    # 1b) Sobrantes con plantilla aprendida (utils.rule_templates): sin LLM
+    if tpl_script:
+        stmts = split_cypher_statements(tpl_script)
+        if opts.write_behind:
+            wb.enqueue_cypher(db.key[0], None, tpl_script)
+            queued += len(stmts)
+        else:
+            # Una transacción por sentencia, como el script LLM: una plantilla mala no
+            # arrastra al resto y queda en el log
+            tpl_report = execute_statements(db, [("template", st) for st in stmts])
+            exec_report.merge(tpl_report)
+            executed += tpl_report.executed
+            log_execution_failures(log_conn, tpl_report, run_id)
+        extras["rule_templates"] = len(leftovers) - len(llm_leftovers)
+
+    # 2) LLM: en su propia transacción cuando responde (o se descarta por plazo)
+    if llm_future is not None:
+        llm_script = _await_llm(llm_future, opts, log_conn, run_id, llm_leftovers, extras)
+    if llm_script:
+        stmts = split_cypher_statements(llm_script)
+        if opts.write_behind:
+            wb.enqueue_cypher(db.key[0], None, llm_script)
+            queued += len(stmts)
+            if opts.llm_repair_attempts:
+                extras["llm_repair_skipped"] = "write_behind"   # se ejecuta en diferido: sin reparación
+        elif stmts:
+            stmts, llm_report = _execute_llm_with_repair(
+                stmts, lambda items: execute_statements(db, items), "neo4j", opts, extras
+            )
+            if "llm_repair" in extras:
+                llm_script = ";\n".join(stmts) + ";"
+            exec_report.merge(llm_report)
+            executed += llm_report.executed
+            log_execution_failures(log_conn, llm_report, run_id)
+            if opts.rule_templates and llm_leftovers and not llm_report.failed:
+                learn_rule_templates(log_conn, llm_leftovers, llm_script, "neo4j")
+    if opts.write_behind:
+        extras["write_behind"] = {"queued": queued, "pending": wb.stats()["pending"]}
+    elif executed:
+        invalidate_queries(
+            neo4j_target(db.key[0]),
+            None if (tpl_script or llm_script) else cypher_plan_tags(det_cypher),
+        )
+
+    return executed, llm_script, exec_report
+
+
+def _write_sqlite(
+    sql,
+    opts: EngineOptions,
+    det_plan: Optional[SqlPlan],
+    tpl_script: str,
+    llm_future: Optional[Future],
+    llm_script: str,
+    leftovers: List[Tuple[Triplet, str]],
+    llm_leftovers: List[Tuple[Triplet, str]],
+    log_conn,
+    run_id: str,
+    extras: Dict[str, Any],
+) -> Tuple[int, str, ExecutionReport]:
+    """Escritura SQLite de un plan ya compilado. Devuelve (ejecutadas, script LLM final, informe)."""
+    executed = 0
+    queued = 0   # write-behind: encolado, aún sin escribir (no cuenta como ejecutado)
+    exec_report = ExecutionReport()
+
+    # 1) Determinista (+ plantillas): una transacción con savepoint por
+    #    lote/sentencia, confirmada ya sin esperar al LLM
+    if opts.write_behind:
+        wb = get_write_behind()
+        queued += wb.enqueue_sql(opts.sqlite_db_path, det_plan, tpl_script, writer=opts.sqlite_writer)
+        queued += tpl_script.count(";")
+    elif det_plan or tpl_script:
+        exec_report.merge(sql.run(lambda c: execute_run(c, det_plan, [("template", tpl_script)])))
+    if tpl_script:
+        extras["rule_templates"] = len(leftovers) - len(llm_leftovers)
+
+    # 2) LLM: en su propia transacción cuando responde (o se descarta por plazo)
+    if llm_future is not None:
+        llm_script = _await_llm(llm_future, opts, log_conn, run_id, llm_leftovers, extras)
+    if llm_script:
+        if opts.write_behind:
+            wb.enqueue_sql(opts.sqlite_db_path, None, llm_script, writer=opts.sqlite_writer)
+            queued += llm_script.count(";")  # estimación (se ejecuta en diferido)
+            if opts.llm_repair_attempts:
+                extras["llm_repair_skipped"] = "write_behind"   # se ejecuta en diferido: sin reparación
+        else:
+            stmts, llm_report = _execute_llm_with_repair(
+                split_sql_statements(llm_script),
+                lambda items: sql.run(lambda c: execute_run(c, None, items)),
+                "sql", opts, extras,
+            )
+            if "llm_repair" in extras:
+                llm_script = "\n".join(st if st.endswith(";") else st + ";" for st in stmts)
+            exec_report.merge(llm_report)
+            if opts.rule_templates and llm_leftovers and not llm_report.failed:
+                learn_rule_templates(log_conn, llm_leftovers, llm_script, "sql")
+
+    if opts.write_behind:
+        extras["write_behind"] = {"queued": queued, "pending": wb.stats()["pending"]}
+    else:
+        executed = exec_report.executed
+        if executed:
+            invalidate_known_facts(opts.sqlite_db_path)
+            # Lecturas en caché (triplets2bd.query): solo las entidades del plan; los
+            # scripts (plantillas / LLM) pueden tocar cualquiera -> el destino entero
+            invalidate_queries(
+                sql_target(opts.sqlite_db_path),
+                None if (tpl_script or llm_script) else sql_plan_tags(det_plan),
+            )
+        log_execution_failures(log_conn, exec_report, run_id)
+
+    return executed, llm_script, exec_report
+
+
+# backend="both": la escritura Neo4j va en paralelo con la de SQLite
+_BACKEND_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="backend-write")
+_BOTH = ("sql", "neo4j")
+
+
+def _run_isolated(
+    opts: EngineOptions,
+    write: Callable[[Any], Tuple[int, str, ExecutionReport]],
+) -> Tuple[Optional[Tuple[int, str, ExecutionReport]], Optional[Exception]]:
+    """write(log_conn) en un hilo del pool, con su propio canal de log; el error se devuelve, no se lanza."""
+    log = _sqlite_client(opts, "log")
+    try:
+        return write(log.conn), None
+    except Exception as e:
+        return None, e
+    finally:
+        log.close()
+
+
+def _backend_result(
+    out: Tuple[int, str, ExecutionReport],
+    error: Optional[Exception],
+    det_script: str,
+    extras: Dict[str, Any],
+) -> Dict[str, Any]:
+    executed, llm_script, report = out
+    return {
+        "executed": executed,
+        "failed": report.failed,
+        "skipped": report.skipped,
+        "det_script": det_script,
+        "llm_script": llm_script,
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        "extras": extras,
+    }
+
+
+def _sqlite_client(opts: EngineOptions, channel: str):
+    """
+    Canal del escritor único del fichero (opts.sqlite_writer), conexión del shard
+    del usuario (caché de utils.shards) o conexión propia.
+    """
+    if opts.sqlite_writer:
+        return WriterClient(get_writer(opts.sqlite_db_path), channel)
+    if opts.shards_dir and opts.shard_user:
+        return get_shard_manager(opts.shards_dir).client(opts.shard_user)
+    return SqliteClient(opts.sqlite_db_path)
+
+
+def run_triplets_to_bd(
+    triplets: List[Triplet],
+    opts: EngineOptions,
+    known_facts: Optional[KnownFacts] = None,
+) -> EngineResult:
+    """
+    known_facts: vista de hechos ya guardados (ver utils.known_facts). Si no se pasa y
+    opts.skip_known_facts=True, se usa el snapshot cacheado de la SQLite de dominio.
+    El diff solo se aplica con backend="sql" sobre esa misma SQLite.
+    Con opts.shards_dir y opts.shard_user, la SQLite es la del usuario (utils.shards).
+    La vista de hechos se filtra por opts.facts_user_id (persona.user_id), no por el shard.
+    """
+    # SQLite por usuario: todo el run (dominio, log, informe) va al shard del usuario
+    if opts.shards_dir and opts.shard_user:
+        opts = replace(opts, sqlite_db_path=resolve_sqlite_path(opts.sqlite_db_path, opts.shard_user, opts.shards_dir))
+
     det_script = ""
+    det_plan: Optional[SqlPlan] = None
+    det_cypher: Optional[CypherPlan] = None
     llm_script = ""
+    llm_future: Optional[Future] = None
+    llm_leftovers: List[Tuple[Triplet, str]] = []   # sobrantes que van al LLM (sin plantilla aprendida)
+    tpl_script = ""
+    register_aliases: Callable[[], None] = lambda: None   # nombres canónicos nuevos, tras escribir
+    exec_report = ExecutionReport()   # SQLite: recuentos exactos y tiempos por sentencia
+    backend_results: Dict[str, Dict[str, Any]] = {}
     executed = 0
     leftovers: List[Tuple[Triplet, str]] = []
     run_id: Optional[str] = None
     extras = {}
 
     # --- Canal de log en SQLite (independiente del backend) ---
-    log_sql = SqliteClient(opts.sqlite_db_path)
+    log_sql = _sqlite_client(opts, "log")
     ensure_sql_log_table(log_sql.conn)
 
     try:
@@ -77,10 +483,27 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
         # run_id efímero (no se persiste si no hay avisos/errores)
         run_id = new_run_id("run")
 
+        # Hechos conocidos: solo se leen de (y se descartan para) la SQLite de dominio
+        if known_facts is None and opts.skip_known_facts and not opts.reset and opts.backend == "sql":
+            known_facts = known_facts_snapshot(opts.sqlite_db_path, opts.facts_user_id)
+
         # ======================================================
         # RESET DE DOMINIO (vía reset.py) SI SE SOLICITA
         # ======================================================
-        if opts.reset:
+        if opts.reset and opts.backend == "memory":
+            # El backend en memoria solo resetea su propio grafo
+            get_memory_graph(opts.memory_graph).clear()
+            drop_alias_index(_memory_alias_key(opts.memory_graph))
+
+        elif opts.reset:
+            # El índice de alias en memoria deja de reflejar la BD
+            drop_alias_index(_neo4j_alias_key())
+            drop_alias_index(_sqlite_alias_key(opts.sqlite_db_path))
+            invalidate_queries()
+            # Lo encolado antes del reset no debe volver a escribirse después
+            discard_pending("sql", opts.sqlite_db_path)
+            discard_pending("neo4j")
+
             # Resetear Neo4j (si existe función en reset.py)
             if reset_domain_neo4j is not None:
                 try:
@@ -110,9 +533,9 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
         # BACKEND NEO4J
         # ======================================================
         if opts.backend == "neo4j":
-            db = Neo4jClient()
+            db = Neo4jClient(shared=True)
             try:
-                # Tras reset de dominio, crear constraints/índices
+                # Constraints/índices: solo la primera vez por proceso (crea los que falten)
                 bootstrap_neo4j(db)
 
                 # Modo
@@ -122,7 +545,13 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
                 else:
                     # Determinista
                     supported, leftovers = partition_cypher(triplets)
-                    det_script = compile_cypher_script(supported).strip()
+                    if opts.canonicalize:
+                        supported, register_aliases = _canonicalize(
+                            supported, _neo4j_alias_key(), lambda idx: idx.seed_from_neo4j(db), extras
+                        )
+                    det_cypher = compile_cypher_plan(supported)
+                    if opts.render_sql_script:
+                        det_script = det_cypher.render_script().strip()
 
                     # Registrar leftovers siempre en SQLite (nivel WARN)
                     if leftovers:
@@ -134,34 +563,205 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
                             message="Tripletas no compatibles con determinista (Neo4j)",
                         )
 
-                    # Hybrid: LLM solo para sobrantes
+                    # Hybrid: LLM solo para sobrantes (en paralelo con la escritura determinista)
                     if opts.mode == "hybrid" and leftovers:
-                        llm_script = bd_from_triplets(
-                            [t for (t, _) in leftovers],
-                            modo="neo4j"
-                        ).strip()
-
-                # Ejecutar Cypher final
-                script = "\n".join([s for s in (det_script, llm_script) if s]).strip()
-                if script:
-                    stmts = [s.strip() for s in script.split(";") if s.strip() and s.strip() != "--SKIP--"]
-                    if stmts:
-                        db.write_many([(s, {}) for s in stmts])
-                        executed = len(stmts)
-
+                        llm_leftovers = leftovers
+                        if opts.rule_templates:
+                            tpl_script, llm_leftovers = apply_rule_templates(log_sql.conn, leftovers, "neo4j")
+                        if llm_leftovers:
+                            llm_future = _submit_llm(llm_leftovers, "neo4j", opts.llm_deadline_s)
+
+                executed, llm_script, exec_report = _write_neo4j(
+                    db, opts, det_cypher, tpl_script, llm_future, llm_script,
+                    leftovers, llm_leftovers, log_sql.conn, run_id, extras,
+                )
+                register_aliases()   # write_plan lanza si el plan no se escribió
                 extras.update({"run_id": run_id})
 
             finally:
                 db.close()
 
+        # ======================================================
+        # AMBOS BACKENDS: un plan compilado, escrituras concurrentes
+        # ======================================================
+        elif opts.backend == "both":
+            sql = _sqlite_client(opts, "domain")
+            db: Optional[Neo4jClient] = None
+            neo_error: Optional[Exception] = None
+            try:
+                sql.run(bootstrap_sqlite, raw=True)
+                try:
+                    db = Neo4jClient(shared=True)
+                    bootstrap_neo4j(db)
+                except Exception as e:
+                    neo_error = e   # Neo4j no disponible: SQLite sigue adelante
+
+                tpl_scripts = {m: "" for m in _BOTH}
+                llm_lefts: Dict[str, List[Tuple[Triplet, str]]] = {m: [] for m in _BOTH}
+                llm_futures: Dict[str, Optional[Future]] = {m: None for m in _BOTH}
+                llm_scripts = {m: "" for m in _BOTH}
+                sql_error: Optional[Exception] = None
+                # Dialectos con destino disponible (sin Neo4j no se pide su script al LLM)
+                modes = _BOTH if neo_error is None else ("sql",)
+
+                if opts.mode == "llm":
+                    # Los scripts a la vez: una espera de LLM, no dos. Un fallo del LLM
+                    # de un dialecto solo anula la escritura de ese backend
+                    pending = {m: _LLM_POOL.submit(bd_from_triplets, triplets, modo=m) for m in modes}
+                    for m, f in pending.items():
+                        try:
+                            llm_scripts[m] = f.result().strip()
+                        except Exception as e:
+                            if m == "sql":
+                                sql_error = e
+                            else:
+                                neo_error = e
+
+                else:
+                    # Mismo particionado en ambos backends: partition_sql y partition_cypher aceptan el
+                    # mismo vocabulario (utils.constants), así que los sobrantes del LLM de Neo4j son
+                    # los mismos. Canonicalización por la SQLite. Sin diff de hechos conocidos: la
+                    # vista sale de la SQLite y Neo4j puede no tenerlos
+                    supported, leftovers = partition_sql(triplets)
+                    if opts.canonicalize:
+                        supported, register_aliases = _canonicalize(
+                            supported,
+                            _sqlite_alias_key(opts.sqlite_db_path),
+                            lambda idx: idx.seed_from_sqlite(sql.conn),
+                            extras,
+                        )
+
+                    # Plan neutro (Collector) proyectado a SqlPlan y CypherPlan
+                    col = collect_triplets(supported)
+                    det_plan = sql_plan_from_collector(col)
+                    det_cypher = cypher_plan_from_collector(col)
+                    if opts.render_sql_script:
+                        det_script = det_plan.render_script().strip()
+
+                    if leftovers:
+                        insert_leftovers_log(
+                            log_sql.conn,
+                            leftovers,
+                            run_id=run_id,
+                            stage="triplet2bd_deterministic_partition",
+                            message="Tripletas no compatibles con determinista (SQL + Neo4j)",
+                        )
+
+                    # Hybrid: un LLM por dialecto, los dos en paralelo
+                    if opts.mode == "hybrid" and leftovers:
+                        for m in modes:
+                            llm_lefts[m] = leftovers
+                            if opts.rule_templates:
+                                tpl_scripts[m], llm_lefts[m] = apply_rule_templates(log_sql.conn, leftovers, m)
+                            if llm_lefts[m]:
+                                llm_futures[m] = _submit_llm(llm_lefts[m], m, opts.llm_deadline_s)
+
+                # Neo4j en un hilo del pool, SQLite en este; un fallo no arrastra al otro
+                neo_extras: Dict[str, Any] = {}
+                neo_job: Optional[Future] = None
+                if neo_error is None:
+                    neo_job = _BACKEND_POOL.submit(
+                        _run_isolated, opts,
+                        lambda log_conn: _write_neo4j(
+                            db, opts, det_cypher, tpl_scripts["neo4j"], llm_futures["neo4j"], llm_scripts["neo4j"],
+                            leftovers, llm_lefts["neo4j"], log_conn, run_id, neo_extras,
+                        ),
+                    )
+                sql_extras: Dict[str, Any] = {}
+                sql_out = (0, llm_scripts["sql"], ExecutionReport())
+                if sql_error is None:
+                    try:
+                        sql_out = _write_sqlite(
+                            sql, opts, det_plan, tpl_scripts["sql"], llm_futures["sql"], llm_scripts["sql"],
+                            leftovers, llm_lefts["sql"], log_sql.conn, run_id, sql_extras,
+                        )
+                    except Exception as e:
+                        sql_error = e
+                neo_out = None
+                if neo_job is not None:
+                    neo_out, neo_error = neo_job.result()
+                if neo_out is None:
+                    neo_out = (0, llm_scripts["neo4j"], ExecutionReport())
+
+                for name, error in (("sql", sql_error), ("neo4j", neo_error)):
+                    if error is not None:
+                        log_event(
+                            log_sql.conn,
+                            level="ERROR",
+                            message=f"{name} write failed",
+                            run_id=run_id,
+                            stage=f"backend_{name}",
+                            reason=type(error).__name__,
+                            metadata={"error": str(error)},
+                        )
+                if sql_error is not None and neo_error is not None:
+                    raise sql_error
+                if sql_error is None and _det_written(sql_out[2]):
+                    register_aliases()   # el índice es el de la SQLite
+
+                backend_results = {
+                    "sql": _backend_result(sql_out, sql_error, det_script, sql_extras),
+                    "neo4j": _backend_result(
+                        neo_out, neo_error,
+                        det_cypher.render_script().strip() if det_cypher and opts.render_sql_script else "",
+                        neo_extras,
+                    ),
+                }
+                # Recuentos del almacén principal (SQLite; Neo4j si SQLite falló), no la suma:
+                # los dos backends escriben los mismos hechos. Detalle en backend_results
+                primary, other = (sql_out, neo_out) if sql_error is None else (neo_out, sql_out)
+                executed = primary[0]
+                llm_script = sql_out[1]
+                exec_report.merge(primary[2])
+                exec_report.timings.extend(other[2].timings)   # tiempos de ambos
+                extras.update({"run_id": run_id})
+
+            finally:
+                if db is not None:
+                    db.close()
+                sql.close()
+
+        # ======================================================
+        # BACKEND MEMORIA (grafo en proceso, solo determinista)
+        # ======================================================
+        elif opts.backend == "memory":
+            graph = get_memory_graph(opts.memory_graph)
+            if opts.mode == "llm":
+                # El LLM genera scripts SQL/Cypher: no aplicables al grafo en memoria
+                leftovers = [(t, "memory_sin_llm") for t in triplets]
+            else:
+                supported, leftovers = partition_cypher(triplets)
+                if opts.canonicalize:
+                    supported, register_aliases = _canonicalize(
+                        supported,
+                        _memory_alias_key(opts.memory_graph),
+                        lambda idx: idx.seed_from_memory(graph),
+                        extras,
+                    )
+                det_cypher = compile_cypher_plan(supported)
+                if opts.render_sql_script:
+                    det_script = det_cypher.render_script().strip()
+                executed = graph.apply_plan(det_cypher)
+                register_aliases()
+
+            if leftovers:
+                insert_leftovers_log(
+                    log_sql.conn,
+                    leftovers,
+                    run_id=run_id,
+                    stage="triplet2bd_deterministic_partition",
+                    message="Tripletas no aplicadas al grafo en memoria",
+                )
+            extras.update({"run_id": run_id, "memory_graph": opts.memory_graph, "memory_stats": graph.stats()})
+
         # ======================================================
         # BACKEND SQL (SQLite)
         # ======================================================
         else:
-            sql = SqliteClient(opts.sqlite_db_path)
+            sql = _sqlite_client(opts, "domain")
             try:
                 # Tras reset de dominio, bootstrap de tablas de negocio
-                bootstrap_sqlite(sql.conn)
+                sql.run(bootstrap_sqlite, raw=True)
 
                 # Modo
                 if opts.mode == "llm":
@@ -170,7 +770,17 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
                 else:
                     # Determinista
                     supported, leftovers = partition_sql(triplets)
-                    det_script = compile_sql_script(supported).strip()
+                    if opts.canonicalize:
+                        supported, register_aliases = _canonicalize(
+                            supported,
+                            _sqlite_alias_key(opts.sqlite_db_path),
+                            lambda idx: idx.seed_from_sqlite(sql.conn),
+                            extras,
+                        )
+                    supported = _drop_known(supported, known_facts, opts.sqlite_db_path, extras)
+                    det_plan = compile_sql_plan(supported)
+                    if opts.render_sql_script:
+                        det_script = det_plan.render_script().strip()
 
                     # Registrar leftovers siempre en SQLite (nivel WARN)
                     if leftovers:
@@ -182,19 +792,20 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
                             message="Tripletas no compatibles con determinista (SQL)",
                         )
 
-                    # Hybrid: LLM solo para sobrantes
+                    # Hybrid: LLM solo para sobrantes (en paralelo con la escritura determinista)
                     if opts.mode == "hybrid" and leftovers:
-                        llm_script = bd_from_triplets(
-                            [t for (t, _) in leftovers],
-                            modo="sql"
-                        ).strip()
-
-                # Ejecutar SQL final
-                script = "\n".join([s for s in (det_script, llm_script) if s]).strip()
-                if script:
-                    sql.executescript(script if script.endswith("\n") else script + "\n")
-                    executed = script.count(";")  # estimación simple
-
+                        llm_leftovers = leftovers
+                        if opts.rule_templates:
+                            tpl_script, llm_leftovers = apply_rule_templates(log_sql.conn, leftovers, "sql")
+                        if llm_leftovers:
+                            llm_future = _submit_llm(llm_leftovers, "sql", opts.llm_deadline_s)
+
+                executed, llm_script, exec_report = _write_sqlite(
+                    sql, opts, det_plan, tpl_script, llm_future, llm_script,
+                    leftovers, llm_leftovers, log_sql.conn, run_id, extras,
+                )
+                if _det_written(exec_report):
+                    register_aliases()
                 extras.update({"run_id": run_id})
 
             finally:
@@ -222,7 +833,7 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
     # ------------------------------------------------------------------
     # GENERAR INFORME (si se solicita)
     # ------------------------------------------------------------------
-    if opts.generate_report:
+    if opts.generate_report and opts.backend != "memory":
         report_path = (
             opts.report_path
             if opts.report_path
@@ -246,4 +857,8 @@ def run_triplets_to_bd(triplets: List[Triplet], opts: EngineOptions) -> EngineRe
         leftovers=leftovers,
         reset=opts.reset,
         extras=extras,
+        failed_statements=exec_report.failed,
+        skipped_statements=exec_report.skipped,
+        statement_timings=exec_report.timings,
+        backend_results=backend_results,
     )
@@ -2,6 +2,15 @@ from __future__ import annotations
 from typing import List, Tuple
 import json, requests, re
 from utils.config import settings
+from utils.schema_registry import (
+    prompt_nodes_cypher,
+    prompt_relations_cypher,
+    prompt_tables_sql,
+    prompt_relation_tables_sql,
+    prompt_id_rules,
+    prompt_required_props,
+    prompt_allowed_relations_sql,
+)
 
 # Utilidad simple para slug (debe replicarse en el LLM vía instrucciones)
 _slug_re = re.compile(r"[^a-z0-9]+")
@@ -27,8 +36,8 @@ SYSTEM_NEO4J = (
     "CONVERSIÓN DIRECTA DE TRIPLETAS A CYPHER - SIGUE ESTRICTAMENTE ESTAS REGLAS:\n"
     "\n"
     "ESQUEMA ÚNICO PERMITIDO:\n"
-    "NODOS: Persona{user_id, nombre, edad} | Sintoma{sintoma_id, tipo, fecha_inicio, fecha_fin, categoria, frecuencia, gravedad} | Actividad{actividad_id, nombre, categoria, frecuencia} | Medicacion{medicacion_id, tipo, periodicidad}\n"
-    "RELACIONES: (Persona)-[:TOMA]->(Medicacion) | (Persona)-[:PADECE]->(Sintoma) | (Persona)-[:REALIZA]->(Actividad)\n"
+    f"NODOS: {prompt_nodes_cypher()}\n"
+    f"RELACIONES: {prompt_relations_cypher()}\n"
     "\n"
 
     "REGLAS DE CONVERSIÓN (OBLIGATORIAS):\n"
@@ -40,19 +49,13 @@ SYSTEM_NEO4J = (
     "   - Si el verbo es 'gravedad' → asignar a propiedad 'gravedad' del sujeto\n"
     "   - Si el verbo es 'inicio' → asignar a propiedad 'fecha_inicio' del sujeto\n"
     "3. GENERACIÓN DE IDs: \n"
-    "   - Persona: 'Persona_' + slug(nombre) → user_id\n"
-    "   - Sintoma: 'Sintoma_' + slug(tipo) → sintoma_id  \n"
-    "   - Actividad: 'Actividad_' + slug(nombre) → actividad_id\n"
-    "   - Medicacion: 'Medicacion_' + slug(tipo) → medicacion_id\n"
+    + prompt_id_rules(capitalized_prefix=True) +
     "4. slug(texto): minúsculas, espacios→'_', sin acentos, sin signos\n"
     "\n"
     "REGLAS CRÍTICAS:\n"
     "  Usa siempre todas las tripletas recibidas, incluso si parecen redundantes o incompletas. Cada una debe reflejarse en el resultado Cypher siguiendo la estructura indicada."
     "  DEBES SIEMPRE establecer estas propiedades al crear nodos:\n"
-    "   - Persona.nombre (obligatorio)\n"
-    "   - Sintoma.tipo (obligatorio)\n"
-    "   - Actividad.nombre (obligatorio)\n"
-    "   - Medicacion.tipo (obligatorio)\n"
+    + prompt_required_props() +
     "\n"
     "ORDEN DE OPERACIONES CON RELACIONES OBLIGATORIO:\n"
     "  1. PRIMERO crear todos los nodos con MERGE\n"
@@ -106,8 +109,8 @@ SYSTEM_SQL = (
     "CONVERSIÓN DIRECTA DE TRIPLETAS A SQL - SIGUE ESTRICTAMENTE ESTAS REGLAS:\n"
     "\n"
     "ESQUEMA SQL ÚNICO PERMITIDO:\n"
-    "TABLAS: persona(id, user_id, nombre, edad) | sintoma(id, sintoma_id, tipo, fecha_inicio, fecha_fin, categoria, frecuencia, gravedad) | actividad(id, actividad_id, nombre, categoria, frecuencia) | medicacion(id, medicacion_id, tipo, periodicidad)\n"
-    "TABLAS RELACIONALES: persona_toma_medicacion(persona_id, medicacion_id) | persona_padece_sintoma(persona_id, sintoma_id) | persona_realiza_actividad(persona_id, actividad_id)\n"
+    f"TABLAS: {prompt_tables_sql()}\n"
+    f"TABLAS RELACIONALES: {prompt_relation_tables_sql()}\n"
     "\n"
     "REGLAS DE CONVERSIÓN (OBLIGATORIAS):\n"
     "1. PROCESAR TODAS LAS TRIPLETAS: Analiza CADA tripleta (sujeto, verbo, objeto) secuencialmente\n"
@@ -118,16 +121,11 @@ SYSTEM_SQL = (
     "   - Si el verbo es 'gravedad' → asignar a propiedad 'gravedad' del sujeto\n"
     "   - Si el verbo es 'inicio' → asignar a propiedad 'fecha_inicio' del sujeto\n"
     "3. GENERACIÓN DE IDs: \n"
-    "   - Persona: 'persona_' + slug(nombre) → user_id\n"
-    "   - Sintoma: 'sintoma_' + slug(tipo) → sintoma_id  \n"
-    "   - Actividad: 'actividad_' + slug(nombre) → actividad_id\n"
-    "   - Medicacion: 'medicacion_' + slug(tipo) → medicacion_id\n"
+    + prompt_id_rules() +
     "4. slug(texto): minúsculas, espacios→'_', sin acentos, sin signos\n"
     "\n"
     "RELACIONES PERMITIDAS (SOLO ESTAS):\n"
-    " - (Persona)-[toma]->(Medicacion) → persona_toma_medicacion\n"
-    " - (Persona)-[padece]->(Sintoma) → persona_padece_sintoma\n"
-    " - (Persona)-[realiza]->(Actividad) → persona_realiza_actividad\n"
+    + prompt_allowed_relations_sql() +
     "\n"
     "REGLAS CRÍTICAS SQL:\n"
     "  Usa siempre todas las tripletas relevantes.\n"
@@ -214,7 +212,32 @@ SYSTEM_SQL = (
 )
 
 
-def _post_chat(messages: list[dict], model: str | None = None) -> str:
+# Reparación: prompts cortos (solo esquema + formato), sin reenviar SYSTEM_SQL/SYSTEM_NEO4J
+_REPAIR_FORMAT = (
+    "Recibes una lista JSON de objetos {\"sentencia\", \"error\"} que fallaron al ejecutarse.\n"
+    "Devuelve SOLO una lista JSON de cadenas, una por entrada y en el mismo orden: la sentencia corregida "
+    "(una única sentencia, mismos valores) o \"--SKIP--\" si no tiene arreglo. Sin markdown ni explicaciones."
+)
+
+SYSTEM_REPAIR_SQL = (
+    "Corrige sentencias SQLite.\n"
+    f"TABLAS: {prompt_tables_sql(annotated=True)}\n"
+    f"RELACIONES (INSERT OR IGNORE ... SELECT por ids): {prompt_relation_tables_sql(with_copies=True)}\n"
+    + _REPAIR_FORMAT
+)
+
+SYSTEM_REPAIR_NEO4J = (
+    "Corrige sentencias Cypher (Neo4j).\n"
+    f"NODOS: {prompt_nodes_cypher(annotated=True)}\n"
+    f"RELACIONES (MATCH de ambos nodos + MERGE): {prompt_relations_cypher()}\n"
+    + _REPAIR_FORMAT
+)
+
+
+DEFAULT_TIMEOUT_S = 120
+
+
+def _post_chat(messages: list[dict], model: str | None = None, timeout: float | None = None) -> str:
     base = settings.OPENAI_API_BASE
     key = settings.OPENAI_API_KEY
     if not (base and key):
@@ -222,12 +245,13 @@ def _post_chat(messages: list[dict], model: str | None = None) -> str:
     url = f"{base}/chat/completions"
     headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
     data = {"model": model or settings.MODEL_TRIPLETAS_CYPHER, "temperature": 0, "messages": messages}
-    r = requests.post(url, headers=headers, data=json.dumps(data), timeout=120)
+    # Sin streaming el servidor no envía nada hasta terminar: el timeout de lectura acota la llamada entera
+    r = requests.post(url, headers=headers, data=json.dumps(data), timeout=timeout or DEFAULT_TIMEOUT_S)
     r.raise_for_status()
     return r.json()["choices"][0]["message"]["content"].strip()
 
 
-def bd_from_triplets(raw: List[Tuple[str, str, str]], modo: str = "neo4j") -> str:
+def bd_from_triplets(raw: List[Tuple[str, str, str]], modo: str = "neo4j", timeout: float | None = None) -> str:
 
     normalized = [(a.strip().lower(), b.strip().lower(), c.strip().lower()) for a, b, c in raw]
     lines = [f"({a}, {b}, {c})" for a, b, c in normalized]
@@ -243,5 +267,30 @@ def bd_from_triplets(raw: List[Tuple[str, str, str]], modo: str = "neo4j") -> st
         {"role": "user", "content": prompt.strip()},
     ]
 
-    script = _post_chat(messages)
+    script = _post_chat(messages, timeout=timeout)
     return script
+
+
+def repair_statements(failed: List[Tuple[str, str]], modo: str = "neo4j") -> List[str]:
+    """
+    Reenvía al modelo SOLO las sentencias fallidas con su error (prompt corto).
+    Devuelve una sentencia por entrada (corregida o "--SKIP--"); si la respuesta
+    no es una lista válida, devuelve las originales (sin cambios).
+    """
+    if not failed:
+        return []
+    system_prompt = SYSTEM_REPAIR_SQL if modo.lower() == "sql" else SYSTEM_REPAIR_NEO4J
+    payload = [{"sentencia": stmt, "error": error} for stmt, error in failed]
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+    raw = _post_chat(messages)
+    raw = re.sub(r"^```(?:json)?\s*|\s*```$", "", raw.strip())
+    try:
+        fixes = json.loads(raw)
+    except ValueError:
+        return [stmt for stmt, _ in failed]
+    if not (isinstance(fixes, list) and len(fixes) == len(failed) and all(isinstance(f, str) for f in fixes)):
+        return [stmt for stmt, _ in failed]
+    return [f.strip() for f in fixes]
@@ -0,0 +1,45 @@
+# triplets2bd/main_persona_profile.py
+from __future__ import annotations
+import argparse
+import json
+import time
+
+from .utils.sqlite_client import SqliteClient
+from .utils.schema_sqlite_bootstrap import bootstrap_sqlite
+from .utils.persona_profile import PROFILE_VERBS, load_persona_profile, rebuild_persona_profiles
+from .utils.query_cache import invalidate_queries, sql_target
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Perfil desnormalizado por persona (tabla persona_profile)")
+    p.add_argument("--sqlite-db", default="./data/users/demo.sqlite")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    rb = sub.add_parser("rebuild", help="Recalcula los perfiles (backfill); todos o los user_id indicados")
+    rb.add_argument("user_ids", nargs="*")
+
+    sh = sub.add_parser("show", help="Muestra el perfil de una persona")
+    sh.add_argument("user_id")
+
+    args = p.parse_args()
+    db = SqliteClient(args.sqlite_db)
+    try:
+        bootstrap_sqlite(db.conn)
+        if args.cmd == "rebuild":
+            start = time.perf_counter()
+            n = rebuild_persona_profiles(db.conn, args.user_ids or None)
+            invalidate_queries(sql_target(args.sqlite_db))
+            print(f"{n} perfiles reconstruidos en {time.perf_counter() - start:.2f}s")
+
+        elif args.cmd == "show":
+            profile = load_persona_profile(db.conn, args.user_id, sorted(PROFILE_VERBS))
+            if profile is None:
+                print(f"Sin perfil para {args.user_id}")
+            else:
+                data = {
+                    "persona": vars(profile.persona),
+                    **{verb: [{"id": e.key, "nombre": e.name, **dict(e.props)} for e in entities]
+                       for verb, entities in profile.related},
+                }
+                print(json.dumps(data, ensure_ascii=False, indent=2))
+    finally:
+        db.close()
@@ -0,0 +1,63 @@
+# triplets2bd/main_rule_templates.py
+from __future__ import annotations
+import argparse
+import json
+
+from .utils.sqlite_client import SqliteClient
+from .utils.rule_templates import (
+    list_rule_templates,
+    delete_rule_template,
+    evict_rule_templates,
+)
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Plantillas aprendidas del LLM para sobrantes (revisión / exportación / purga)")
+    p.add_argument("--sqlite-db", default="./data/users/demo.sqlite")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    ls = sub.add_parser("list", help="Lista las plantillas (más usadas primero)")
+    ls.add_argument("--modo", choices=["sql", "neo4j"], default=None)
+    ls.add_argument("--full", action="store_true", help="Muestra la plantilla completa")
+
+    ex = sub.add_parser("export", help="Exporta las plantillas a JSON")
+    ex.add_argument("--modo", choices=["sql", "neo4j"], default=None)
+    ex.add_argument("--out", default=None, help="Fichero de salida (por defecto stdout)")
+
+    rm = sub.add_parser("delete", help="Borra una plantilla (p.ej. tras revisarla)")
+    rm.add_argument("modo", choices=["sql", "neo4j"])
+    rm.add_argument("verbo")
+    rm.add_argument("forma", choices=["texto", "numero", "fecha"])
+
+    ev = sub.add_parser("evict", help="Borra plantillas sin uso en los últimos N días")
+    ev.add_argument("--unused-days", type=float, default=30.0)
+
+    args = p.parse_args()
+    db = SqliteClient(args.sqlite_db)
+    try:
+        if args.cmd == "list":
+            rows = list_rule_templates(db.conn, args.modo)
+            for r in rows:
+                print(f"[{r['modo']}] {r['verbo']} ({r['forma']}) hits={r['hits']} "
+                      f"último uso={r['last_used_at'] or '-'} ejemplo={r['ejemplo']}")
+                if args.full:
+                    print("    " + r["template"].replace("\n", "\n    "))
+            print(f"{len(rows)} plantillas")
+
+        elif args.cmd == "export":
+            data = json.dumps(list_rule_templates(db.conn, args.modo), ensure_ascii=False, indent=2)
+            if args.out:
+                with open(args.out, "w", encoding="utf-8") as f:
+                    f.write(data + "\n")
+                print(f"Exportadas a {args.out}")
+            else:
+                print(data)
+
+        elif args.cmd == "delete":
+            delete_rule_template(db.conn, args.modo, args.verbo, args.forma)
+            print("Plantilla borrada")
+
+        elif args.cmd == "evict":
+            n = evict_rule_templates(db.conn, args.unused_days)
+            print(f"{n} plantillas eliminadas")
+    finally:
+        db.close()
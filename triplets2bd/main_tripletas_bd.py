@@ -6,12 +6,13 @@ from typing import Optional
 
 from .utils.types import EngineOptions
 from .engine import run_triplets_to_bd
-from .utils.io import load_triplets_from_file, load_triplets_from_json_str
+from .utils.io import load_triplets_from_file, load_triplets_from_json_str, iter_triplets_from_file
+from .bulk_import import run_bulk_import, DEFAULT_CHUNK_SIZE
 from .tripletas_demo import *
 
 if __name__ == "__main__":
     p = argparse.ArgumentParser(description="Tripletas → Cypher/SQL (CLI)")
-    p.add_argument("--bd", choices=["neo4j", "sql"], default="sql")
+    p.add_argument("--bd", choices=["neo4j", "sql", "memory", "both"], default="sql")
 
     group = p.add_mutually_exclusive_group()
     group.add_argument("--llm", action="store_true", help="Solo LLM")
@@ -24,14 +25,61 @@ if __name__ == "__main__":
         help="No limpiar los registros de la tabla de log al inicio (por defecto se limpian)"
     )
     p.add_argument("--sqlite-db", default="./data/users/demo.sqlite")
+    p.add_argument(
+        "--canonicalize",
+        action="store_true",
+        help="Fusiona alias de entidades (p.ej. 'dolores de espalda' -> 'dolor de espalda') antes de compilar"
+    )
+    p.add_argument(
+        "--skip-known",
+        action="store_true",
+        help="Descarta tripletas idénticas a hechos ya guardados en la SQLite (requiere --no-reset)"
+    )
+    p.add_argument(
+        "--llm-deadline",
+        type=float,
+        default=None,
+        help="Modo híbrido: segundos máximos de espera al LLM de sobrantes (vencido -> solo se registran)"
+    )
+    p.add_argument(
+        "--llm-repair",
+        type=int,
+        default=1,
+        help="Reintentos de reparación de sentencias LLM fallidas (solo se reenvían las fallidas; 0 = desactivado)"
+    )
+    p.add_argument(
+        "--rule-templates",
+        action="store_true",
+        help="Modo híbrido: compila sobrantes con plantillas aprendidas del LLM (revisarlas con main_rule_templates)"
+    )
+    p.add_argument(
+        "--neo4j-chunk-rows",
+        type=int,
+        default=1000,
+        help="Neo4j: filas por transacción al escribir el plan determinista"
+    )
+    p.add_argument(
+        "--neo4j-sessions",
+        type=int,
+        default=1,
+        help="Neo4j: sesiones de escritura en paralelo (nodos antes que relaciones; reintento ante deadlocks)"
+    )
 
     p.add_argument("--triplets-json", type=str, help="Tripletas como JSON string")
     p.add_argument("--triplets-file", type=str, help="Ruta a fichero con tripletas")
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Importación masiva en streaming de --triplets-file (.jsonl o texto), por trozos",
+    )
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Tripletas por trozo con --stream")
 
     args = p.parse_args()
 
     mode = "llm" if args.llm else ("deterministic" if args.no_llm else "hybrid")
-    triplets = (
+    if args.stream and not args.triplets_file:
+        p.error("--stream requiere --triplets-file")
+    triplets = [] if args.stream else (
         load_triplets_from_json_str(args.triplets_json) if args.triplets_json else
         load_triplets_from_file(args.triplets_file) if args.triplets_file else
         RAW_TRIPLES_DEMO4
@@ -43,8 +91,24 @@ if __name__ == "__main__":
         reset=not args.no_reset,
         reset_log=not args.no_reset_log,   # <- por defecto True, se desactiva con --no-reset-log
         sqlite_db_path=args.sqlite_db,
+        canonicalize=args.canonicalize,
+        skip_known_facts=args.skip_known,
+        llm_deadline_s=args.llm_deadline,
+        llm_repair_attempts=args.llm_repair,
+        rule_templates=args.rule_templates,
+        neo4j_chunk_rows=args.neo4j_chunk_rows,
+        neo4j_sessions=args.neo4j_sessions,
     )
 
+    if args.stream:
+        bulk = run_bulk_import(iter_triplets_from_file(args.triplets_file), opts, chunk_size=args.chunk_size)
+        print(
+            f"Backend={bulk.backend} | modo={bulk.mode} | tripletas={bulk.rows} | trozos={bulk.chunks} | "
+            f"ejecutadas={bulk.executed_statements} | sobrantes={bulk.leftovers} | "
+            f"tiempo={bulk.elapsed_s:.2f}s | {bulk.rows_per_s:,.0f} tripletas/s"
+        )
+        raise SystemExit(0)
+
     start = time.perf_counter()
     res = run_triplets_to_bd(triplets, opts)
     elapsed = time.perf_counter() - start
@@ -54,13 +118,38 @@ if __name__ == "__main__":
         f"reset_bd={'sí' if res.reset else 'no'} | "
         f"reset_log={'sí' if opts.reset_log else 'no'} | "
         f"run_id={res.run_id} | ejecutadas={res.executed_statements} | "
+        f"fallidas={res.failed_statements} | omitidas={res.skipped_statements} | "
         f"tiempo={elapsed:.2f}s"
     )
 
-    if res.det_script:
-        print("\n─── Script determinista ───\n" + res.det_script)
-    if res.llm_script:
-        print("\n─── Script LLM ───\n" + res.llm_script)
+    if res.backend_results:
+        # backend "both": resultado y scripts por backend
+        for name, r in res.backend_results.items():
+            print(
+                f"\n─── {name} ─── ejecutadas={r['executed']} | fallidas={r['failed']} | "
+                f"omitidas={r['skipped']}" + (f" | error={r['error']}" if r["error"] else "")
+            )
+            if r["det_script"]:
+                print("\n─── Script determinista ───\n" + r["det_script"])
+            if r["llm_script"]:
+                print("\n─── Script LLM ───\n" + r["llm_script"])
+    else:
+        if res.det_script:
+            print("\n─── Script determinista ───\n" + res.det_script)
+        if res.llm_script:
+            print("\n─── Script LLM ───\n" + res.llm_script)
+    if res.extras.get("aliases"):
+        print("\n─── Alias fusionados ───")
+        for original, canonical in res.extras["aliases"]:
+            print(f"{original} -> {canonical}")
+    if res.extras.get("memory_stats"):
+        print("\n─── Grafo en memoria ───")
+        for k, v in res.extras["memory_stats"].items():
+            print(f"{k}: {v}")
+    if res.extras.get("known_dropped"):
+        print("\n─── Ya guardadas (descartadas) ───")
+        for t in res.extras["known_dropped"]:
+            print(t)
     if res.leftovers:
         print("\n─── Sobrantes (no ejecutados determinista) ───")
         for (s, v, o), reason in res.leftovers:
@@ -0,0 +1,227 @@
+# triplets2bd/query.py
+"""
+Lecturas tipadas sobre el almacén de dominio (SQLite o Neo4j), con caché.
+
+    get_profile(user_id)            -> PersonaProfile | None
+    meds_for(user_id)               -> medicaciones de la persona
+    persons_with_symptom(tipo)      -> personas que padecen ese síntoma
+    persons_with(verbo, nombre)     -> genérico para cualquier relación del registro
+
+Las consultas salen de utils.schema_registry y siguen los caminos cubiertos por
+índices (migración v3 en SQLite; claves únicas e índice por nombre en Neo4j). En
+SQLite el perfil se lee de persona_profile (v4), una búsqueda por PRIMARY KEY.
+Los resultados son inmutables y se guardan en utils.query_cache con etiquetas
+por entidad; run_triplets_to_bd invalida solo las lecturas afectadas.
+"""
+from __future__ import annotations
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .utils.types import Backend, PersonaProfile, PersonaRef, RelatedEntity
+from .utils.query_cache import cached, neo4j_target, sql_target, tag
+from .utils.persona_profile import PROFILE_VERBS, load_persona_profile
+from .triplets2sql_rule_based.helpers import slugify
+from utils.schema_registry import NODES, RELATIONS
+
+DEFAULT_SQLITE_DB = "./data/users/demo.sqlite"
+_PERSONA = NODES["persona"]
+
+# ---------------- SQLite ----------------
+_SQL_PERSONA = f"SELECT id, user_id, {', '.join(_PERSONA.prop_names)} FROM persona WHERE user_id = ?"
+
+# verbo -> SELECT de las entidades relacionadas con una persona (por persona.id)
+_SQL_RELATED: Dict[str, str] = {
+    verb: (
+        f"SELECT x.{NODES[r.target].key}, x.{', x.'.join(NODES[r.target].prop_names)} "
+        f"FROM {r.table} l JOIN {r.target} x ON x.id = l.{NODES[r.target].key} "
+        f"WHERE l.persona_id = ? ORDER BY x.{NODES[r.target].name_prop}"
+    )
+    for verb, r in RELATIONS.items()
+}
+
+# verbo -> SELECT de las personas relacionadas con una entidad (por nombre)
+_SQL_PERSONS_WITH: Dict[str, str] = {
+    verb: (
+        f"SELECT p.user_id, p.nombre, p.edad FROM {r.target} x "
+        f"JOIN {r.table} l ON l.{NODES[r.target].key} = x.id "
+        f"JOIN persona p ON p.id = l.persona_id "
+        f"WHERE x.{NODES[r.target].name_prop} = ? ORDER BY p.user_id"
+    )
+    for verb, r in RELATIONS.items()
+}
+
+
+def _sqlite_read(path: str, fn) -> Any:
+    """fn(conn) sobre una conexión de solo lectura (None si la BD o el esquema aún no existen)."""
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        return fn(conn)
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def _related_entity(etype: str, row: Tuple[Any, ...]) -> RelatedEntity:
+    n = NODES[etype]
+    values = dict(zip(n.prop_names, row[1:]))
+    return RelatedEntity(
+        etype=etype,
+        key=row[0],
+        name=values.pop(n.name_prop),
+        props=tuple((p, values[p]) for p in n.updatable_props),
+    )
+
+
+def _sql_related(conn: sqlite3.Connection, persona_id: int, verbs: Iterable[str]) -> Tuple[Tuple[str, Tuple[RelatedEntity, ...]], ...]:
+    return tuple(
+        (verb, tuple(_related_entity(RELATIONS[verb].target, row) for row in conn.execute(_SQL_RELATED[verb], (persona_id,))))
+        for verb in verbs
+    )
+
+
+def _sql_profile(conn: sqlite3.Connection, user_id: str, verbs: Tuple[str, ...]) -> Optional[PersonaProfile]:
+    # Perfil materializado (persona_profile, v4): una búsqueda por PRIMARY KEY
+    if PROFILE_VERBS.issuperset(verbs):
+        try:
+            return load_persona_profile(conn, user_id, verbs)
+        except sqlite3.OperationalError:
+            pass   # BD aún sin migrar a v4: joins
+    row = conn.execute(_SQL_PERSONA, (user_id,)).fetchone()
+    if row is None:
+        return None
+    return PersonaProfile(persona=PersonaRef(row[1], row[2], row[3]), related=_sql_related(conn, row[0], verbs))
+
+
+# ---------------- Neo4j ----------------
+_CY_PERSONA = f"MATCH (p:{_PERSONA.label} {{{_PERSONA.key}: $user_id}}) "
+
+_CY_RELATED: Dict[str, str] = {
+    verb: (
+        _CY_PERSONA
+        + f"MATCH (p)-[:{r.rel_type}]->(x:{NODES[r.target].label}) "
+        + f"RETURN x.{NODES[r.target].key} AS key, "
+        + ", ".join(f"x.{c} AS {c}" for c in NODES[r.target].prop_names)
+        + f" ORDER BY x.{NODES[r.target].name_prop}"
+    )
+    for verb, r in RELATIONS.items()
+}
+
+_CY_PERSONS_WITH: Dict[str, str] = {
+    verb: (
+        f"MATCH (p:{_PERSONA.label})-[:{r.rel_type}]->"
+        f"(x:{NODES[r.target].label} {{{NODES[r.target].name_prop}: $name}}) "
+        f"RETURN DISTINCT p.user_id AS user_id, p.nombre AS nombre, p.edad AS edad ORDER BY user_id"
+    )
+    for verb, r in RELATIONS.items()
+}
+
+
+def _neo4j_client():
+    from .utils.neo4j_client import Neo4jClient
+    return Neo4jClient(shared=True)
+
+
+def _cy_related(db, user_id: str, verbs: Iterable[str]) -> Tuple[Tuple[str, Tuple[RelatedEntity, ...]], ...]:
+    out = []
+    for verb in verbs:
+        etype = RELATIONS[verb].target
+        cols = NODES[etype].prop_names
+        rows = db.read(_CY_RELATED[verb], {"user_id": user_id})
+        out.append((verb, tuple(_related_entity(etype, (r["key"], *(r[c] for c in cols))) for r in rows)))
+    return tuple(out)
+
+
+def _cy_profile(db, user_id: str, verbs: Tuple[str, ...]) -> Optional[PersonaProfile]:
+    rows = db.read(
+        _CY_PERSONA + "RETURN " + ", ".join(f"p.{c} AS {c}" for c in (_PERSONA.key,) + _PERSONA.prop_names),
+        {"user_id": user_id},
+    )
+    if not rows:
+        return None
+    r = rows[0]
+    return PersonaProfile(persona=PersonaRef(r["user_id"], r["nombre"], r["edad"]), related=_cy_related(db, user_id, verbs))
+
+
+# ---------------- API ----------------
+def _target(backend: Backend, sqlite_db_path: str, db) -> Tuple[str, str]:
+    if backend == "neo4j":
+        return neo4j_target(db.key[0])
+    if backend != "sql":
+        raise ValueError(f"backend de lectura no soportado: {backend}")
+    return sql_target(sqlite_db_path)
+
+
+def _profile_tags(user_id: str, profile: Optional[PersonaProfile]) -> List[str]:
+    tags = [tag("persona", user_id)]
+    if profile is not None:
+        tags += [tag(e.etype, e.key) for _, entities in profile.related for e in entities]
+    return tags
+
+
+def get_profile(
+    user_id: str,
+    backend: Backend = "sql",
+    sqlite_db_path: str = DEFAULT_SQLITE_DB,
+    verbs: Optional[Iterable[str]] = None,
+) -> Optional[PersonaProfile]:
+    """Persona y sus entidades relacionadas (todas las relaciones del registro o `verbs`)."""
+    user_id = user_id.strip().lower()
+    verbs = tuple(verbs) if verbs is not None else tuple(RELATIONS)
+    db = _neo4j_client() if backend == "neo4j" else None
+
+    def load():
+        if db is not None:
+            profile = _cy_profile(db, user_id, verbs)
+        else:
+            profile = _sqlite_read(sqlite_db_path, lambda c: _sql_profile(c, user_id, verbs))
+        return profile, _profile_tags(user_id, profile)
+
+    return cached(_target(backend, sqlite_db_path, db), ("profile", user_id, verbs), load)
+
+
+def related_for(
+    user_id: str,
+    verb: str,
+    backend: Backend = "sql",
+    sqlite_db_path: str = DEFAULT_SQLITE_DB,
+) -> Tuple[RelatedEntity, ...]:
+    """Entidades de una relación (`verb`) de la persona; vacío si no existe."""
+    profile = get_profile(user_id, backend, sqlite_db_path, verbs=(verb,))
+    return profile.get(verb) if profile is not None else ()
+
+
+def meds_for(user_id: str, backend: Backend = "sql", sqlite_db_path: str = DEFAULT_SQLITE_DB) -> Tuple[RelatedEntity, ...]:
+    return related_for(user_id, "toma", backend, sqlite_db_path)
+
+
+def persons_with(
+    verb: str,
+    name: str,
+    backend: Backend = "sql",
+    sqlite_db_path: str = DEFAULT_SQLITE_DB,
+) -> Tuple[PersonaRef, ...]:
+    """Personas con una relación `verb` hacia la entidad llamada `name` (p.ej. padece 'temblor')."""
+    name = name.strip().lower()
+    etype = RELATIONS[verb].target
+    db = _neo4j_client() if backend == "neo4j" else None
+
+    def load():
+        if db is not None:
+            rows = [(r["user_id"], r["nombre"], r["edad"]) for r in db.read(_CY_PERSONS_WITH[verb], {"name": name})]
+        else:
+            rows = _sqlite_read(sqlite_db_path, lambda c: c.execute(_SQL_PERSONS_WITH[verb], (name,)).fetchall()) or []
+        persons = tuple(PersonaRef(*row) for row in rows)
+        # El id de la entidad sale del nombre (mismo slug que el compilador): una relación
+        # nueva hacia ella invalida la lectura aunque hoy no exista
+        tags = [tag(etype, f"{etype}_{slugify(name)}")] + [tag("persona", p.user_id) for p in persons]
+        return persons, tags
+
+    return cached(_target(backend, sqlite_db_path, db), ("persons_with", verb, name), load)
+
+
+def persons_with_symptom(tipo: str, backend: Backend = "sql", sqlite_db_path: str = DEFAULT_SQLITE_DB) -> Tuple[PersonaRef, ...]:
+    return persons_with("padece", tipo, backend, sqlite_db_path)
@@ -0,0 +1,46 @@
+# triplets2bd/tests/conftest.py
+from __future__ import annotations
+import threading
+
+import pytest
+
+from triplets2bd import engine
+
+
+class FakeNeo4j:
+    """Neo4jClient de pega: guarda las transacciones; `fail_on` hace fallar las que lo contienen."""
+
+    key = ("bolt://fake", "neo4j")
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.transactions = []
+        self.plans = []
+        self._lock = threading.Lock()
+
+    def write(self, query, params=None):
+        return []
+
+    def write_many(self, statements):
+        if self.fail_on and any(self.fail_on in q for q, _ in statements):
+            raise RuntimeError(f"fallo en: {self.fail_on}")
+        with self._lock:
+            self.transactions.append([q for q, _ in statements])
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_neo4j(monkeypatch):
+    """Sustituye Neo4j en el motor; write_plan anota el plan en lugar de escribirlo."""
+    db = FakeNeo4j()
+
+    def write_plan(client, plan, *args):
+        client.plans.append(plan)
+        return {"rows": plan.row_count}
+
+    monkeypatch.setattr(engine, "Neo4jClient", lambda shared=True: db)
+    monkeypatch.setattr(engine, "bootstrap_neo4j", lambda client: None)
+    monkeypatch.setattr(engine, "write_plan", write_plan)
+    return db
@@ -0,0 +1,51 @@
+# triplets2bd/tests/test_both_backends.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd import engine
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.triplets2cypher_rule_based.helpers import partition_triplets_strict as partition_cypher
+from triplets2bd.triplets2sql_rule_based.helpers import partition_triplets_strict as partition_sql
+from triplets2bd.utils.types import EngineOptions
+
+_TRIPLETS = [
+    ("ana", "padece", "temblor"),
+    ("temblor", "gravedad", "leve"),
+    ("ana", "tiene", "72 años"),
+    ("ana", "vive en", "sevilla"),   # sobrante
+]
+
+
+def _opts(db: str, **kwargs) -> EngineOptions:
+    return EngineOptions(
+        backend="both", mode="deterministic", sqlite_db_path=db, reset=False,
+        generate_report=False, **kwargs,
+    )
+
+
+def test_ejecutadas_son_las_de_sqlite_no_la_suma(tmp_path, fake_neo4j):
+    db = str(tmp_path / "dominio.sqlite")
+    res = run_triplets_to_bd(_TRIPLETS, _opts(db))
+    sql = res.backend_results["sql"]
+    neo = res.backend_results["neo4j"]
+    assert sql["error"] is None and neo["error"] is None
+    assert sql["executed"] == neo["executed"] == 3
+    assert res.executed_statements == 3
+    assert len(fake_neo4j.plans) == 1
+
+
+def test_sin_sqlite_cuentan_las_de_neo4j(tmp_path, fake_neo4j, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+
+    def broken(*args, **kwargs):
+        raise sqlite3.OperationalError("disco lleno")
+
+    monkeypatch.setattr(engine, "_write_sqlite", broken)
+    res = run_triplets_to_bd(_TRIPLETS, _opts(db))
+    assert res.backend_results["sql"]["error"] == "OperationalError: disco lleno"
+    assert res.executed_statements == res.backend_results["neo4j"]["executed"] == 3
+
+
+def test_particionado_igual_en_ambos_dialectos():
+    # backend="both" envía los sobrantes de SQL también al LLM de Neo4j
+    assert partition_sql(_TRIPLETS) == partition_cypher(_TRIPLETS)
@@ -0,0 +1,79 @@
+# triplets2bd/tests/test_bulk_import.py
+from __future__ import annotations
+import json
+import sqlite3
+
+import pytest
+
+from triplets2bd import bulk_import
+from triplets2bd.bulk_import import _AnchorCache, run_bulk_import
+from triplets2bd.utils.io import chunked, iter_triplets_from_file
+from triplets2bd.utils.types import EngineOptions
+
+
+def _opts(db: str) -> EngineOptions:
+    return EngineOptions(backend="sql", mode="deterministic", sqlite_db_path=db, reset=True, generate_report=False)
+
+
+def _gen(n: int):
+    """Generador: la importación no necesita la entrada entera en memoria."""
+    for i in range(n):
+        yield (f"persona {i}", "padece", f"sintoma {i % 7}")
+        yield (f"sintoma {i % 7}", "gravedad", "leve")
+
+
+def test_importacion_por_trozos(tmp_path):
+    db = str(tmp_path / "dominio.sqlite")
+    seen = []
+    res = run_bulk_import(_gen(50), _opts(db), chunk_size=30, progress=lambda *a: seen.append(a), progress_every=2)
+    assert (res.rows, res.chunks, res.leftovers) == (100, 4, 0)
+    assert [c for c, _, _ in seen] == [2, 4]
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT count(*) FROM persona").fetchone()[0] == 50
+    assert conn.execute("SELECT count(*) FROM persona_padece_sintoma").fetchone()[0] == 50
+    assert {r[0] for r in conn.execute("SELECT gravedad FROM sintoma")} == {"leve"}
+    conn.close()
+
+
+def test_reset_solo_en_el_primer_trozo(tmp_path, monkeypatch):
+    calls = []
+    real = bulk_import.run_triplets_to_bd
+
+    def spy(triplets, opts):
+        calls.append((opts.reset, opts.generate_report, opts.render_sql_script))
+        return real(triplets, opts)
+
+    monkeypatch.setattr(bulk_import, "run_triplets_to_bd", spy)
+    run_bulk_import(_gen(10), _opts(str(tmp_path / "d.sqlite")), chunk_size=8, progress=None)
+    assert calls == [(True, False, False)] + [(False, False, False)] * 2
+
+
+def test_propiedad_en_otro_trozo_que_su_relacion(tmp_path):
+    db = str(tmp_path / "dominio.sqlite")
+    triplets = [("ana", "padece", "mareos"), ("luis", "realiza", "yoga"), ("mareos", "gravedad", "grave")]
+    res = run_bulk_import(triplets, _opts(db), chunk_size=2, progress=None)
+    assert res.leftovers == 0
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT tipo, gravedad FROM sintoma").fetchall() == [("mareos", "grave")]
+    conn.close()
+
+
+def test_cache_de_anclajes_acotada():
+    cache = _AnchorCache(max_size=2)
+    cache.complete([("ana", "padece", "a"), ("ana", "padece", "b"), ("ana", "padece", "c")])
+    assert cache.complete([("a", "gravedad", "leve")]) == [("a", "gravedad", "leve")]   # expulsado
+    assert cache.complete([("c", "gravedad", "leve")]) == [("ana", "padece", "c"), ("c", "gravedad", "leve")]
+
+
+def test_chunk_size_invalido():
+    with pytest.raises(ValueError):
+        run_bulk_import([], _opts(":memory:"), chunk_size=0)
+
+
+def test_lectura_en_streaming(tmp_path):
+    path = tmp_path / "t.jsonl"
+    path.write_text("\n".join(json.dumps([f"p{i}", "padece", "x"]) for i in range(5)) + "\n\n", encoding="utf-8")
+    assert [len(c) for c in chunked(iter_triplets_from_file(str(path)), 2)] == [2, 2, 1]
+    txt = tmp_path / "t.txt"
+    txt.write_text("(ana, toma, ibuprofeno)\nluis, realiza, yoga\n", encoding="utf-8")
+    assert list(iter_triplets_from_file(str(txt))) == [("ana", "toma", "ibuprofeno"), ("luis", "realiza", "yoga")]
@@ -0,0 +1,64 @@
+# triplets2bd/tests/test_canonicalize.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd.canonicalize import AliasIndex, canonicalize_triplets, drop_alias_index, signature
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.utils.types import EngineOptions
+
+
+def test_firma_ignora_tildes_stopwords_y_plurales():
+    assert signature("Dolores de Espalda") == signature("dolor espalda") == {"dolor", "espalda"}
+    assert signature("natación") == signature("natacion")
+
+
+def test_alias_del_lote_acaban_en_el_mismo_nombre():
+    out, rewrites, new = canonicalize_triplets(
+        [
+            ("ana", "padece", "dolor de espalda"),
+            ("luis", "padece", "dolores de espalda"),
+            ("dolor espalda", "gravedad", "leve"),
+        ],
+        AliasIndex(),
+    )
+    assert out == [
+        ("ana", "padece", "dolor de espalda"),
+        ("luis", "padece", "dolor de espalda"),
+        ("dolor de espalda", "gravedad", "leve"),
+    ]
+    assert ("dolores de espalda", "dolor de espalda") in rewrites
+    assert new == [("sintoma", "dolor de espalda")]
+
+
+def test_una_raiz_de_mas_es_otra_entidad():
+    index = AliasIndex(threshold=0.5)
+    index.add("sintoma", "dolor de espalda")
+    assert index.lookup("sintoma", "dolor de espalda baja") is None
+    index.add("sintoma", "dolor lumbar fuerte")
+    # Sustituir una raíz solo con umbral < 1 (Jaccard 2/4)
+    assert index.lookup("sintoma", "dolor lumbar intenso") == "dolor lumbar fuerte"
+    assert AliasIndex().lookup("sintoma", "dolor lumbar intenso") is None
+
+
+def test_el_indice_de_proceso_no_cambia_hasta_confirmar():
+    index = AliasIndex()
+    canonicalize_triplets([("ana", "toma", "Ibuprofenos")], index)
+    assert len(index) == 0
+
+
+def test_motor_fusiona_con_nombres_ya_guardados(tmp_path):
+    db = str(tmp_path / "dominio.sqlite")
+    drop_alias_index(db)
+    opts = dict(backend="sql", mode="deterministic", sqlite_db_path=db, reset=False,
+                generate_report=False, canonicalize=True)
+    run_triplets_to_bd([("ana", "padece", "dolor de espalda")], EngineOptions(**opts))
+    res = run_triplets_to_bd(
+        [("luis", "padece", "dolores de espalda"), ("dolores espalda", "gravedad", "leve")],
+        EngineOptions(**opts),
+    )
+    assert ("dolores de espalda", "dolor de espalda") in res.extras["aliases"]
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT tipo, gravedad FROM sintoma").fetchall() == [("dolor de espalda", "leve")]
+    assert conn.execute("SELECT count(*) FROM persona_padece_sintoma").fetchone()[0] == 2
+    conn.close()
+    drop_alias_index(db)
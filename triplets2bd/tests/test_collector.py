@@ -0,0 +1,80 @@
+# triplets2bd/tests/test_collector.py
+from __future__ import annotations
+import sys
+
+from triplets2bd.triplets2sql_rule_based import Collector, plan_from_collector
+from triplets2bd.triplets2cypher_rule_based import models as cypher_models
+
+
+def test_add_deduplica_por_tipo_y_texto_canonico():
+    col = Collector()
+    row = col.add("persona", "  Ana López ")
+    assert col.add("persona", "ana lópez") == row
+    assert col.add("sintoma", "ana lópez") == 0          # mismo texto, otro tipo: otra tabla
+    assert col.find("persona", "ana lópez") == row
+    assert col.find("persona", "Ana López") is None     # find espera el texto canónico
+    table = col.tables["persona"]
+    assert table.key(row) == "persona_ana_lopez"
+    assert table.get(row, "nombre") == "Ana López"
+    assert col.tables["sintoma"].get(0, "tipo") == "ana lópez"
+    assert len(col) == 2
+
+
+def test_columnas_fijas_y_props_fuera_del_esquema():
+    col = Collector()
+    row = col.add("medicacion", "Levodopa")
+    col.set("medicacion", row, "periodicidad", "cada 8 horas")
+    col.set("medicacion", row, "dosis", "100 mg")        # no es columna: va a extra
+    col.set("medicacion", row, "periodicidad", None)     # None no pisa
+    table = col.tables["medicacion"]
+    assert table.row_tuple(row) == ("medicacion_levodopa", "levodopa", "cada 8 horas")
+    assert table.row_dict(row) == {
+        "medicacion_id": "medicacion_levodopa", "tipo": "levodopa", "periodicidad": "cada 8 horas",
+    }
+    assert table.get(row, "dosis") == "100 mg"
+    # Valores internados: dos filas comparten el mismo objeto str
+    other = col.add("medicacion", "Rasagilina")
+    col.set("medicacion", other, "periodicidad", "".join(["cada 8 ", "horas"]))
+    assert table.get(other, "periodicidad") is table.get(row, "periodicidad")
+    assert table.key(row) is sys.intern("medicacion_levodopa")
+
+
+def test_iter_rows_ordenado_y_relaciones_por_id():
+    col = Collector()
+    for name in ("zoe", "ana"):
+        p = col.add("persona", name)
+        col.relate("PADECE", p, "sintoma", col.add("sintoma", "temblor"))
+    assert [(e, t.key(r)) for e, t, r in col.iter_rows()] == [
+        ("persona", "persona_ana"), ("persona", "persona_zoe"), ("sintoma", "sintoma_temblor"),
+    ]
+    assert col.relations == [
+        ("PADECE", "persona_zoe", "sintoma_temblor"), ("PADECE", "persona_ana", "sintoma_temblor"),
+    ]
+
+
+def test_api_por_objeto_sobre_las_filas():
+    col = Collector()
+    ent = col.sintoma_by_type("Temblor")
+    ent.set("gravedad", "leve")
+    ent.set("periodicidad", "diaria")
+    assert ent.id == "sintoma_temblor" and ent.key == "sintoma_id" and ent.etype == "sintoma"
+    assert ent.props == {"sintoma_id": "sintoma_temblor", "tipo": "temblor",
+                         "gravedad": "leve", "periodicidad": "diaria"}
+    assert col.sintoma_index == {"temblor": "sintoma_temblor"}
+    assert col.persona_index == {}
+    assert list(col.entities) == [("sintoma", "sintoma_temblor")]
+    assert col.tables["sintoma"].get(0, "gravedad") == "leve"   # la vista escribe en la tabla
+
+
+def test_collector_compartido_por_los_generadores():
+    assert cypher_models.Collector is Collector
+    col = Collector()
+    p = col.add("persona", "ana")
+    col.set("persona", p, "edad", 72)
+    col.relate("PADECE", p, "sintoma", col.add("sintoma", "temblor"))
+    col.prop_only.add(("actividad", col.tables["actividad"].key(col.add("actividad", "yoga"))))
+    plan = plan_from_collector(col)
+    rows = {sql.split()[2] if sql.startswith("INSERT INTO") else sql.split()[4]: r for sql, r in plan.batches()}
+    assert rows["persona"] == [("persona_ana", "ana", 72)]
+    assert "actividad" not in rows          # solo prop_only: el SqlPlan no la escribe
+    assert plan.statement_count == 3
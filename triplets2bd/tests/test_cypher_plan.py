@@ -0,0 +1,54 @@
+# triplets2bd/tests/test_cypher_plan.py
+from __future__ import annotations
+
+from triplets2bd.triplets2cypher_rule_based import CypherPlan, compile_cypher_plan, compile_cypher_script
+from triplets2bd.triplets2cypher_rule_based.plan import NODE_STATEMENTS, REL_STATEMENTS
+
+TRIPLETS = [
+    ("Ana López", "padece", "Dolor de espalda"),
+    ("dolor de espalda", "gravedad", "leve"),
+    ("Ana López", "tiene", "72 años"),
+    ("Ana López", "realiza", "Natación"),
+    ("o'neil", "realiza", "yoga"),
+    ("luis", "realiza", "yoga"),
+]
+
+
+def test_filas_agrupadas_por_etiqueta_y_relacion():
+    plan = compile_cypher_plan(TRIPLETS)
+    assert sorted(plan.node_rows) == ["actividad", "persona", "sintoma"]
+    assert [r["user_id"] for r in plan.node_rows["persona"]] == ["persona_ana_lopez", "persona_luis", "persona_oneil"]
+    assert plan.node_rows["persona"][0]["edad"] == 72
+    assert plan.rel_rows["REALIZA"] == [
+        {"left": "persona_ana_lopez", "right": "actividad_natacion"},
+        {"left": "persona_luis", "right": "actividad_yoga"},
+        {"left": "persona_oneil", "right": "actividad_yoga"},
+    ]
+    # Mismas escrituras que el script literal: una sentencia por fila
+    assert plan.row_count == len([s for s in compile_cypher_script(TRIPLETS).split(";\n") if s.strip()])
+
+
+def test_sentencias_fijas_y_parametrizadas():
+    plan = compile_cypher_plan(TRIPLETS)
+    stmts = {stmt for stmt, _ in plan.batches()}
+    assert stmts == {NODE_STATEMENTS[e] for e in plan.node_rows} | {REL_STATEMENTS[t] for t in plan.rel_rows}
+    for stmt in stmts:
+        assert stmt.startswith("UNWIND $rows AS r ")
+        assert "'" not in stmt   # sin literales: el texto no cambia entre runs (plan cacheado)
+    assert "coalesce(r.gravedad, n.gravedad)" in NODE_STATEMENTS["sintoma"]
+
+
+def test_lotes_nodos_antes_que_relaciones_y_acotados():
+    plan = compile_cypher_plan(TRIPLETS)
+    batches = plan.batches(batch_size=2)
+    kinds = ["rel" if "MATCH" in stmt else "node" for stmt, _ in batches]
+    assert kinds == sorted(kinds, key=lambda k: k == "rel")
+    assert all(len(params["rows"]) <= 2 for _, params in batches)
+    assert sum(len(params["rows"]) for _, params in batches) == plan.row_count
+
+
+def test_plan_vacio_y_serializacion():
+    assert not compile_cypher_plan([])
+    assert compile_cypher_plan([]).batches() == []
+    plan = compile_cypher_plan(TRIPLETS)
+    assert CypherPlan.from_dict(plan.to_dict()) == plan
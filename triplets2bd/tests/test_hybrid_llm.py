@@ -0,0 +1,80 @@
+# triplets2bd/tests/test_hybrid_llm.py
+from __future__ import annotations
+import sqlite3
+import time
+
+import pytest
+
+from triplets2bd import engine
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.utils.types import EngineOptions
+
+_TRIPLETS = [("ana", "padece", "temblor"), ("ana", "vive en", "sevilla")]   # la 2ª es sobrante
+
+
+def _opts(db: str, **kwargs) -> EngineOptions:
+    return EngineOptions(
+        backend="sql", mode="hybrid", sqlite_db_path=db, reset=False,
+        generate_report=False, llm_repair_attempts=0, **kwargs,
+    )
+
+
+def _log_reasons(db: str, stage: str):
+    conn = sqlite3.connect(db)
+    try:
+        return [r[0] for r in conn.execute("SELECT reason FROM log WHERE stage = ?", (stage,))]
+    finally:
+        conn.close()
+
+
+def _personas(db: str):
+    conn = sqlite3.connect(db)
+    try:
+        return [r[0] for r in conn.execute("SELECT user_id FROM persona")]
+    finally:
+        conn.close()
+
+
+def test_plazo_vencido_confirma_lo_determinista(tmp_path, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+    calls = []
+
+    def slow_llm(triplets, modo, timeout=None):
+        calls.append((modo, timeout))
+        time.sleep(0.5)
+        return "INSERT INTO persona (user_id, nombre) VALUES ('x', 'x');"
+
+    monkeypatch.setattr(engine, "bd_from_triplets", slow_llm)
+    t0 = time.perf_counter()
+    res = run_triplets_to_bd(_TRIPLETS, _opts(db, llm_deadline_s=0.1))
+    assert time.perf_counter() - t0 < 0.45
+    assert res.extras["llm_deadline_exceeded"] is True
+    assert res.llm_script == ""
+    # El timeout de la llamada HTTP es el mismo plazo: el hilo no queda ocupado después
+    assert calls == [("sql", 0.1)]
+    assert _personas(db) == ["persona_ana"]
+    assert _log_reasons(db, "triplet2bd_llm_fallback") == ["llm_deadline"]
+
+
+def test_error_del_llm_no_anula_el_run(tmp_path, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+
+    def broken_llm(triplets, modo, timeout=None):
+        raise RuntimeError("sin servidor")
+
+    monkeypatch.setattr(engine, "bd_from_triplets", broken_llm)
+    res = run_triplets_to_bd(_TRIPLETS, _opts(db))
+    assert res.extras["llm_error"] == "RuntimeError: sin servidor"
+    assert res.executed_statements == 3
+    assert _personas(db) == ["persona_ana"]
+    assert _log_reasons(db, "triplet2bd_llm_fallback") == ["llm_error"]
+
+
+def test_respuesta_a_tiempo_se_aplica(tmp_path, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+    script = "INSERT OR IGNORE INTO persona (user_id, nombre) VALUES ('persona_luis', 'luis');"
+    monkeypatch.setattr(engine, "bd_from_triplets", lambda triplets, modo, timeout=None: script)
+    res = run_triplets_to_bd(_TRIPLETS, _opts(db, llm_deadline_s=5))
+    assert "llm_deadline_exceeded" not in res.extras
+    assert res.llm_script == script
+    assert sorted(_personas(db)) == ["persona_ana", "persona_luis"]
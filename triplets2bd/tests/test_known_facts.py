@@ -0,0 +1,72 @@
+# triplets2bd/tests/test_known_facts.py
+from __future__ import annotations
+
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.utils.known_facts import KnownFacts
+from triplets2bd.utils.shards import get_shard_manager
+from triplets2bd.utils.types import EngineOptions
+
+
+def _known() -> KnownFacts:
+    kf = KnownFacts(user_id="ana")
+    kf.add("ana", "padece", "temblor")
+    kf.add("ana", "tiene", "80")
+    kf.add("temblor", "gravedad", "leve")
+    return kf
+
+
+def test_diff_descarta_lo_conocido_con_nombres_normalizados():
+    keep, dropped = _known().diff([
+        ("Ana", "padece", "Témblor"),
+        ("ana", "tiene", "80 años"),
+        ("ana", "toma", "paracetamol"),
+    ])
+    assert keep == [("ana", "toma", "paracetamol")]
+    assert dropped == [("Ana", "padece", "Témblor"), ("ana", "tiene", "80 años")]
+
+
+def test_diff_conserva_la_relacion_de_una_propiedad_nueva():
+    keep, dropped = _known().diff([
+        ("ana", "padece", "temblor"),
+        ("temblor", "gravedad", "alta"),
+    ])
+    assert keep == [("ana", "padece", "temblor"), ("temblor", "gravedad", "alta")]
+    assert dropped == []
+
+
+def test_diff_recupera_la_relacion_conocida_si_falta_en_el_lote():
+    keep, dropped = _known().diff([("temblor", "frecuencia", "diaria")])
+    assert keep == [("temblor", "frecuencia", "diaria"), ("ana", "padece", "temblor")]
+    assert dropped == []
+
+
+def test_diff_sin_clave_o_vacio():
+    kf = _known()
+    assert kf.diff([("ana", "dice", "hola")]) == ([("ana", "dice", "hola")], [])
+    assert KnownFacts().diff([("ana", "padece", "temblor")]) == ([("ana", "padece", "temblor")], [])
+
+
+def test_relevant_por_palabras_completas():
+    kf = KnownFacts()
+    kf.add("ana", "padece", "mareo")
+    kf.add("luis", "toma", "paracetamol")
+    assert kf.relevant("Mañana iré al médico") == []
+    assert kf.relevant("Ana dice que los mareos siguen") == [("ana", "padece", "mareo")]
+    assert kf.relevant("le han quitado el paracetamol.") == [("luis", "toma", "paracetamol")]
+    assert kf.prompt_block("nada que ver") == ""
+
+
+def test_vista_por_persona_con_shard_de_otro_usuario(tmp_path):
+    opts = EngineOptions(
+        backend="sql", mode="deterministic", reset=False, generate_report=False,
+        shards_dir=str(tmp_path), shard_user="user_base",
+        skip_known_facts=True, facts_user_id="persona_ana",
+    )
+    try:
+        first = run_triplets_to_bd([("ana", "padece", "temblor")], opts)
+        again = run_triplets_to_bd([("ana", "padece", "temblor"), ("ana", "toma", "paracetamol")], opts)
+    finally:
+        get_shard_manager(str(tmp_path)).close_all()
+    assert (tmp_path / "base.sqlite").exists()
+    assert "known_dropped" not in first.extras
+    assert again.extras["known_dropped"] == [("ana", "padece", "temblor")]
@@ -0,0 +1,92 @@
+# triplets2bd/tests/test_llm_repair.py
+from __future__ import annotations
+import sqlite3
+
+import pytest
+
+from triplets2bd import engine
+from triplets2bd.utils.sql_executor import execute_run
+from triplets2bd.utils.types import EngineOptions
+
+OK1 = "INSERT INTO t VALUES (1);"
+OK3 = "INSERT INTO t VALUES (3);"
+BAD = "INSERT INTO t VALUE (2);"
+FIXED = "INSERT INTO t VALUES (2);"
+
+
+@pytest.fixture
+def conn():
+    c = sqlite3.connect(":memory:")
+    c.execute("CREATE TABLE t (a INTEGER)")
+    yield c
+    c.close()
+
+
+def _repair(conn, stmts, attempts=1):
+    extras = {}
+    stmts, report = engine._execute_llm_with_repair(
+        stmts, lambda items: execute_run(conn, None, items), "sql",
+        EngineOptions(llm_repair_attempts=attempts), extras,
+    )
+    return stmts, report, extras
+
+
+def _rows(conn):
+    return sorted(r[0] for r in conn.execute("SELECT a FROM t"))
+
+
+def test_sentencias_repetidas_cuentan_por_posicion(conn, monkeypatch):
+    asked = []
+
+    def repair(failing, modo):
+        asked.append([s for s, _ in failing])
+        return [FIXED if s == BAD else s for s, _ in failing]
+
+    monkeypatch.setattr(engine, "repair_statements", repair)
+    stmts, report, extras = _repair(conn, [OK1, BAD, OK3, BAD])
+    assert asked == [[BAD, BAD]]
+    assert stmts == [OK1, FIXED, OK3, FIXED]
+    assert (report.executed, report.failed, report.errors) == (4, 0, [])
+    assert extras["llm_repair"] == {"attempts": 1, "still_failing": 0}
+    assert _rows(conn) == [1, 2, 2, 3, 3]        # OK3 se reejecuta tras la primera reparada
+
+
+def test_skip_y_fallo_que_sigue(conn, monkeypatch):
+    other = "INSERT INTO nope VALUES (1);"
+    monkeypatch.setattr(
+        engine, "repair_statements",
+        lambda failing, modo: ["--SKIP--" if s == BAD else s for s, _ in failing],
+    )
+    stmts, report, _ = _repair(conn, [BAD, OK1, other], attempts=2)
+    assert stmts == [OK1, other]
+    assert (report.executed, report.failed, report.skipped) == (1, 1, 1)
+    assert [(e["sql"], e["item"]) for e in report.errors] == [(other, 1)]
+
+
+def test_reparada_de_la_que_dependen_las_siguientes(conn, monkeypatch):
+    create = "CREAT TABLE u (a);"
+    monkeypatch.setattr(
+        engine, "repair_statements", lambda failing, modo: [s.replace("CREAT ", "CREATE ") for s, _ in failing]
+    )
+    stmts, report, _ = _repair(conn, [create, "INSERT INTO u VALUES (1);"])
+    assert stmts[0] == "CREATE TABLE u (a);"
+    assert (report.executed, report.failed) == (2, 0)
+    assert conn.execute("SELECT COUNT(*) FROM u").fetchone() == (1,)
+
+
+def test_sin_llm_de_reparacion(conn, monkeypatch):
+    def down(failing, modo):
+        raise RuntimeError("no llm")
+
+    monkeypatch.setattr(engine, "repair_statements", down)
+    stmts, report, extras = _repair(conn, [OK1, BAD])
+    assert stmts == [OK1, BAD]
+    assert (report.executed, report.failed) == (1, 1)
+    assert extras["llm_repair_error"] == "RuntimeError: no llm"
+
+
+def test_sin_fallos_no_pide_reparacion(conn, monkeypatch):
+    monkeypatch.setattr(engine, "repair_statements", lambda failing, modo: pytest.fail("no debería llamarse"))
+    _, report, extras = _repair(conn, [OK1, OK3])
+    assert (report.executed, report.failed) == (2, 0)
+    assert "llm_repair" not in extras
@@ -0,0 +1,57 @@
+# triplets2bd/tests/test_memory_graph.py
+from __future__ import annotations
+
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.memory_graph import MemoryGraph
+
+BASE = [
+    ("Ana", "padece", "Mareos"),
+    ("mareos", "gravedad", "leve"),
+    ("mareos", "inicio", "01/02/2024"),
+    ("Ana", "toma", "Ibuprofeno"),
+]
+
+
+def _graph(*batches):
+    g = MemoryGraph()
+    for batch in batches:
+        g.apply_triplets(batch)
+    return g
+
+
+def test_upsert_null_conserva_y_actualiza_props():
+    g = _graph(BASE, [("mareos", "gravedad", "grave"), ("Ana", "padece", "mareos")])
+    node = g.nodes("sintoma")[0]
+    assert node["gravedad"] == "grave"
+    assert node["fecha_inicio"] == "2024-02-01"   # el segundo lote no trae fecha: se conserva
+
+
+def test_relacion_sin_extremo_no_se_crea():
+    g = MemoryGraph()
+    assert g.merge_edge("PADECE", "persona_ana", "no_existe") is False
+    assert list(g.edges()) == []
+
+
+def test_to_sql_plan_igual_que_compile_sql_plan():
+    assert _graph(BASE).to_sql_plan() == compile_sql_plan(BASE)
+
+
+def test_nodo_de_propiedad_aislada_no_se_exporta_a_sql():
+    aislada = [("cefalea", "gravedad", "leve")]
+    g = _graph(BASE + aislada)
+    assert g.node("sintoma", "sintoma_cefalea") is not None   # como en Neo4j
+    assert g.to_sql_plan() == compile_sql_plan(BASE + aislada)
+    assert "cefalea" not in str(g.to_sql_plan().entity_rows)
+
+
+def test_nodo_aislado_pasa_a_entidad_cuando_llega_su_relacion():
+    g = _graph([("cefalea", "gravedad", "leve")], [("Ana", "padece", "cefalea")])
+    rows = g.to_sql_plan().entity_rows["sintoma"]
+    assert len(rows) == 1 and "leve" in rows[0]
+
+
+def test_node_devuelve_copia():
+    g = _graph(BASE)
+    key = g.nodes("persona")[0]["user_id"]
+    g.node("persona", key)["nombre"] = "otro"
+    assert g.node("persona", key)["nombre"] != "otro"
@@ -0,0 +1,56 @@
+# triplets2bd/tests/test_neo4j_templates.py
+from __future__ import annotations
+import json
+import sqlite3
+
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.utils.rule_templates import ensure_rule_template_table
+from triplets2bd.utils.sql_executor import EXECUTE_STAGE
+from triplets2bd.utils.types import EngineOptions
+
+_TRIPLETS = [
+    ("ana", "padece", "temblor"),
+    ("ana", "vive en", "sevilla"),
+    ("ana", "trabaja en", "correos"),
+]
+
+
+def _seed(db: str) -> None:
+    conn = sqlite3.connect(db)
+    ensure_rule_template_table(conn)
+    conn.executemany(
+        "INSERT INTO rule_template (modo, verbo, forma, template, created_at) VALUES ('neo4j', ?, 'texto', ?, 'x')",
+        [
+            ("vive_en", "MERGE (c:Ciudad {nombre: '{{o|title}}'});\nMATCH (p:Persona {user_id: 'persona_{{s|slug}}'}) SET p.ciudad = '{{o}}';"),
+            ("trabaja_en", "MERGE (e:Empresa {nombre: '{{o}}'}) SET e.roto = BOOM;"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_plantillas_cypher_aisladas_y_registradas(tmp_path, fake_neo4j):
+    db = str(tmp_path / "dominio.sqlite")
+    _seed(db)
+    fake_neo4j.fail_on = "BOOM"
+    opts = EngineOptions(
+        backend="neo4j", mode="hybrid", sqlite_db_path=db, reset=False,
+        generate_report=False, rule_templates=True,
+    )
+    res = run_triplets_to_bd(_TRIPLETS, opts)
+
+    assert res.extras["rule_templates"] == 2
+    # Cada sentencia en su transacción: la plantilla rota no se lleva a las buenas
+    assert fake_neo4j.transactions == [
+        ["MERGE (c:Ciudad {nombre: 'Sevilla'})"],
+        ["MATCH (p:Persona {user_id: 'persona_ana'}) SET p.ciudad = 'sevilla'"],
+    ]
+    assert res.failed_statements == 1
+    assert res.executed_statements == fake_neo4j.plans[0].row_count + 2
+
+    conn = sqlite3.connect(db)
+    rows = conn.execute("SELECT level, metadata FROM log WHERE stage = ?", (EXECUTE_STAGE,)).fetchall()
+    conn.close()
+    assert [(level, json.loads(meta)["failed_object"]) for level, meta in rows] == [
+        ("WARN", "MERGE (e:Empresa {nombre: 'correos'}) SET e.roto = BOOM"),
+    ]
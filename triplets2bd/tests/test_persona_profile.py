@@ -0,0 +1,93 @@
+# triplets2bd/tests/test_persona_profile.py
+from __future__ import annotations
+import json
+import sqlite3
+
+from triplets2bd.query import _sql_related
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.persona_profile import PROFILE_VERBS, load_persona_profile, rebuild_persona_profiles
+from triplets2bd.utils.schema_sqlite_bootstrap import bootstrap_sqlite
+
+
+def _conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    bootstrap_sqlite(conn)
+    return conn
+
+
+def _write(conn, triplets) -> None:
+    with conn:
+        compile_sql_plan(triplets).execute(conn)
+
+
+def _lists(conn, user_id: str):
+    row = conn.execute(
+        "SELECT nombre, edad, medicaciones, sintomas, actividades FROM persona_profile WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    return row and (row[0], row[1], *[[x[next(iter(x))] for x in json.loads(raw)] for raw in row[2:]])
+
+
+def test_alta_de_persona_y_relaciones():
+    conn = _conn()
+    _write(conn, [("ana", "tiene", "72 años")])
+    assert _lists(conn, "persona_ana") == ("ana", 72, [], [], [])
+    _write(conn, [("ana", "padece", "temblor"), ("ana", "padece", "insomnio"), ("ana", "toma", "levodopa")])
+    assert _lists(conn, "persona_ana") == (
+        "ana", 72, ["medicacion_levodopa"], ["sintoma_insomnio", "sintoma_temblor"], [],
+    )
+
+
+def test_borrar_relacion_y_persona():
+    conn = _conn()
+    _write(conn, [("ana", "padece", "temblor"), ("ana", "padece", "insomnio")])
+    with conn:
+        conn.execute(
+            "DELETE FROM persona_padece_sintoma WHERE sintoma_id = (SELECT id FROM sintoma WHERE tipo = 'temblor')"
+        )
+    assert _lists(conn, "persona_ana")[3] == ["sintoma_insomnio"]
+    with conn:
+        conn.execute("DELETE FROM persona_padece_sintoma")
+        conn.execute("DELETE FROM persona WHERE user_id = 'persona_ana'")
+    assert conn.execute("SELECT COUNT(*) FROM persona_profile").fetchone()[0] == 0
+
+
+def test_cambio_del_destino_refresca_las_personas_enlazadas():
+    conn = _conn()
+    _write(conn, [("ana", "padece", "temblor"), ("luis", "padece", "temblor"), ("eva", "tiene", "30 años")])
+    # El lote de luis actualiza el síntoma compartido: también cambia el perfil de ana
+    _write(conn, [("luis", "padece", "temblor"), ("temblor", "gravedad", "leve")])
+    for user_id in ("persona_ana", "persona_luis"):
+        (item,) = json.loads(conn.execute(
+            "SELECT sintomas FROM persona_profile WHERE user_id = ?", (user_id,)).fetchone()[0])
+        assert item["gravedad"] == "leve"
+    assert _lists(conn, "persona_eva")[3] == []
+
+
+def test_upsert_repetido_no_dispara():
+    conn = _conn()
+    facts = [("ana", "padece", "temblor"), ("temblor", "gravedad", "leve"), ("ana", "tiene", "72 años")]
+    _write(conn, facts)
+    before = conn.total_changes
+    _write(conn, facts)
+    assert conn.total_changes == before
+
+
+def test_lectura_igual_que_los_joins_y_rebuild():
+    conn = _conn()
+    _write(conn, [
+        ("ana", "padece", "temblor"), ("temblor", "gravedad", "leve"), ("ana", "toma", "levodopa"),
+        ("levodopa", "periodicidad", "cada 8 horas"), ("ana", "realiza", "natación"),
+    ])
+    verbs = tuple(sorted(PROFILE_VERBS))
+    profile = load_persona_profile(conn, "persona_ana", verbs)
+    persona_id = conn.execute("SELECT id FROM persona WHERE user_id = 'persona_ana'").fetchone()[0]
+    assert profile.related == _sql_related(conn, persona_id, verbs)
+    assert load_persona_profile(conn, "persona_nadie", verbs) is None
+
+    # Escritura con el perfil desincronizado (p. ej. triggers desactivados): rebuild lo repara
+    with conn:
+        conn.execute("UPDATE persona_profile SET sintomas = '[]', nombre = 'x'")
+        conn.execute("INSERT INTO persona_profile (user_id, persona_id) VALUES ('persona_huerfana', 999)")
+    assert rebuild_persona_profiles(conn) == 1
+    assert load_persona_profile(conn, "persona_ana", verbs) == profile
+    assert load_persona_profile(conn, "persona_huerfana", verbs) is None
@@ -0,0 +1,65 @@
+# triplets2bd/tests/test_query_cache.py
+from __future__ import annotations
+
+import pytest
+
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.query_cache import cached, invalidate_queries, sql_plan_tags, sql_target, tag
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache():
+    invalidate_queries()
+    yield
+    invalidate_queries()
+
+
+def _loader(value, tags, calls):
+    def load():
+        calls.append(value)
+        return value, tags
+    return load
+
+
+def test_invalidacion_por_etiqueta_solo_afecta_a_sus_lecturas(tmp_path):
+    target = sql_target(str(tmp_path / "a.sqlite"))
+    calls = []
+    cached(target, "ana", _loader("ana", [tag("persona", "persona_ana")], calls))
+    cached(target, "luis", _loader("luis", [tag("persona", "persona_luis")], calls))
+    cached(target, "ana", _loader("ana", [], calls))
+    assert calls == ["ana", "luis"]
+
+    assert invalidate_queries(target, [tag("persona", "persona_ana")]) == 1
+    cached(target, "ana", _loader("ana", [], calls))
+    cached(target, "luis", _loader("luis", [], calls))
+    assert calls == ["ana", "luis", "ana"]
+
+
+def test_invalidacion_no_cruza_destinos(tmp_path):
+    a, b = sql_target(str(tmp_path / "a.sqlite")), sql_target(str(tmp_path / "b.sqlite"))
+    calls = []
+    t = [tag("persona", "persona_ana")]
+    cached(a, "ana", _loader("a", t, calls))
+    cached(b, "ana", _loader("b", t, calls))
+    invalidate_queries(a, t)
+    assert cached(b, "ana", _loader("b2", t, calls)) == "b"
+    assert cached(a, "ana", _loader("a2", t, calls)) == "a2"
+
+
+def test_carga_concurrente_con_escritura_no_se_cachea(tmp_path):
+    target = sql_target(str(tmp_path / "a.sqlite"))
+
+    def load():
+        invalidate_queries(target, ["persona:persona_ana"])   # escritura mientras se lee
+        return "viejo", [tag("persona", "persona_ana")]
+
+    assert cached(target, "ana", load) == "viejo"
+    assert cached(target, "ana", lambda: ("nuevo", [])) == "nuevo"
+
+
+def test_etiquetas_de_un_plan_sql():
+    plan = compile_sql_plan([("ana", "padece", "temblor"), ("ana", "toma", "paracetamol")])
+    assert sql_plan_tags(plan) == {
+        "persona:persona_ana", "sintoma:sintoma_temblor", "medicacion:medicacion_paracetamol",
+    }
+    assert sql_plan_tags(None) == set()
@@ -0,0 +1,86 @@
+# triplets2bd/tests/test_rule_templates.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd import engine
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.utils.rule_templates import (
+    apply_rule_templates, evict_rule_templates, extract_templates, learn_rule_templates,
+    list_rule_templates, render_template, template_key,
+)
+from triplets2bd.utils.types import EngineOptions
+
+VIVE = (("ana", "vive en", "sevilla"), "verbo_no_permitido")
+SCRIPT = "INSERT INTO ciudad (user_id, nombre) VALUES ('persona_ana', 'sevilla');"
+
+
+def test_extrae_plantilla_parametrizada():
+    learned = extract_templates([VIVE], SCRIPT, "sql")
+    tpl, example = learned[("sql", "vive_en", "texto")]
+    assert tpl == "INSERT INTO ciudad (user_id, nombre) VALUES ('persona_{{s|slug}}', '{{o}}');"
+    assert example == VIVE[0]
+    assert render_template(tpl, ("María José", "vive en", "A Coruña"), "sql") == (
+        "INSERT INTO ciudad (user_id, nombre) VALUES ('persona_maria_jose', 'a coruña');"
+    )
+
+
+def test_no_aprende_lo_ambiguo_ni_lo_destructivo():
+    assert extract_templates([VIVE], "DELETE FROM ciudad WHERE nombre = 'sevilla';", "sql") == {}
+    tiene = (("ana", "tiene", "gato"), "tiene_sin_edad")
+    assert extract_templates([tiene], "INSERT INTO mascota VALUES ('persona_ana', 'gato');", "sql") == {}
+    # Una sentencia con los objetos de dos sobrantes no se puede atribuir a ninguno
+    otro = (("ana", "trabaja en", "correos"), "verbo_no_permitido")
+    shared = "INSERT INTO ficha VALUES ('persona_ana', 'sevilla', 'correos');"
+    assert extract_templates([VIVE, otro], shared, "sql") == {}
+
+
+def test_aplica_plantillas_y_cuenta_usos(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "log.sqlite"))
+    assert learn_rule_templates(conn, [VIVE], SCRIPT, "sql") == 1
+    pending = (("luis", "conduce", "taxi"), "verbo_no_permitido")
+    script, rest = apply_rule_templates(conn, [(("luis", "vive en", "madrid"), "verbo_no_permitido"), pending], "sql")
+    assert script == "INSERT INTO ciudad (user_id, nombre) VALUES ('persona_luis', 'madrid');"
+    assert rest == [pending]
+    assert list_rule_templates(conn, "sql")[0]["hits"] == 1
+    assert apply_rule_templates(conn, [VIVE], "neo4j") == ("", [VIVE])   # por dialecto
+    assert template_key(("x", "Vive en", "12"), "sql") == ("sql", "vive_en", "numero")
+    assert evict_rule_templates(conn, unused_days=-1) == 1
+
+
+def test_motor_aprende_y_despues_no_llama_al_llm(tmp_path, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE ciudad (user_id TEXT, nombre TEXT)")
+    conn.commit()
+    conn.close()
+    calls = []
+
+    def llm(triplets, modo, timeout=None):
+        calls.append(triplets)
+        return SCRIPT
+
+    monkeypatch.setattr(engine, "bd_from_triplets", llm)
+    opts = EngineOptions(backend="sql", mode="hybrid", sqlite_db_path=db, reset=False,
+                         generate_report=False, rule_templates=True, llm_repair_attempts=0)
+    run_triplets_to_bd([("ana", "padece", "temblor"), VIVE[0]], opts)
+    res = run_triplets_to_bd([("luis", "padece", "temblor"), ("luis", "vive en", "cádiz")], opts)
+
+    assert len(calls) == 1
+    assert res.extras["rule_templates"] == 1
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT user_id, nombre FROM ciudad ORDER BY 1").fetchall() == [
+        ("persona_ana", "sevilla"), ("persona_luis", "cádiz"),
+    ]
+    conn.close()
+
+
+def test_no_aprende_si_el_script_falla(tmp_path, monkeypatch):
+    db = str(tmp_path / "dominio.sqlite")
+    monkeypatch.setattr(engine, "bd_from_triplets", lambda triplets, modo, timeout=None: SCRIPT)   # sin tabla
+    opts = EngineOptions(backend="sql", mode="hybrid", sqlite_db_path=db, reset=False,
+                         generate_report=False, rule_templates=True, llm_repair_attempts=0)
+    res = run_triplets_to_bd([VIVE[0]], opts)
+    assert res.failed_statements == 1
+    conn = sqlite3.connect(db)
+    assert list_rule_templates(conn) == []
+    conn.close()
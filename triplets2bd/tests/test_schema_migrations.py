@@ -0,0 +1,92 @@
+# triplets2bd/tests/test_schema_migrations.py
+from __future__ import annotations
+import json
+import sqlite3
+
+import pytest
+
+from triplets2bd.utils.schema_sqlite_bootstrap import (
+    DDL, MIGRATIONS, SCHEMA_VERSION, bootstrap_sqlite, schema_version, split_sql_statements,
+)
+
+
+def _v1(path) -> sqlite3.Connection:
+    """BD en v1 (DDL original) con una persona y un síntoma ya guardados."""
+    conn = sqlite3.connect(str(path))
+    conn.executescript(DDL)
+    conn.execute("PRAGMA user_version = 1")
+    conn.execute("INSERT INTO persona (user_id, nombre, edad) VALUES ('persona_ana', 'Ana', 70)")
+    conn.execute("INSERT INTO sintoma (sintoma_id, tipo, gravedad) VALUES ('sintoma_temblor', 'temblor', 'leve')")
+    conn.execute("INSERT INTO persona_padece_sintoma (persona_id, sintoma_id) VALUES (1, 1)")
+    conn.commit()
+    return conn
+
+
+def _names(conn, kind: str):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def test_migra_de_v1_a_la_ultima_version(tmp_path):
+    conn = _v1(tmp_path / "v1.sqlite")
+    assert bootstrap_sqlite(conn) == SCHEMA_VERSION == schema_version(conn)
+
+    # v2: los triggers de updated_at solo actúan si el UPDATE no lo fijó
+    trigger = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'trg_persona_updated'").fetchone()[0]
+    assert "WHEN" in trigger
+    # v3: índices cubrientes en lugar de los de persona_id
+    indexes = _names(conn, "index")
+    assert {"idx_padece_sintoma_persona", "idx_toma_medicacion_persona"} <= indexes
+    assert not {"idx_persona_user_id", "idx_padece_persona"} & indexes
+    # v4: persona_profile relleno con los datos que ya había
+    nombre, sintomas = conn.execute("SELECT nombre, sintomas FROM persona_profile").fetchone()
+    assert nombre == "Ana"
+    assert [s["tipo"] for s in json.loads(sintomas)] == ["temblor"]
+
+
+def test_bd_anterior_al_versionado_se_adopta(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "v0.sqlite"))
+    conn.executescript(DDL)   # user_version = 0 pero con las tablas ya creadas
+    conn.execute("INSERT INTO persona (user_id, nombre) VALUES ('persona_luis', 'Luis')")
+    conn.commit()
+    assert bootstrap_sqlite(conn) == SCHEMA_VERSION
+    assert conn.execute("SELECT user_id FROM persona_profile").fetchall() == [("persona_luis",)]
+
+
+def test_al_dia_no_ejecuta_ddl(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "d.sqlite"))
+    bootstrap_sqlite(conn)
+    seen = []
+    conn.set_trace_callback(seen.append)
+    assert bootstrap_sqlite(conn) == SCHEMA_VERSION
+    assert seen == ["PRAGMA user_version"]
+
+
+def test_no_confirma_la_transaccion_del_llamador(tmp_path):
+    path = str(tmp_path / "t.sqlite")
+    conn = _v1(path)
+    conn.execute("INSERT INTO persona (user_id, nombre) VALUES ('persona_eva', 'Eva')")
+    assert conn.in_transaction
+    with pytest.raises(RuntimeError):
+        bootstrap_sqlite(conn)
+    assert conn.in_transaction
+    conn.rollback()
+    assert schema_version(conn) == 1
+    assert conn.execute("SELECT count(*) FROM persona").fetchone()[0] == 1
+
+
+def test_fallo_en_un_paso_revierte_la_migracion(tmp_path, monkeypatch):
+    from triplets2bd.utils import schema_sqlite_bootstrap as boot
+    conn = _v1(tmp_path / "f.sqlite")
+    monkeypatch.setattr(boot, "MIGRATIONS", MIGRATIONS[:2] + [(3, "CREATE INDEX x ON no_existe(a);")])
+    monkeypatch.setattr(boot, "SCHEMA_VERSION", 3)
+    with pytest.raises(sqlite3.OperationalError):
+        boot.bootstrap_sqlite(conn)
+    assert schema_version(conn) == 1
+    assert "WHEN" not in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'trg_persona_updated'").fetchone()[0]
+
+
+def test_pasos_ordenados_y_divisibles():
+    versions = [v for v, _ in MIGRATIONS]
+    assert versions == list(range(1, len(MIGRATIONS) + 1))
+    for _, script in MIGRATIONS:
+        assert all(sqlite3.complete_statement(st) for st in split_sql_statements(script) if not st.startswith("--"))
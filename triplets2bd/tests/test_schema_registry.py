@@ -0,0 +1,43 @@
+# triplets2bd/tests/test_schema_registry.py
+from __future__ import annotations
+import sqlite3
+
+import pytest
+
+from triplets2bd.llm_triplets_to_bd import SYSTEM_REPAIR_SQL
+from triplets2bd.utils.schema_sqlite_bootstrap import bootstrap_sqlite
+from utils.schema_registry import NODES, PropSpec
+
+
+def test_check_in_con_literales_entre_comillas():
+    spec = PropSpec("gravedad", allowed=("leve", "o'brien"))
+    assert spec.sql_check() == "gravedad IN ('leve','o''brien')"
+    assert PropSpec("edad", "INTEGER", min_value=0).sql_check() == "edad >= 0"
+    assert PropSpec("nombre").sql_check() is None
+
+
+@pytest.mark.parametrize("etype", list(NODES))
+def test_checks_del_registro_son_sql_valido(etype):
+    conn = sqlite3.connect(":memory:")
+    for p in NODES[etype].props:
+        check = p.sql_check()
+        if check is None:
+            continue
+        conn.execute(f"CREATE TABLE t_{p.name} ({p.name} {p.sql_type} CHECK ({check}))")
+        ok = p.allowed[0] if p.allowed else p.min_value
+        conn.execute(f"INSERT INTO t_{p.name} VALUES (?)", (ok,))
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute(f"INSERT INTO t_{p.name} VALUES (?)", ("no_permitido" if p.allowed else -1,))
+
+
+def test_checks_coinciden_con_el_ddl():
+    conn = sqlite3.connect(":memory:")
+    bootstrap_sqlite(conn)
+    ddl = "".join(conn.execute("SELECT sql FROM sqlite_master WHERE name = 'sintoma'").fetchone()[0].split())
+    for p in NODES["sintoma"].props:
+        if p.allowed:
+            assert "".join(p.sql_check().split()) in ddl
+
+
+def test_prompt_de_reparacion_con_valores_citados():
+    assert "gravedad IN ('leve','moderada','grave')" in SYSTEM_REPAIR_SQL
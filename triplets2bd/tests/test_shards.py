@@ -0,0 +1,88 @@
+# triplets2bd/tests/test_shards.py
+from __future__ import annotations
+import sqlite3
+
+import pytest
+
+from triplets2bd.utils.shards import ShardManager, list_shards, shard_id
+
+
+def _conn_of(manager: ShardManager, user: str) -> sqlite3.Connection:
+    with manager.connection(user) as c:
+        return c.conn
+
+
+def _closed(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("SELECT 1")
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+
+def test_shard_id_estable():
+    assert shard_id("user_Ana García") == shard_id("persona_ana_garcia") == "ana_garcia"
+    assert shard_id("  ") == "default"
+
+
+def test_reutiliza_la_conexion_del_usuario(tmp_path):
+    m = ShardManager(str(tmp_path))
+    assert _conn_of(m, "ana") is _conn_of(m, "user_ana")
+    assert [sid for sid, _ in list_shards(str(tmp_path))] == ["ana"]
+
+
+def test_lru_cierra_el_shard_menos_usado(tmp_path):
+    m = ShardManager(str(tmp_path), max_open=2)
+    a = _conn_of(m, "ana")
+    b = _conn_of(m, "bea")
+    _conn_of(m, "ana")            # ana pasa a ser la más reciente
+    c = _conn_of(m, "carla")
+    assert len(m) == 2
+    assert _closed(b)
+    assert not _closed(a) and not _closed(c)
+
+
+def test_no_cierra_shards_prestados(tmp_path):
+    m = ShardManager(str(tmp_path), max_open=1)
+    with m.connection("ana") as held:
+        _conn_of(m, "bea")
+        _conn_of(m, "carla")
+        held.conn.execute("SELECT count(*) FROM persona")   # sigue abierta
+        assert not _closed(held.conn)
+
+
+def test_cierre_por_inactividad(tmp_path):
+    m = ShardManager(str(tmp_path), idle_close_s=0.0)
+    conn = _conn_of(m, "ana")
+    assert m.close_idle() == 1
+    assert _closed(conn) and len(m) == 0
+
+
+def test_devolver_revierte_transaccion_abierta(tmp_path):
+    m = ShardManager(str(tmp_path))
+    with m.connection("ana") as c:
+        c.conn.execute("INSERT INTO persona (user_id, nombre) VALUES ('persona_ana', 'Ana')")
+    with m.connection("ana") as c:
+        assert c.conn.execute("SELECT count(*) FROM persona").fetchone()[0] == 0
+
+
+def test_consultas_entre_shards(tmp_path):
+    m = ShardManager(str(tmp_path))
+    for user in ("ana", "bea"):
+        with m.connection(user) as c:
+            c.conn.execute("INSERT INTO persona (user_id, nombre) VALUES (?, ?)", (f"persona_{user}", user))
+            c.conn.commit()
+    assert m.query_all("SELECT nombre FROM persona") == [("ana", ("ana",)), ("bea", ("bea",))]
+    assert m.counts()["bea"]["persona"] == 1
+    m.close_all()
+    assert len(m) == 0
+
+
+def test_error_al_abrir_no_deja_prestamo(tmp_path):
+    blocker = tmp_path / "no_dir"
+    blocker.write_text("fichero, no directorio")
+    m = ShardManager(str(blocker))
+    with pytest.raises(OSError):
+        m.client("ana")
+    m.close_all()   # conserva solo los shards con préstamos
+    assert len(m) == 0
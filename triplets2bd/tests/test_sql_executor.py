@@ -0,0 +1,72 @@
+# triplets2bd/tests/test_sql_executor.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.schema_sqlite_bootstrap import bootstrap_sqlite, split_sql_statements
+from triplets2bd.utils.sql_executor import execute_run, is_skippable
+
+
+def _conn(tmp_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(tmp_path / "dominio.sqlite"))
+    bootstrap_sqlite(conn)
+    conn.execute("CREATE TABLE nota (texto TEXT)")
+    conn.commit()
+    return conn
+
+
+def test_split_respeta_punto_y_coma_entre_comillas():
+    script = "INSERT INTO nota VALUES ('a;b'); INSERT INTO nota VALUES (\"c;d\");\n-- fin; sin sentencia\n"
+    assert split_sql_statements(script) == [
+        "INSERT INTO nota VALUES ('a;b');",
+        "INSERT INTO nota VALUES (\"c;d\");",
+        "-- fin; sin sentencia",
+    ]
+
+
+def test_split_no_corta_triggers():
+    script = "CREATE TRIGGER t AFTER INSERT ON nota BEGIN SELECT 1; SELECT 2; END; SELECT 3;"
+    assert len(split_sql_statements(script)) == 2
+
+
+def test_skippable_control_de_transaccion_y_comentarios():
+    assert is_skippable("BEGIN;")
+    assert is_skippable("commit")
+    assert is_skippable("-- solo comentario")
+    assert is_skippable("/* nada */ ;")
+    assert not is_skippable("INSERT INTO nota VALUES ('begin')")
+
+
+def test_execute_run_recuentos(tmp_path):
+    conn = _conn(tmp_path)
+    plan = compile_sql_plan([("ana", "padece", "temblor"), ("ana", "tiene", "80")])
+    script = (
+        "BEGIN TRANSACTION;\n"
+        "INSERT INTO nota VALUES ('uno; dos');\n"
+        "INSERT INTO tabla_que_no_existe VALUES (1);\n"
+        "INSERT INTO nota VALUES ('tres');\n"
+        "COMMIT;\n"
+    )
+    report = execute_run(conn, plan, [("llm", script)])
+
+    assert report.skipped == 2                        # BEGIN y COMMIT
+    assert report.failed == 1
+    assert [e["source"] for e in report.errors] == ["llm"]
+    assert "tabla_que_no_existe" in report.errors[0]["sql"]
+    assert report.executed == plan.statement_count + 2
+    assert not conn.in_transaction                    # transacción propia confirmada
+    # La sentencia fallida se deshace sola; el resto del run queda escrito
+    assert [r[0] for r in conn.execute("SELECT texto FROM nota ORDER BY rowid")] == ["uno; dos", "tres"]
+    assert conn.execute("SELECT nombre, edad FROM persona WHERE user_id = 'persona_ana'").fetchone() == ("ana", 80)
+    conn.close()
+
+
+def test_execute_run_usa_la_transaccion_abierta(tmp_path):
+    conn = _conn(tmp_path)
+    conn.execute("BEGIN IMMEDIATE")
+    report = execute_run(conn, None, [("llm", "INSERT INTO nota VALUES ('x');")])
+    assert report.executed == 1
+    assert conn.in_transaction                        # no confirma la transacción del llamante
+    conn.rollback()
+    assert conn.execute("SELECT COUNT(*) FROM nota").fetchone() == (0,)
+    conn.close()
@@ -0,0 +1,140 @@
+# triplets2bd/tests/test_sql_plan.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.schema_sqlite_bootstrap import bootstrap_sqlite
+
+TRIPLETS = [
+    ("Ana López", "padece", "Dolor de espalda"),
+    ("dolor de espalda", "gravedad", "leve"),
+    ("dolor de espalda", "inicio", "05/03/2024"),
+    ("Ana López", "tiene", "72 años"),
+    ("Ana López", "toma", "Levodopa"),
+    ("levodopa", "periodicidad", "cada 8 horas"),
+    ("Ana López", "realiza", "Natación"),
+    ("natación", "frecuencia", "diaria"),
+    ("o'neil", "realiza", "yoga"),
+]
+
+# Script literal que generaba compile_sql_script para TRIPLETS antes del plan parametrizado
+OLD_SCRIPT = """\
+INSERT INTO actividad (actividad_id, nombre, categoria, frecuencia) VALUES ('actividad_natacion', 'natación', NULL, 'diaria')
+ON CONFLICT(actividad_id) DO UPDATE SET
+  nombre = excluded.nombre,
+  categoria = excluded.categoria,
+  frecuencia = excluded.frecuencia;
+INSERT INTO actividad (actividad_id, nombre, categoria, frecuencia) VALUES ('actividad_yoga', 'yoga', NULL, NULL)
+ON CONFLICT(actividad_id) DO UPDATE SET
+  nombre = excluded.nombre,
+  categoria = excluded.categoria,
+  frecuencia = excluded.frecuencia;
+INSERT INTO medicacion (medicacion_id, tipo, periodicidad) VALUES ('medicacion_levodopa', 'levodopa', 'cada 8 horas')
+ON CONFLICT(medicacion_id) DO UPDATE SET
+  tipo = excluded.tipo,
+  periodicidad = excluded.periodicidad;
+INSERT INTO persona (user_id, nombre, edad) VALUES ('persona_ana_lopez', 'ana lópez', 72)
+ON CONFLICT(user_id) DO UPDATE SET
+  nombre = excluded.nombre,
+  edad = excluded.edad;
+INSERT INTO persona (user_id, nombre, edad) VALUES ('persona_oneil', 'o''neil', NULL)
+ON CONFLICT(user_id) DO UPDATE SET
+  nombre = excluded.nombre,
+  edad = excluded.edad;
+INSERT INTO sintoma (sintoma_id, tipo, fecha_inicio, fecha_fin, categoria, frecuencia, gravedad) VALUES ('sintoma_dolor_de_espalda', 'dolor de espalda', '2024-03-05', NULL, NULL, NULL, 'leve')
+ON CONFLICT(sintoma_id) DO UPDATE SET
+  tipo = excluded.tipo,
+  fecha_inicio = excluded.fecha_inicio,
+  fecha_fin = excluded.fecha_fin,
+  categoria = excluded.categoria,
+  frecuencia = excluded.frecuencia,
+  gravedad = excluded.gravedad;
+INSERT OR IGNORE INTO persona_padece_sintoma (persona_id, sintoma_id, desde)
+SELECT p.id, s.id, s.fecha_inicio FROM persona p, sintoma s
+WHERE p.user_id = 'persona_ana_lopez' AND s.sintoma_id = 'sintoma_dolor_de_espalda';
+INSERT OR IGNORE INTO persona_realiza_actividad (persona_id, actividad_id)
+SELECT p.id, a.id FROM persona p, actividad a
+WHERE p.user_id = 'persona_ana_lopez' AND a.actividad_id = 'actividad_natacion';
+INSERT OR IGNORE INTO persona_realiza_actividad (persona_id, actividad_id)
+SELECT p.id, a.id FROM persona p, actividad a
+WHERE p.user_id = 'persona_oneil' AND a.actividad_id = 'actividad_yoga';
+INSERT OR IGNORE INTO persona_toma_medicacion (persona_id, medicacion_id, pauta)
+SELECT p.id, m.id, m.periodicidad FROM persona p, medicacion m
+WHERE p.user_id = 'persona_ana_lopez' AND m.medicacion_id = 'medicacion_levodopa';
+"""
+
+_DUMP = {
+    "persona": "SELECT user_id, nombre, edad FROM persona",
+    "sintoma": "SELECT sintoma_id, tipo, fecha_inicio, fecha_fin, categoria, frecuencia, gravedad FROM sintoma",
+    "actividad": "SELECT actividad_id, nombre, categoria, frecuencia FROM actividad",
+    "medicacion": "SELECT medicacion_id, tipo, periodicidad FROM medicacion",
+    "toma": "SELECT p.user_id, m.medicacion_id, r.pauta FROM persona_toma_medicacion r "
+            "JOIN persona p ON p.id = r.persona_id JOIN medicacion m ON m.id = r.medicacion_id",
+    "padece": "SELECT p.user_id, s.sintoma_id, r.desde FROM persona_padece_sintoma r "
+              "JOIN persona p ON p.id = r.persona_id JOIN sintoma s ON s.id = r.sintoma_id",
+    "realiza": "SELECT p.user_id, a.actividad_id FROM persona_realiza_actividad r "
+               "JOIN persona p ON p.id = r.persona_id JOIN actividad a ON a.id = r.actividad_id",
+}
+
+
+def _dump(conn):
+    return {name: sorted(conn.execute(q).fetchall()) for name, q in _DUMP.items()}
+
+
+def _fresh() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    bootstrap_sqlite(conn)
+    return conn
+
+
+def test_plan_con_executemany_deja_lo_mismo_que_el_script_antiguo():
+    old = _fresh()
+    old.executescript(OLD_SCRIPT)
+    new = _fresh()
+    plan = compile_sql_plan(TRIPLETS)
+    assert plan.execute(new) == OLD_SCRIPT.count(";")
+    assert _dump(new) == _dump(old)
+    assert _dump(new)["persona"] == [("persona_ana_lopez", "ana lópez", 72), ("persona_oneil", "o'neil", None)]
+
+
+def test_render_del_plan_equivale_al_plan():
+    rendered = _fresh()
+    rendered.executescript(compile_sql_plan(TRIPLETS).render_script())
+    new = _fresh()
+    compile_sql_plan(TRIPLETS).execute(new)
+    assert _dump(rendered) == _dump(new)
+
+
+class _Recorder:
+    """Conexión que anota las llamadas a executemany."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.calls = []
+
+    def executemany(self, stmt, rows):
+        rows = list(rows)
+        self.calls.append((stmt, len(rows)))
+        return self.conn.executemany(stmt, rows)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+
+def test_un_executemany_por_tabla():
+    plan = compile_sql_plan(TRIPLETS + [("luis", "realiza", "natación")])
+    rec = _Recorder(_fresh())
+    plan.execute(rec)
+    # 4 tablas de entidades + 3 de relación, cada una con todas sus filas
+    assert len(rec.calls) == 7
+    assert sum(n for _, n in rec.calls) == plan.statement_count
+    assert rec.calls == [(stmt, len(rows)) for stmt, rows in plan.batches()]
+    assert len(plan.entity_rows["persona"]) == 3
+
+
+def test_plan_serializable_para_write_behind():
+    plan = compile_sql_plan(TRIPLETS)
+    assert type(plan).from_dict(plan.to_dict()) == plan
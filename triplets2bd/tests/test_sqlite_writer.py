@@ -0,0 +1,65 @@
+# triplets2bd/tests/test_sqlite_writer.py
+from __future__ import annotations
+import sqlite3
+import threading
+
+import pytest
+
+from triplets2bd.utils.sqlite_writer import SqliteWriter
+
+
+@pytest.fixture
+def writer(tmp_path):
+    w = SqliteWriter(str(tmp_path / "w.sqlite"))
+    w.call(lambda c: c.execute("CREATE TABLE t (a INTEGER UNIQUE)"))
+    yield w
+    w.close()
+
+
+def test_perfil_production(writer):
+    assert writer.call(lambda c: c.execute("PRAGMA journal_mode").fetchone()[0]) == "wal"
+
+
+def test_trabajos_encolados_se_agrupan(writer):
+    gate = threading.Event()
+    before = writer.transactions
+    first = writer.submit(lambda c: gate.wait(5))
+    futures = [writer.submit(lambda c, i=i: c.execute("INSERT INTO t VALUES (?)", (i,))) for i in range(20)]
+    gate.set()
+    first.result(timeout=5)
+    for f in futures:
+        f.result(timeout=5)
+    # Los 20 que esperaban al primero van en un único commit
+    assert writer.transactions - before <= 2
+    assert writer.jobs >= 21
+    assert writer.call(lambda c: c.execute("SELECT COUNT(*) FROM t").fetchone()) == (20,)
+
+
+def test_fallo_de_un_trabajo_no_deshace_el_grupo(writer):
+    ok = writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)"))
+    bad = writer.submit(lambda c: c.execute("INSERT INTO t VALUES (1)"))
+    ok.result(timeout=5)
+    with pytest.raises(sqlite3.IntegrityError):
+        bad.result(timeout=5)
+    assert writer.call(lambda c: c.execute("SELECT a FROM t").fetchall()) == [(1,)]
+
+
+def test_canal_devuelve_rowcount_lastrowid_y_errores(writer):
+    ch = writer.channel("test")
+    ins = ch.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    assert ins.rowcount == 3
+    assert ch.execute("INSERT INTO t VALUES (4)").lastrowid == 4
+    assert ch.execute("DELETE FROM t WHERE a > 2").rowcount == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        ch.execute("INSERT INTO t VALUES (1)").rowcount
+    assert ch.execute("SELECT a FROM t ORDER BY a").fetchall() == [(1,), (2,)]
+
+
+def test_canal_desde_el_hilo_escritor_va_en_linea(writer):
+    ch = writer.channel("test")
+
+    def job(conn):
+        ch.execute("INSERT INTO t VALUES (7)")
+        return ch.execute("SELECT COUNT(*) FROM t").fetchone()[0], ch.execute("DELETE FROM t").rowcount
+
+    assert writer.submit(job).result(timeout=5) == (1, 1)
@@ -0,0 +1,54 @@
+# triplets2bd/tests/test_updated_at_triggers.py
+from __future__ import annotations
+import sqlite3
+
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.schema_sqlite_bootstrap import bootstrap_sqlite
+
+
+def _conn() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    bootstrap_sqlite(conn)
+    return conn
+
+
+def _writes(conn, sql: str, params=()) -> int:
+    """Filas escritas por la sentencia y sus triggers."""
+    before = conn.total_changes
+    conn.execute(sql, params)
+    return conn.total_changes - before
+
+
+def test_upsert_en_el_mismo_segundo_no_reescribe_la_fila():
+    conn = _conn()
+    compile_sql_plan([("ana", "padece", "temblor")]).execute(conn)
+    # Mismo segundo que el alta: updated_at no cambia de texto, pero el UPDATE ya lo fijó
+    n = _writes(
+        conn,
+        "UPDATE sintoma SET gravedad = 'leve', updated_at = datetime('now') WHERE sintoma_id = 'sintoma_temblor'",
+    )
+    assert n == 2   # la fila + el perfil; sin segunda escritura de trg_sintoma_updated
+
+
+def test_update_sin_updated_at_lo_actualiza():
+    conn = _conn()
+    conn.execute("INSERT INTO medicacion (medicacion_id, tipo, updated_at) VALUES ('m', 'x', '2020-01-01 00:00:00')")
+    assert _writes(conn, "UPDATE medicacion SET periodicidad = 'diaria' WHERE medicacion_id = 'm'") == 2
+    stamp = conn.execute("SELECT updated_at FROM medicacion").fetchone()[0]
+    assert stamp > "2020-01-01 00:00:00"
+
+
+def test_updated_at_explicito_se_respeta():
+    conn = _conn()
+    conn.execute("INSERT INTO actividad (actividad_id, nombre) VALUES ('a', 'yoga')")
+    conn.execute("UPDATE actividad SET frecuencia = 'diaria', updated_at = '2021-05-05 10:00:00'")
+    assert conn.execute("SELECT updated_at FROM actividad").fetchone()[0] == "2021-05-05 10:00:00"
+
+
+def test_upsert_repetido_no_escribe():
+    conn = _conn()
+    plan = compile_sql_plan([("ana", "padece", "temblor"), ("temblor", "gravedad", "leve")])
+    plan.execute(conn)
+    before = conn.total_changes
+    plan.execute(conn)
+    assert conn.total_changes == before
@@ -0,0 +1,124 @@
+# triplets2bd/tests/test_write_behind.py
+from __future__ import annotations
+import json
+import sqlite3
+
+import pytest
+
+from triplets2bd import write_behind
+from triplets2bd.engine import run_triplets_to_bd
+from triplets2bd.triplets2sql_rule_based import compile_sql_plan
+from triplets2bd.utils.types import EngineOptions
+from triplets2bd.write_behind import PendingWrite, WriteBehindQueue
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "dominio.sqlite"), str(tmp_path / "wb.jsonl")
+
+
+def _queue(spill: str, **kwargs) -> WriteBehindQueue:
+    # Sin volcados periódicos: el test llama a flush()
+    return WriteBehindQueue(spill_path=spill, flush_interval_s=3600, **kwargs)
+
+
+def _personas(db: str):
+    conn = sqlite3.connect(db)
+    try:
+        return [r[0] for r in conn.execute("SELECT nombre FROM persona ORDER BY nombre")]
+    finally:
+        conn.close()
+
+
+def _lines(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_flush_confirma_y_vacia_el_spill(paths):
+    db, spill = paths
+    q = _queue(spill)
+    try:
+        q.enqueue_sql(db, compile_sql_plan([("ana", "padece", "temblor")]))
+        q.enqueue_sql(db, compile_sql_plan([("luis", "toma", "paracetamol")]))
+        assert len(_lines(spill)) == 2
+        assert q.flush() == 2
+        assert _personas(db) == ["ana", "luis"]
+        assert _lines(spill) == []
+        assert q.stats()["commits"] == 1          # una transacción por destino
+    finally:
+        q.close()
+
+
+def test_recover_reencola_el_spill_de_otro_proceso(paths):
+    db, spill = paths
+    plan = compile_sql_plan([("ana", "padece", "temblor")])
+    with open(spill, "w", encoding="utf-8") as f:
+        f.write(PendingWrite("sql", db, plan.to_dict(), "", plan.statement_count).to_json() + "\n")
+        f.write('{"backend": "sql", "targ')    # línea truncada por un corte: se descarta
+    q = _queue(spill)
+    try:
+        assert q.stats()["pending"] == 1
+        assert q.flush() == 1
+        assert _personas(db) == ["ana"]
+    finally:
+        q.close()
+
+
+def test_dead_letter_solo_de_lo_que_falla(paths):
+    db, spill = paths
+    q = _queue(spill, max_attempts=2)
+    try:
+        q.enqueue_sql(db, compile_sql_plan([("ana", "padece", "temblor")]), "INSERT INTO no_existe VALUES (1);")
+        assert q.flush() == 0
+        assert q.stats()["commits"] == 1
+        # El plan se confirmó; solo la sentencia fallida queda pendiente
+        assert _personas(db) == ["ana"]
+        [pending] = _lines(spill)
+        assert pending["plan"] is None
+        assert pending["script"] == "INSERT INTO no_existe VALUES (1);"
+        assert pending["attempts"] == 1
+
+        assert q.flush() == 0
+        stats = q.stats()
+        assert (stats["pending"], stats["dead"], stats["errors"]) == (0, 1, 2)
+        assert stats["commits"] == 1                 # nada confirmado en el segundo volcado
+        assert _lines(spill) == []
+        [dead] = _lines(spill + ".failed")
+        assert dead["attempts"] == 2
+        assert "no_existe" in dead["script"] and "no_existe" in dead["error"]
+    finally:
+        q.close()
+
+
+def test_discard_solo_del_destino(paths, tmp_path):
+    db, spill = paths
+    other = str(tmp_path / "otra.sqlite")
+    q = _queue(spill)
+    try:
+        q.enqueue_sql(db, compile_sql_plan([("ana", "padece", "temblor")]))
+        q.enqueue_sql(other, compile_sql_plan([("luis", "padece", "temblor")]))
+        assert q.discard("sql", db) == 1
+        assert [item["target"] for item in _lines(spill)] == [other]
+        assert q.flush() == 1
+        assert _personas(other) == ["luis"]
+    finally:
+        q.close()
+
+
+def test_reset_no_resucita_lo_encolado(paths, monkeypatch):
+    db, spill = paths
+    monkeypatch.setattr(write_behind, "_QUEUE", _queue(spill))
+    base = EngineOptions(
+        backend="sql", mode="deterministic", sqlite_db_path=db,
+        write_behind=True, generate_report=False,
+    )
+    try:
+        res = run_triplets_to_bd([("ana", "padece", "temblor")], EngineOptions(**{**base.__dict__, "reset": False}))
+        assert res.executed_statements == 0
+        assert res.extras["write_behind"]["queued"] == 3
+        run_triplets_to_bd([("luis", "padece", "temblor")], EngineOptions(**{**base.__dict__, "reset": True}))
+        write_behind._QUEUE.flush()
+        assert _personas(db) == ["luis"]
+    finally:
+        write_behind.close_write_behind()
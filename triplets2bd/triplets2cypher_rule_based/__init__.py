@@ -11,6 +11,7 @@ from .helpers import (
     cypher_quote,
     partition_triplets_strict,   # propio de cypher (incluye 'conoce')
     compile_cypher_script,
+    compile_cypher_plan,
 )
 
 from utils.constants import (
@@ -21,12 +22,14 @@ from utils.constants import (
 )
 
 from .models import Entity, Collector
-from .generator import upsert_from_triplets
+from .generator import upsert_from_triplets, plan_from_triplets, collect_triplets, plan_from_collector
+from .plan import CypherPlan
 
 __all__ = [
     "Triplet",
     "slugify", "to_title_name", "parse_age", "normalize_date", "cypher_quote",
-    "partition_triplets_strict", "compile_cypher_script",
+    "partition_triplets_strict", "compile_cypher_script", "compile_cypher_plan",
     "ALLOWED_REL", "ALLOWED_PROP", "PROPERTY_VERBS", "RELATION_VERBS",
-    "Entity", "Collector", "upsert_from_triplets",
+    "Entity", "Collector", "upsert_from_triplets", "plan_from_triplets",
+    "collect_triplets", "plan_from_collector", "CypherPlan",
 ]
@@ -1,32 +1,19 @@
 # triplets2bd/triplets2cypher_rule_based/generator.py
 from typing import List, Tuple, Optional
-from .models import Collector, Entity
-from .helpers import parse_age, normalize_date, cypher_quote
+from .models import Collector
+from .helpers import parse_age, normalize_date
+from .plan import CypherPlan
 from utils.constants import PROPERTY_VERBS, RELATION_VERBS
+from utils.schema_registry import RELATIONS, PROPERTY_SUBJECTS, PROP_OWNER
 
 Triplet = Tuple[str, str, str]
 
-def _set_if_not_none(pairs):
-    # Devuelve lista "prop = valor" sin los None
-    out = []
-    for k, v in pairs:
-        if v is None:
-            continue
-        if isinstance(v, int):
-            out.append(f"{k} = {v}")
-        else:
-            out.append(f"{k} = {cypher_quote(v)}")
-    return out
+# verbo -> (tipo de relación, etype destino)
+_REL_TARGETS = {verb: (r.rel_type, r.target) for verb, r in RELATIONS.items()}
 
-def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]:
-    """
-    Construye sentencias **Cypher** deterministas para nodos y relaciones, sin LLM.
-    Sigue el estilo del prompt:
-      - MERGE por ID
-      - ON CREATE SET props obligatorias
-      - ON MATCH SET props actualizables / repetidas
-      - Crear primero nodos, después relaciones (con MATCH por ID + MERGE de la relación)
-    """
+
+def _collect(triplets: List[Triplet]) -> Collector:
+    """Entidades (con props) y relaciones a partir de tripletas crudas."""
     col = Collector()
     property_buffer: List[Tuple[str, str, str]] = []
 
@@ -38,24 +25,16 @@ def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]
         if v_l == "tiene":
             age = parse_age(o_l)
             if age is not None:
-                p = col.persona_by_name(s_l)
-                p.set("edad", age)
+                col.set("persona", col.add("persona", s_l), "edad", age)
             continue
 
         # Relaciones canónicas
         if v_l in RELATION_VERBS:
-            if v_l == "padece":
-                p = col.persona_by_name(s_l)
-                snt = col.sintoma_by_type(o_l)
-                col.relations.append(("PADECE", p.props["user_id"], snt.props["sintoma_id"]))
-            elif v_l == "toma":
-                p = col.persona_by_name(s_l)
-                med = col.medicacion_by_type(o_l)
-                col.relations.append(("TOMA", p.props["user_id"], med.props["medicacion_id"]))
-            elif v_l == "realiza":
-                p = col.persona_by_name(s_l)
-                act = col.actividad_by_name(o_l)
-                col.relations.append(("REALIZA", p.props["user_id"], act.props["actividad_id"]))
+            target = _REL_TARGETS.get(v_l)
+            if target:
+                rel_type, etype = target
+                p = col.add("persona", s_l)
+                col.relate(rel_type, p, etype, col.add(etype, o_l))
             continue
 
         # Propiedades: diferir a PASADA 2 (para fechas y otras props)
@@ -69,131 +48,57 @@ def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]
             continue
         value: Optional[str] = normalize_date(o_l) if kind == "date" else o_l.strip().lower()
 
-        ent: Optional[Entity] = None
-        if s_l in col.sintoma_index:
-            ent = col._get_or_new("sintoma", col.sintoma_index[s_l])
-        elif s_l in col.actividad_index:
-            ent = col._get_or_new("actividad", col.actividad_index[s_l])
-        elif s_l in col.medicacion_index:
-            ent = col._get_or_new("medicacion", col.medicacion_index[s_l])
-        elif s_l in col.persona_index:
-            ent = col._get_or_new("persona", col.persona_index[s_l])
+        for etype in PROPERTY_SUBJECTS + ("persona",):
+            row = col.find(etype, s_l)
+            if row is not None:
+                break
         else:
-            # Si llega una propiedad aislada, inferimos el tipo por el verbo:
-            # (preferencia: sintoma/actividad/medicacion; persona solo si nada encaja)
-            # Aquí es difícil saber el tipo sin contexto; no inferimos etiqueta salvo persona.
-            # Si la prop es 'periodicidad' asumimos medicación; si 'categoria'/'frecuencia' puede ser síntoma o actividad.
-            if v_l in ("se toma", "periodicidad"):
-                ent = col.medicacion_by_type(s_l)
-            else:
-                # fallback: si el sujeto está en minúsculas y parece nombre propio NO fiable;
-                # dejamos como síntoma por defecto si encaja con props típicas, si no, actividad.
-                if v_l in ("categoria", "frecuencia", "gravedad", "inicio", "fin"):
-                    ent = col.sintoma_by_type(s_l)
-                else:
-                    ent = col.actividad_by_name(s_l)
-
-        ent.set(prop, value)
-
-    for ent in col.entities.values():
-        ent.ensure_minimal()
-
-    # --- Build CYPHER (NODOS) ---
-    entity_cypher: List[str] = []
-    # Orden estable por tipo e id para que sea determinista
-    for (etype, key), ent in sorted(col.entities.items(), key=lambda x: (x[0][0], x[0][1])):
-        if etype == "persona":
-            # obligatorias: nombre (Title Case), edad opcional
-            on_create = _set_if_not_none([
-                ("n.nombre", ent.props.get("nombre")),
-                ("n.edad", ent.props.get("edad")),
-            ])
-            on_match  = _set_if_not_none([
-                ("n.edad", ent.props.get("edad")),
-            ])
-            stmt = (
-                f"MERGE (n:Persona {{user_id: {cypher_quote(ent.props['user_id'])}}}) "
-                f"ON CREATE SET {', '.join(on_create) if on_create else 'n._created = true'} "
-                f"ON MATCH SET {', '.join(on_match) if on_match else 'n._seen = true'};"
-            )
-            entity_cypher.append(stmt)
-
-        elif etype == "sintoma":
-            on_create = _set_if_not_none([
-                ("n.tipo", ent.props.get("tipo")),
-                ("n.fecha_inicio", ent.props.get("fecha_inicio")),
-                ("n.fecha_fin", ent.props.get("fecha_fin")),
-                ("n.categoria", ent.props.get("categoria")),
-                ("n.frecuencia", ent.props.get("frecuencia")),
-                ("n.gravedad", ent.props.get("gravedad")),
-            ])
-            on_match = _set_if_not_none([
-                ("n.fecha_inicio", ent.props.get("fecha_inicio")),
-                ("n.fecha_fin", ent.props.get("fecha_fin")),
-                ("n.categoria", ent.props.get("categoria")),
-                ("n.frecuencia", ent.props.get("frecuencia")),
-                ("n.gravedad", ent.props.get("gravedad")),
-            ])
-            stmt = (
-                f"MERGE (n:Sintoma {{sintoma_id: {cypher_quote(ent.props['sintoma_id'])}}}) "
-                f"ON CREATE SET {', '.join(on_create) if on_create else 'n._created = true'} "
-                f"ON MATCH SET {', '.join(on_match) if on_match else 'n._seen = true'};"
-            )
-            entity_cypher.append(stmt)
-
-        elif etype == "actividad":
-            on_create = _set_if_not_none([
-                ("n.nombre", ent.props.get("nombre")),
-                ("n.categoria", ent.props.get("categoria")),
-                ("n.frecuencia", ent.props.get("frecuencia")),
-            ])
-            on_match = _set_if_not_none([
-                ("n.categoria", ent.props.get("categoria")),
-                ("n.frecuencia", ent.props.get("frecuencia")),
-            ])
-            stmt = (
-                f"MERGE (n:Actividad {{actividad_id: {cypher_quote(ent.props['actividad_id'])}}}) "
-                f"ON CREATE SET {', '.join(on_create) if on_create else 'n._created = true'} "
-                f"ON MATCH SET {', '.join(on_match) if on_match else 'n._seen = true'};"
-            )
-            entity_cypher.append(stmt)
-
-        elif etype == "medicacion":
-            on_create = _set_if_not_none([
-                ("n.tipo", ent.props.get("tipo")),
-                ("n.periodicidad", ent.props.get("periodicidad")),
-            ])
-            on_match = _set_if_not_none([
-                ("n.periodicidad", ent.props.get("periodicidad")),
-            ])
-            stmt = (
-                f"MERGE (n:Medicacion {{medicacion_id: {cypher_quote(ent.props['medicacion_id'])}}}) "
-                f"ON CREATE SET {', '.join(on_create) if on_create else 'n._created = true'} "
-                f"ON MATCH SET {', '.join(on_match) if on_match else 'n._seen = true'};"
-            )
-            entity_cypher.append(stmt)
-
-    # --- Build CYPHER (RELACIONES) ---
-    relation_cypher: List[str] = []
+            # Propiedad aislada: se asume el primer tipo del esquema que tiene esa prop
+            # (periodicidad -> medicación; categoria/frecuencia/gravedad/fechas -> síntoma)
+            etype = PROP_OWNER[prop]
+            row = col.add(etype, s_l)
+            col.prop_only.add((etype, col.tables[etype].key(row)))
+
+        col.set(etype, row, prop, value)
+
+    return col
+
+
+def plan_from_triplets(triplets: List[Triplet]) -> CypherPlan:
+    """
+    Igual que upsert_from_triplets pero como CypherPlan: filas agrupadas por etiqueta
+    y tipo de relación para escribirlas con UNWIND $rows (ver plan.py).
+    """
+    return plan_from_collector(_collect(triplets))
+
+
+def collect_triplets(triplets: List[Triplet]) -> Collector:
+    """
+    Plan neutro (entidades + relaciones) del que salen tanto el CypherPlan como el
+    SqlPlan (triplets2sql_rule_based.generator.plan_from_collector): backend="both".
+    Las entidades de propiedades aisladas quedan en col.prop_only (solo Cypher).
+    """
+    return _collect(triplets)
+
+
+def plan_from_collector(col: Collector) -> CypherPlan:
+    plan = CypherPlan()
+    for etype, table, row in col.iter_rows():
+        plan.add_node(etype, table.row_dict(row))
     for rel_type, left_key, right_key in sorted(col.relations):
-        if rel_type in {"TOMA", "PADECE", "REALIZA"}:
-            # left: Persona; right: Medicacion/Sintoma/Actividad
-            label_right = {
-                "TOMA": "Medicacion",
-                "PADECE": "Sintoma",
-                "REALIZA": "Actividad",
-            }[rel_type]
-            id_right = {
-                "TOMA": ("medicacion_id", right_key),
-                "PADECE": ("sintoma_id", right_key),
-                "REALIZA": ("actividad_id", right_key),
-            }[rel_type]
-            rk, rv = id_right
-            stmt = (
-                f"MATCH (p:Persona {{user_id: {cypher_quote(left_key)}}}), "
-                f"(x:{label_right} {{{rk}: {cypher_quote(rv)}}}) "
-                f"MERGE (p)-[:{rel_type}]->(x);"
-            )
-            relation_cypher.append(stmt)
-
-    return entity_cypher, relation_cypher
+        plan.add_relation(rel_type, left_key, right_key)
+    plan.prop_only = set(col.prop_only)
+    return plan
+
+
+def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]:
+    """
+    Construye sentencias **Cypher** deterministas para nodos y relaciones, sin LLM.
+    Sigue el estilo del prompt:
+      - MERGE por ID
+      - ON CREATE SET props obligatorias
+      - ON MATCH SET props actualizables / repetidas
+      - Crear primero nodos, después relaciones (con MATCH por ID + MERGE de la relación)
+    """
+    plan = plan_from_triplets(triplets)
+    return plan.render_node_cypher(), plan.render_rel_cypher()
@@ -81,3 +81,8 @@ def compile_cypher_script(triplets: List[Triplet]) -> str:
     from .generator import upsert_from_triplets
     entity_cypher, relation_cypher = upsert_from_triplets(triplets)
     return "\n".join(entity_cypher + relation_cypher)
+
+def compile_cypher_plan(triplets: List[Triplet]):
+    """Versión por lotes (UNWIND $rows) de compile_cypher_script (ver plan.CypherPlan)."""
+    from .generator import plan_from_triplets
+    return plan_from_triplets(triplets)
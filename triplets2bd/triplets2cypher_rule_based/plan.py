@@ -0,0 +1,157 @@
+# triplets2bd/triplets2cypher_rule_based/plan.py
+"""
+Plan de escritura Cypher por lotes.
+
+Agrupa las filas por etiqueta y por tipo de relación y las aplica con una
+sentencia parametrizada `UNWIND $rows AS r MERGE ...` por grupo: Neo4j reutiliza
+el plan de consulta cacheado y una ejecución son unas pocas idas y vueltas en
+lugar de una por tripleta.
+
+Semántica equivalente al script literal (compile_cypher_script):
+  - ON CREATE SET con todas las props (una prop a null no se crea)
+  - ON MATCH SET solo props actualizables; un valor null conserva el guardado
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Set, Tuple
+
+from .helpers import cypher_quote
+from utils.schema_registry import NODES, RELATIONS
+
+Row = Dict[str, Any]
+
+# Tablas de consulta precalculadas desde el registro (utils.schema_registry)
+# etype -> (etiqueta, clave, props de creación, props actualizables en MATCH)
+NODE_LABELS: Dict[str, Tuple[str, str, Tuple[str, ...], Tuple[str, ...]]] = {
+    n.etype: (n.label, n.key, n.prop_names, n.updatable_props) for n in NODES.values()
+}
+
+# tipo de relación -> (etiqueta destino, clave destino)
+REL_TARGETS: Dict[str, Tuple[str, str]] = {
+    r.rel_type: (NODES[r.target].label, NODES[r.target].key) for r in RELATIONS.values()
+}
+
+
+def _node_cypher(etype: str) -> str:
+    label, key, create_props, match_props = NODE_LABELS[etype]
+    on_create = ", ".join(f"n.{p} = r.{p}" for p in create_props)
+    on_match = ", ".join(f"n.{p} = coalesce(r.{p}, n.{p})" for p in match_props)
+    return (
+        f"UNWIND $rows AS r "
+        f"MERGE (n:{label} {{{key}: r.{key}}}) "
+        f"ON CREATE SET {on_create} "
+        f"ON MATCH SET {on_match}"
+    )
+
+
+def _rel_cypher(rel_type: str) -> str:
+    label, key = REL_TARGETS[rel_type]
+    return (
+        f"UNWIND $rows AS r "
+        f"MATCH (p:Persona {{user_id: r.left}}), (x:{label} {{{key}: r.right}}) "
+        f"MERGE (p)-[:{rel_type}]->(x)"
+    )
+
+
+# Sentencias fijas (texto idéntico en cada run -> plan cacheado en Neo4j)
+NODE_STATEMENTS: Dict[str, str] = {etype: _node_cypher(etype) for etype in NODE_LABELS}
+REL_STATEMENTS: Dict[str, str] = {rel: _rel_cypher(rel) for rel in REL_TARGETS}
+
+
+@dataclass
+class CypherPlan:
+    node_rows: Dict[str, List[Row]] = field(default_factory=dict)   # etype -> filas
+    rel_rows: Dict[str, List[Row]] = field(default_factory=dict)    # tipo -> {left, right}
+    # (etype, clave) creadas solo por una propiedad aislada (SQL no las crea)
+    prop_only: Set[Tuple[str, str]] = field(default_factory=set, repr=False, compare=False)
+
+    def add_node(self, etype: str, props: Dict[str, Any]) -> None:
+        _, key, create_props, _ = NODE_LABELS[etype]
+        row = {p: props.get(p) for p in (key,) + create_props}
+        self.node_rows.setdefault(etype, []).append(row)
+
+    def add_relation(self, rel_type: str, left_key: str, right_key: str) -> None:
+        if rel_type in REL_TARGETS:
+            self.rel_rows.setdefault(rel_type, []).append({"left": left_key, "right": right_key})
+
+    @property
+    def row_count(self) -> int:
+        return sum(len(r) for r in self.node_rows.values()) + sum(len(r) for r in self.rel_rows.values())
+
+    def __bool__(self) -> bool:
+        return self.row_count > 0
+
+    def merge(self, other: "CypherPlan") -> "CypherPlan":
+        """Añade las filas de `other` detrás de las propias (mismo orden de llegada)."""
+        # Una clave sigue siendo prop_only solo si ningún plan la trae como entidad
+        real = (self._keys() - self.prop_only) | (other._keys() - other.prop_only)
+        self.prop_only = (self.prop_only | other.prop_only) - real
+        for etype, rows in other.node_rows.items():
+            self.node_rows.setdefault(etype, []).extend(rows)
+        for rel_type, rows in other.rel_rows.items():
+            self.rel_rows.setdefault(rel_type, []).extend(rows)
+        return self
+
+    def _keys(self) -> Set[Tuple[str, str]]:
+        return {(etype, row[NODE_LABELS[etype][1]]) for etype, rows in self.node_rows.items() for row in rows}
+
+    def to_dict(self) -> Dict[str, Dict[str, List[Row]]]:
+        return {"node_rows": self.node_rows, "rel_rows": self.rel_rows}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, List[Row]]]) -> "CypherPlan":
+        return cls(
+            node_rows={k: list(v) for k, v in data.get("node_rows", {}).items()},
+            rel_rows={k: list(v) for k, v in data.get("rel_rows", {}).items()},
+        )
+
+    def batches(self, batch_size: int = 1000) -> List[Tuple[str, Dict[str, Any]]]:
+        """(cypher, {"rows": [...]}) en orden: nodos y después relaciones."""
+        out: List[Tuple[str, Dict[str, Any]]] = []
+        groups = [(NODE_STATEMENTS[e], self.node_rows[e]) for e in sorted(self.node_rows)]
+        groups += [(REL_STATEMENTS[t], self.rel_rows[t]) for t in sorted(self.rel_rows)]
+        for stmt, rows in groups:
+            for i in range(0, len(rows), batch_size):
+                out.append((stmt, {"rows": rows[i:i + batch_size]}))
+        return out
+
+    # ---------------- Render de depuración (script literal) ----------------
+    def render_node_cypher(self) -> List[str]:
+        out: List[str] = []
+        for etype in sorted(self.node_rows):
+            label, key, create_props, match_props = NODE_LABELS[etype]
+            for row in self.node_rows[etype]:
+                on_create = _set_if_not_none(row, create_props)
+                on_match = _set_if_not_none(row, match_props)
+                out.append(
+                    f"MERGE (n:{label} {{{key}: {cypher_quote(row[key])}}}) "
+                    f"ON CREATE SET {', '.join(on_create) if on_create else 'n._created = true'} "
+                    f"ON MATCH SET {', '.join(on_match) if on_match else 'n._seen = true'};"
+                )
+        return out
+
+    def render_rel_cypher(self) -> List[str]:
+        out: List[str] = []
+        for rel_type in sorted(self.rel_rows):
+            label, key = REL_TARGETS[rel_type]
+            for row in self.rel_rows[rel_type]:
+                out.append(
+                    f"MATCH (p:Persona {{user_id: {cypher_quote(row['left'])}}}), "
+                    f"(x:{label} {{{key}: {cypher_quote(row['right'])}}}) "
+                    f"MERGE (p)-[:{rel_type}]->(x);"
+                )
+        return out
+
+    def render_script(self) -> str:
+        return "\n".join(self.render_node_cypher() + self.render_rel_cypher())
+
+
+def _set_if_not_none(row: Row, props: Tuple[str, ...]) -> List[str]:
+    # "n.prop = valor" sin los None
+    out = []
+    for p in props:
+        v = row.get(p)
+        if v is None:
+            continue
+        out.append(f"n.{p} = {v}" if isinstance(v, int) else f"n.{p} = {cypher_quote(v)}")
+    return out
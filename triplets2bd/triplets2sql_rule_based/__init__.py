@@ -13,6 +13,7 @@ from .helpers import (
     sql_quote,
     partition_triplets_strict,
     compile_sql_script,
+    compile_sql_plan,
 )
 
 from utils.constants import (
@@ -23,7 +24,8 @@ from utils.constants import (
 )
 
 from .models import Entity, Collector
-from .generator import upsert_from_triplets
+from .generator import upsert_from_triplets, plan_from_triplets, plan_from_collector
+from .plan import SqlPlan
 
 __all__ = [
     # tipos
@@ -31,9 +33,9 @@ __all__ = [
     # helpers
     "slugify", "to_title_name", "parse_age", "normalize_date", "sql_quote",
     # particionador/compilador
-    "partition_triplets_strict", "compile_sql_script",
+    "partition_triplets_strict", "compile_sql_script", "compile_sql_plan",
     # constantes
     "ALLOWED_REL", "ALLOWED_PROP", "PROPERTY_VERBS", "RELATION_VERBS",
     # modelos / API
-    "Entity", "Collector", "upsert_from_triplets",
+    "Entity", "Collector", "upsert_from_triplets", "plan_from_triplets", "plan_from_collector", "SqlPlan",
 ]
@@ -1,15 +1,22 @@
-from typing import List, Tuple, Optional
-from .models import Collector, Entity
-from .helpers import parse_age, normalize_date, sql_quote
+from typing import List, Tuple
+from .models import Collector
+from .helpers import parse_age, normalize_date
+from .plan import SqlPlan
 from utils.constants import PROPERTY_VERBS, RELATION_VERBS
+from utils.schema_registry import RELATIONS, PROPERTY_SUBJECTS
 
 Triplet = Tuple[str, str, str]
 
+# verbo -> (tabla de relación, etype destino)
+_REL_TARGETS = {verb: (r.table, r.target) for verb, r in RELATIONS.items()}
+# tipo de relación Cypher -> tabla (Collector compartido con el generador Cypher)
+_REL_TABLE = {r.rel_type: r.table for r in RELATIONS.values()}
 
-def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]:
+
+def plan_from_triplets(triplets: List[Triplet]) -> SqlPlan:
     """
-    Construye sentencias SQL para entidades (UPSERT) y relaciones (INSERT OR IGNORE)
-    a partir de tripletas crudas, sin LLM. Asume tripletas correctas y ordenadas.
+    Compila tripletas crudas a un SqlPlan (sentencias parametrizadas + filas), sin LLM.
+    Asume tripletas correctas y ordenadas.
     """
     col = Collector()
     property_buffer: List[Tuple[str, str, str]] = []
@@ -23,22 +30,16 @@ def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]
         if v_l == 'tiene':
             age = parse_age(o_l)
             if age is not None:
-                p = col.persona_by_name(s_l)
-                p.set('edad', age)
+                col.set('persona', col.add('persona', s_l), 'edad', age)
             continue
 
         # Relaciones canónicas
         if v_l in RELATION_VERBS:
-            p = col.persona_by_name(s_l)
-            if v_l == 'padece':
-                snt = col.sintoma_by_type(o_l)
-                col.relations.append(('persona_padece_sintoma', p.props['user_id'], snt.props['sintoma_id']))
-            elif v_l == 'toma':
-                med = col.medicacion_by_type(o_l)
-                col.relations.append(('persona_toma_medicacion', p.props['user_id'], med.props['medicacion_id']))
-            elif v_l == 'realiza':
-                act = col.actividad_by_name(o_l)
-                col.relations.append(('persona_realiza_actividad', p.props['user_id'], act.props['actividad_id']))
+            p = col.add('persona', s_l)
+            target = _REL_TARGETS.get(v_l)
+            if target:
+                rel_table, etype = target
+                col.relate(rel_table, p, etype, col.add(etype, o_l))
             continue
 
         # Propiedades permitidas: diferir a PASADA 2
@@ -46,64 +47,43 @@ def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]
             property_buffer.append((s_l, v_l, o_l))
             continue
 
-    # PASADA 2: aplicar props SOLO si la entidad ya existe en índices
+    # PASADA 2: aplicar props SOLO si la entidad ya existe en el índice
     for s_l, v_l, o_l in property_buffer:
         prop, kind = PROPERTY_VERBS[v_l]
-        value: Optional[str] = normalize_date(o_l) if kind == 'date' else o_l
-
-        ent: Optional[Entity] = None
-        if s_l in col.sintoma_index:
-            ent = col._get_or_new('sintoma', col.sintoma_index[s_l])
-        elif s_l in col.actividad_index:
-            ent = col._get_or_new('actividad', col.actividad_index[s_l])
-        elif s_l in col.medicacion_index:
-            ent = col._get_or_new('medicacion', col.medicacion_index[s_l])
-
-        if ent is None:
+        value = normalize_date(o_l) if kind == 'date' else o_l
+
+        for etype in PROPERTY_SUBJECTS:
+            row = col.find(etype, s_l)
+            if row is not None:
+                col.set(etype, row, prop, value)
+                break
+        else:
             leftovers_for_props.append(((s_l, v_l, o_l), "prop_sin_entidad_previa"))
-            continue
-
-        ent.set(prop, value)
 
-    for ent in col.entities.values():
-        ent.ensure_minimal()
+    return plan_from_collector(col)
 
-    # Build SQL
-    entity_sql: List[str] = []
-    unique_map = {
-        'persona':   ('persona',   'user_id',     ('nombre', 'edad')),
-        'sintoma':   ('sintoma',   'sintoma_id',  ('tipo', 'fecha_inicio', 'fecha_fin', 'categoria', 'frecuencia', 'gravedad')),
-        'actividad': ('actividad', 'actividad_id',('nombre', 'categoria', 'frecuencia')),
-        'medicacion':('medicacion','medicacion_id',('tipo', 'periodicidad')),
-    }
 
-    for (etype, key), ent in sorted(col.entities.items(), key=lambda x: (x[0][0], x[0][1])):
-        table, keycol, other_cols = unique_map[etype]
-        cols = [keycol] + list(other_cols)
-        vals = [sql_quote(ent.props.get(c)) for c in cols]
-        insert = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(vals)})"
-        updates = ",\n  ".join(f"{c} = excluded.{c}" for c in other_cols)
-        entity_sql.append(insert + f"\nON CONFLICT({keycol}) DO UPDATE SET\n  {updates};")
+def plan_from_collector(col: Collector) -> SqlPlan:
+    """
+    SqlPlan de un Collector ya construido (relaciones con nombre de tabla o tipo Cypher).
+    Omite las entidades col.prop_only: compile_sql_plan no crea entidades por una
+    propiedad aislada (quedan como sobrante "prop_sin_entidad_previa").
+    """
+    plan = SqlPlan()
+    for etype, table, row in col.iter_rows():
+        if col.prop_only and (etype, table.key(row)) in col.prop_only:
+            continue
+        plan.add_entity_row(etype, table.row_tuple(row))
+    for rel, left_key, right_key in sorted(col.relations):
+        plan.add_relation(_REL_TABLE.get(rel, rel), left_key, right_key)
+    return plan
 
-    relation_sql: List[str] = []
-    for rel_table, left_key, right_key in sorted(col.relations):
-        if rel_table == 'persona_toma_medicacion':
-            relation_sql.append(
-                "INSERT OR IGNORE INTO persona_toma_medicacion (persona_id, medicacion_id, pauta)\n"
-                "SELECT p.id, m.id, m.periodicidad FROM persona p, medicacion m\n"
-                f"WHERE p.user_id = '{left_key}' AND m.medicacion_id = '{right_key}';"
-            )
-        elif rel_table == 'persona_realiza_actividad':
-            relation_sql.append(
-                "INSERT OR IGNORE INTO persona_realiza_actividad (persona_id, actividad_id)\n"
-                "SELECT p.id, a.id FROM persona p, actividad a\n"
-                f"WHERE p.user_id = '{left_key}' AND a.actividad_id = '{right_key}';"
-            )
-        elif rel_table == 'persona_padece_sintoma':
-            relation_sql.append(
-                "INSERT OR IGNORE INTO persona_padece_sintoma (persona_id, sintoma_id, desde)\n"
-                "SELECT p.id, s.id, s.fecha_inicio FROM persona p, sintoma s\n"
-                f"WHERE p.user_id = '{left_key}' AND s.sintoma_id = '{right_key}';"
-            )
 
-    return entity_sql, relation_sql
\ No newline at end of file
+def upsert_from_triplets(triplets: List[Triplet]) -> Tuple[List[str], List[str]]:
+    """
+    Construye sentencias SQL para entidades (UPSERT) y relaciones (INSERT OR IGNORE)
+    a partir de tripletas crudas, sin LLM. Asume tripletas correctas y ordenadas.
+    Render en texto de plan_from_triplets (depuración / informes).
+    """
+    plan = plan_from_triplets(triplets)
+    return plan.render_entity_sql(), plan.render_relation_sql()
@@ -62,6 +62,12 @@ def compile_sql_script(triplets: List[Triplet]) -> str:
     return "\n".join(entity_sql + relation_sql)
 
 
+def compile_sql_plan(triplets: List[Triplet]):
+    """Versión parametrizada de compile_sql_script (ver plan.SqlPlan)."""
+    from .generator import plan_from_triplets
+    return plan_from_triplets(triplets)
+
+
 
 
 def _is_age_text(obj: str) -> bool:
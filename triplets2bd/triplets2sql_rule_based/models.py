@@ -1,92 +1,212 @@
-from typing import Dict, Optional, Tuple
-from .helpers import to_title_name
-from .helpers import slugify
+# triplets2bd/triplets2sql_rule_based/models.py
+"""
+Modelo compacto de entidades para compilar lotes grandes (compartido por los
+generadores deterministas SQL y Cypher; triplets2cypher_rule_based.models lo reexporta).
 
-class Entity:
-    def __init__(self, etype: str, key: str):
-        self.etype = etype  # persona | sintoma | actividad | medicacion
-        self.key = key      # user_id | sintoma_id | actividad_id | medicacion_id
-        self.props: Dict[str, Optional[str]] = {}
+  - EntityTable: una tabla por tipo con columnas fijas (una lista por columna,
+    en el orden de ENTITY_TABLES) y un dict id -> fila. Una entidad es una
+    posición en esas listas, no un objeto con su propio dict de props.
+  - Collector: un único índice tipado (etype, texto canónico) -> fila en lugar
+    de cuatro índices texto -> id; ids, textos y valores repetidos se internan.
+  - Entity: vista ligera (__slots__) sobre una fila con la API anterior
+    (set / props / ensure_minimal), para quien siga usando el modelo por objeto.
+"""
+from __future__ import annotations
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .helpers import slugify, to_title_name
+from .plan import ENTITY_TABLES
+from utils.schema_registry import NODES
+
+# etype -> (columna clave, resto de columnas)
+ENTITY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    etype: (keycol,) + other_cols for etype, (_, keycol, other_cols) in ENTITY_TABLES.items()
+}
+
+# Columna que nombra la entidad (obligatoria; se rellena al crearla por texto)
+NAME_COLUMN: Dict[str, str] = {n.etype: n.name_prop for n in NODES.values()}
+
+
+def _intern(v: Any) -> Any:
+    return sys.intern(v) if type(v) is str else v
+
+
+class EntityTable:
+    __slots__ = ("etype", "columns", "positions", "cols", "rows", "extra")
+
+    def __init__(self, etype: str):
+        self.etype = etype
+        self.columns = ENTITY_COLUMNS[etype]
+        self.positions = {c: i for i, c in enumerate(self.columns)}
+        self.cols: List[List[Any]] = [[] for _ in self.columns]   # cols[0] = ids
+        self.rows: Dict[str, int] = {}
+        # Props fuera del esquema (p.ej. 'periodicidad' sobre un síntoma): no se
+        # escriben en BD, pero se conservan para Entity.props
+        self.extra: Optional[Dict[Tuple[int, str], Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.cols[0])
+
+    def row_for(self, key: str) -> int:
+        row = self.rows.get(key)
+        if row is None:
+            key = sys.intern(key)
+            row = self.rows[key] = len(self.cols[0])
+            for col in self.cols:
+                col.append(None)
+            self.cols[0][row] = key
+        return row
 
-    def set(self, k: str, v: Optional[str]):
-        if v is None:
+    def key(self, row: int) -> str:
+        return self.cols[0][row]
+
+    def set(self, row: int, column: str, value: Any) -> None:
+        if value is None:
             return
-        self.props[k] = v
+        pos = self.positions.get(column)
+        if pos is not None:
+            self.cols[pos][row] = _intern(value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[(row, column)] = value
+
+    def get(self, row: int, column: str) -> Any:
+        pos = self.positions.get(column)
+        if pos is not None:
+            return self.cols[pos][row]
+        return self.extra.get((row, column)) if self.extra else None
+
+    def row_tuple(self, row: int) -> Tuple[Any, ...]:
+        return tuple(col[row] for col in self.cols)
+
+    def row_dict(self, row: int) -> Dict[str, Any]:
+        return dict(zip(self.columns, self.row_tuple(row)))
+
+    def sorted_rows(self) -> List[int]:
+        """Filas en orden de id (el orden estable de los scripts)."""
+        return sorted(range(len(self)), key=self.cols[0].__getitem__)
+
+
+class Entity:
+    """Vista sobre una fila de EntityTable (no guarda datos propios)."""
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: EntityTable, row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def etype(self) -> str:
+        return self.table.etype
 
-    def ensure_minimal(self):
-        if self.etype == 'persona':
-            self.props.setdefault('nombre', None)
-        elif self.etype == 'sintoma':
-            self.props.setdefault('tipo', None)
-        elif self.etype == 'actividad':
-            self.props.setdefault('nombre', None)
-        elif self.etype == 'medicacion':
-            self.props.setdefault('tipo', None)
+    @property
+    def key(self) -> str:
+        """Nombre de la columna clave (user_id | sintoma_id | ...)."""
+        return self.table.columns[0]
+
+    @property
+    def id(self) -> str:
+        return self.table.key(self.row)
+
+    def set(self, k: str, v: Optional[Any]) -> None:
+        self.table.set(self.row, k, v)
+
+    @property
+    def props(self) -> Dict[str, Any]:
+        t = self.table
+        props = {c: v for c, v in zip(t.columns, t.row_tuple(self.row)) if v is not None}
+        props.setdefault(NAME_COLUMN[t.etype], None)
+        if t.extra:
+            props.update({c: v for (r, c), v in t.extra.items() if r == self.row})
+        return props
+
+    def ensure_minimal(self) -> None:
+        pass  # la columna obligatoria existe siempre (None si no se conoce)
 
 
 class Collector:
-    def __init__(self):
-        self.entities: Dict[Tuple[str, str], Entity] = {}
-        self.relations = []  # List[Tuple[str, str, str]] = (rel_table, persona_user_id, right_key)
-        self.persona_index: Dict[str, str] = {}
-        self.sintoma_index: Dict[str, str] = {}
-        self.actividad_index: Dict[str, str] = {}
-        self.medicacion_index: Dict[str, str] = {}
+    __slots__ = ("tables", "index", "relations", "prop_only")
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, EntityTable] = {etype: EntityTable(etype) for etype in ENTITY_COLUMNS}
+        self.index: Dict[Tuple[str, str], int] = {}          # (etype, texto canónico) -> fila
+        self.relations: List[Tuple[str, str, str]] = []      # (relación, id persona, id destino)
+        # (etype, id) creadas solo por una propiedad aislada (PROP_OWNER, generador
+        # Cypher): el CypherPlan las escribe; el SqlPlan no, igual que compile_sql_plan
+        self.prop_only: Set[Tuple[str, str]] = set()
+
+    # ---------------- Camino rápido (filas) ----------------
+    def add(self, etype: str, text: str) -> int:
+        """Fila de la entidad nombrada por `text` (la crea si no existe)."""
+        canonical = text.strip().lower()
+        k = (etype, canonical)
+        row = self.index.get(k)
+        table = self.tables[etype]
+        if row is None:
+            row = table.row_for(f"{etype}_{slugify(canonical)}")
+            self.index[(etype, sys.intern(canonical))] = row
+        name = to_title_name(text) if etype == "persona" else canonical
+        table.set(row, NAME_COLUMN[etype], name)
+        return row
+
+    def find(self, etype: str, text: str) -> Optional[int]:
+        return self.index.get((etype, text))
+
+    def set(self, etype: str, row: int, column: str, value: Any) -> None:
+        self.tables[etype].set(row, column, value)
+
+    def relate(self, rel: str, persona_row: int, etype: str, row: int) -> None:
+        self.relations.append((rel, self.tables["persona"].key(persona_row), self.tables[etype].key(row)))
+
+    def iter_rows(self) -> Iterator[Tuple[str, EntityTable, int]]:
+        """(etype, tabla, fila) ordenado por tipo e id."""
+        for etype in sorted(self.tables):
+            table = self.tables[etype]
+            for row in table.sorted_rows():
+                yield etype, table, row
+
+    def __len__(self) -> int:
+        return sum(len(t) for t in self.tables.values())
 
+    # ---------------- API por objeto (compatibilidad) ----------------
     def _get_or_new(self, etype: str, keyvalue: str) -> Entity:
-        keycol = {
-            'persona': 'user_id',
-            'sintoma': 'sintoma_id',
-            'actividad': 'actividad_id',
-            'medicacion': 'medicacion_id',
-        }[etype]
-        k = (etype, keyvalue)
-        if k not in self.entities:
-            e = Entity(etype, keycol)
-            e.set(keycol, keyvalue)
-            self.entities[k] = e
-        return self.entities[k]
+        table = self.tables[etype]
+        return Entity(table, table.row_for(keyvalue))
 
     def persona_by_name(self, name: str) -> Entity:
-        canonical = name.strip().lower()
-        if canonical in self.persona_index:
-            uid = self.persona_index[canonical]
-        else:
-            uid = f"persona_{slugify(canonical)}"
-            self.persona_index[canonical] = uid
-        e = self._get_or_new('persona', uid)
-        e.set('nombre', to_title_name(name))
-        return e
+        return Entity(self.tables["persona"], self.add("persona", name))
 
     def sintoma_by_type(self, tipo: str) -> Entity:
-        canonical = tipo.strip().lower()
-        if canonical in self.sintoma_index:
-            sid = self.sintoma_index[canonical]
-        else:
-            sid = f"sintoma_{slugify(canonical)}"
-            self.sintoma_index[canonical] = sid
-        e = self._get_or_new('sintoma', sid)
-        e.set('tipo', canonical)
-        return e
+        return Entity(self.tables["sintoma"], self.add("sintoma", tipo))
 
     def actividad_by_name(self, nombre: str) -> Entity:
-        canonical = nombre.strip().lower()
-        if canonical in self.actividad_index:
-            aid = self.actividad_index[canonical]
-        else:
-            aid = f"actividad_{slugify(canonical)}"
-            self.actividad_index[canonical] = aid
-        e = self._get_or_new('actividad', aid)
-        e.set('nombre', canonical)
-        return e
+        return Entity(self.tables["actividad"], self.add("actividad", nombre))
 
     def medicacion_by_type(self, tipo: str) -> Entity:
-        canonical = tipo.strip().lower()
-        if canonical in self.medicacion_index:
-            mid = self.medicacion_index[canonical]
-        else:
-            mid = f"medicacion_{slugify(canonical)}"
-            self.medicacion_index[canonical] = mid
-        e = self._get_or_new('medicacion', mid)
-        e.set('tipo', canonical)
-        return e
+        return Entity(self.tables["medicacion"], self.add("medicacion", tipo))
+
+    @property
+    def entities(self) -> Dict[Tuple[str, str], Entity]:
+        return {(etype, table.key(row)): Entity(table, row) for etype, table, row in self.iter_rows()}
+
+    def _text_index(self, etype: str) -> Dict[str, str]:
+        table = self.tables[etype]
+        return {text: table.key(row) for (e, text), row in self.index.items() if e == etype}
+
+    @property
+    def persona_index(self) -> Dict[str, str]:
+        return self._text_index("persona")
+
+    @property
+    def sintoma_index(self) -> Dict[str, str]:
+        return self._text_index("sintoma")
+
+    @property
+    def actividad_index(self) -> Dict[str, str]:
+        return self._text_index("actividad")
+
+    @property
+    def medicacion_index(self) -> Dict[str, str]:
+        return self._text_index("medicacion")
@@ -0,0 +1,160 @@
+# triplets2bd/triplets2sql_rule_based/plan.py
+"""
+Plan de ejecución SQL parametrizado.
+
+En lugar de un script con los valores incrustados (sql_quote), el compilador
+produce un conjunto fijo de sentencias con parámetros (una por tabla) y las
+filas a aplicar. SqlPlan.execute() las lanza con executemany dentro de una
+única transacción; render_script() escribe el mismo plan como script de texto,
+solo para depuración/informes.
+
+Los upserts de entidades son condicionales: solo actualizan si alguna columna
+trae un valor no nulo distinto del guardado, así que repetir hechos no escribe.
+"""
+from __future__ import annotations
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .helpers import sql_quote
+from utils.schema_registry import NODES, RELATIONS
+
+Row = Tuple[object, ...]
+
+# Tablas de consulta precalculadas desde el registro (utils.schema_registry)
+# etype -> (tabla, columna clave, columnas restantes)
+ENTITY_TABLES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    n.etype: (n.etype, n.key, n.prop_names) for n in NODES.values()
+}
+
+# tabla de relación -> (columnas insertadas, SELECT, tabla destino, alias, columna clave destino)
+RELATION_TABLES: Dict[str, Tuple[str, str, str, str, str]] = {
+    r.table: (
+        ", ".join(["persona_id", NODES[r.target].key] + [c for c, _ in r.copy]),
+        ", ".join(["p.id", f"{r.alias}.id"] + [f"{r.alias}.{src}" for _, src in r.copy]),
+        r.target, r.alias, NODES[r.target].key,
+    )
+    for r in RELATIONS.values()
+}
+
+
+def _entity_sql(etype: str, values: Optional[List[str]] = None) -> str:
+    table, keycol, other_cols = ENTITY_TABLES[etype]
+    cols = [keycol] + list(other_cols)
+    vals = values if values is not None else ["?"] * len(cols)
+    insert = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(vals)})"
+    # Upsert condicional: un NULL no pisa lo guardado y, si ninguna columna cambia,
+    # el UPDATE no se ejecuta (ni dispara triggers). updated_at va en la misma sentencia.
+    updates = ",\n  ".join(f"{c} = COALESCE(excluded.{c}, {table}.{c})" for c in other_cols)
+    changed = "\n   OR ".join(
+        f"(excluded.{c} IS NOT NULL AND excluded.{c} IS NOT {table}.{c})" for c in other_cols
+    )
+    return (
+        insert
+        + f"\nON CONFLICT({keycol}) DO UPDATE SET\n  {updates},\n  updated_at = datetime('now')"
+        + f"\nWHERE {changed};"
+    )
+
+
+def _relation_sql(rel_table: str, left: str = "?", right: str = "?") -> str:
+    cols, select, target, alias, keycol = RELATION_TABLES[rel_table]
+    return (
+        f"INSERT OR IGNORE INTO {rel_table} ({cols})\n"
+        f"SELECT {select} FROM persona p, {target} {alias}\n"
+        f"WHERE p.user_id = {left} AND {alias}.{keycol} = {right};"
+    )
+
+
+# Sentencias preparadas (se construyen una vez por proceso)
+ENTITY_STATEMENTS: Dict[str, str] = {etype: _entity_sql(etype) for etype in ENTITY_TABLES}
+RELATION_STATEMENTS: Dict[str, str] = {rel: _relation_sql(rel) for rel in RELATION_TABLES}
+
+
+def _param(v: object) -> object:
+    # Mismo valor que acaba en BD con sql_quote (texto en minúsculas)
+    if v is None or isinstance(v, int):
+        return v
+    return str(v).lower()
+
+
+@dataclass
+class SqlPlan:
+    """Filas por tabla; el orden de inserción es el del script (entidades y luego relaciones)."""
+    entity_rows: Dict[str, List[Row]] = field(default_factory=dict)      # etype -> filas
+    relation_rows: Dict[str, List[Row]] = field(default_factory=dict)    # tabla -> (user_id, clave)
+
+    def add_entity(self, etype: str, props: Dict[str, object]) -> None:
+        _, keycol, other_cols = ENTITY_TABLES[etype]
+        row = tuple(_param(props.get(c)) for c in (keycol,) + other_cols)
+        self.entity_rows.setdefault(etype, []).append(row)
+
+    def add_entity_row(self, etype: str, values: Row) -> None:
+        """Como add_entity, con los valores ya en el orden de columnas de ENTITY_TABLES."""
+        self.entity_rows.setdefault(etype, []).append(tuple(_param(v) for v in values))
+
+    def add_relation(self, rel_table: str, left_key: str, right_key: str) -> None:
+        self.relation_rows.setdefault(rel_table, []).append((left_key, right_key))
+
+    @property
+    def statement_count(self) -> int:
+        """Sentencias equivalentes del script (una por fila)."""
+        return sum(len(r) for r in self.entity_rows.values()) + sum(len(r) for r in self.relation_rows.values())
+
+    def __bool__(self) -> bool:
+        return self.statement_count > 0
+
+    def merge(self, other: "SqlPlan") -> "SqlPlan":
+        """Añade las filas de `other` detrás de las propias (mismo orden de llegada)."""
+        for etype, rows in other.entity_rows.items():
+            self.entity_rows.setdefault(etype, []).extend(rows)
+        for rel_table, rows in other.relation_rows.items():
+            self.relation_rows.setdefault(rel_table, []).extend(rows)
+        return self
+
+    def to_dict(self) -> Dict[str, Dict[str, List[list]]]:
+        return {
+            "entity_rows": {k: [list(r) for r in v] for k, v in self.entity_rows.items()},
+            "relation_rows": {k: [list(r) for r in v] for k, v in self.relation_rows.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Dict[str, List[list]]]) -> "SqlPlan":
+        return cls(
+            entity_rows={k: [tuple(r) for r in v] for k, v in data.get("entity_rows", {}).items()},
+            relation_rows={k: [tuple(r) for r in v] for k, v in data.get("relation_rows", {}).items()},
+        )
+
+    def batches(self) -> List[Tuple[str, List[Row]]]:
+        out: List[Tuple[str, List[Row]]] = []
+        for etype in sorted(self.entity_rows):
+            out.append((ENTITY_STATEMENTS[etype], self.entity_rows[etype]))
+        for rel_table in sorted(self.relation_rows):
+            out.append((RELATION_STATEMENTS[rel_table], self.relation_rows[rel_table]))
+        return out
+
+    def execute(self, conn: sqlite3.Connection) -> int:
+        """Aplica el plan en una sola transacción; devuelve el nº de filas enviadas."""
+        if not self:
+            return 0
+        with conn:
+            for stmt, rows in self.batches():
+                conn.executemany(stmt, rows)
+        return self.statement_count
+
+    # ---------------- Render de depuración ----------------
+    def render_entity_sql(self) -> List[str]:
+        return [
+            _entity_sql(etype, [sql_quote(v) for v in row])
+            for etype in sorted(self.entity_rows)
+            for row in self.entity_rows[etype]
+        ]
+
+    def render_relation_sql(self) -> List[str]:
+        return [
+            _relation_sql(rel_table, f"'{left}'", f"'{right}'")
+            for rel_table in sorted(self.relation_rows)
+            for left, right in self.relation_rows[rel_table]
+        ]
+
+    def render_script(self) -> str:
+        return "\n".join(self.render_entity_sql() + self.render_relation_sql())
@@ -1,7 +1,8 @@
 # triplets2bd/utils/io.py
 from __future__ import annotations
 import json
-from typing import List, Tuple, Optional
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, Optional
 
 Triplet = Tuple[str, str, str]
 
@@ -9,22 +10,63 @@ def load_triplets_from_json_str(s: str) -> List[Triplet]:
     data = json.loads(s)
     return [(str(a), str(b), str(c)) for a, b, c in data]
 
+def _parse_text_line(line: str) -> Optional[Triplet]:
+    raw = line.strip()
+    if not raw:
+        return None
+    if raw.startswith("(") and raw.endswith(")"):
+        raw = raw[1:-1]
+    parts = [p.strip() for p in raw.split(",")]
+    if len(parts) != 3:
+        raise ValueError(f"Línea inválida (esperado 3 campos): {line}")
+    return (parts[0], parts[1], parts[2])
+
 def load_triplets_from_file(path: str) -> List[Triplet]:
     if path.lower().endswith(".json"):
         with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         return [(str(a), str(b), str(c)) for a, b, c in data]
 
-    rows: List[Triplet] = []
+    return list(iter_triplets_text(path))
+
+
+# ---------------- Lectura en streaming (memoria constante) ----------------
+def iter_triplets_text(path: str) -> Iterator[Triplet]:
+    """Una tripleta por línea: `s, v, o` o `(s, v, o)`."""
     with open(path, "r", encoding="utf-8") as f:
         for line in f:
+            t = _parse_text_line(line)
+            if t is not None:
+                yield t
+
+def iter_triplets_jsonl(path: str) -> Iterator[Triplet]:
+    """Una tripleta JSON por línea: `["s", "v", "o"]`."""
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
             raw = line.strip()
             if not raw:
                 continue
-            if raw.startswith("(") and raw.endswith(")"):
-                raw = raw[1:-1]
-            parts = [p.strip() for p in raw.split(",")]
-            if len(parts) != 3:
-                raise ValueError(f"Línea inválida (esperado 3 campos): {line}")
-            rows.append((parts[0], parts[1], parts[2]))
-    return rows
\ No newline at end of file
+            item = json.loads(raw)
+            if not isinstance(item, list) or len(item) != 3:
+                raise ValueError(f"Línea {n} inválida (esperado [s, v, o]): {raw}")
+            yield (str(item[0]), str(item[1]), str(item[2]))
+
+def iter_triplets_from_file(path: str) -> Iterator[Triplet]:
+    """
+    Lector en streaming según extensión (.jsonl o texto).
+    Un .json (array único) no se puede leer por partes: se carga entero.
+    """
+    low = path.lower()
+    if low.endswith(".jsonl"):
+        return iter_triplets_jsonl(path)
+    if low.endswith(".json"):
+        return iter(load_triplets_from_file(path))
+    return iter_triplets_text(path)
+
+def chunked(items: Iterable[Triplet], size: int) -> Iterator[List[Triplet]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
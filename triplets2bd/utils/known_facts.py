@@ -0,0 +1,211 @@
+# triplets2bd/utils/known_facts.py
+"""
+Vista de hechos ya guardados (por usuario) a partir de las tablas de dominio SQLite.
+
+Sirve para dos cosas:
+  - prompt_block(texto): solo los hechos que el extractor necesita para resolver
+    referencias del texto (p.ej. "los mareos han empeorado").
+  - diff(tripletas): descarta tripletas idénticas a hechos guardados antes de compilar,
+    manteniendo (o recuperando de la BD) la relación que ancla cada propiedad nueva.
+    Solo vale para escribir en la misma SQLite de la que salió la vista (`source`):
+    otro almacén (Neo4j, grafo en memoria) puede no tener esos hechos.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.constants import PROPERTY_VERBS, RELATION_VERBS
+from utils.schema_registry import NODES, RELATIONS
+from ..triplets2sql_rule_based.helpers import parse_age, normalize_date
+
+Triplet = Tuple[str, str, str]
+FactKey = Tuple[str, str, str]
+
+# Columna -> verbo con el que se muestra en el prompt (el primero de PROPERTY_VERBS)
+_PROP_VERB: Dict[str, str] = {}
+for _verb, (_prop, _kind) in PROPERTY_VERBS.items():
+    _PROP_VERB.setdefault(_prop, _verb)
+
+# (verbo, tabla de relación, tabla destino, columna nombre, columnas de propiedades)
+_RELATIONS = tuple(
+    (r.verb, r.table, r.target, NODES[r.target].key, NODES[r.target].name_prop, NODES[r.target].updatable_props)
+    for r in RELATIONS.values()
+)
+
+
+def _norm(s: object) -> str:
+    t = "".join(c for c in unicodedata.normalize("NFD", str(s)) if unicodedata.category(c) != "Mn")
+    return " ".join(t.strip().lower().split())
+
+
+def _words(s: str) -> str:
+    """Palabras de un texto ya normalizado, con separador en los bordes (para buscar frases enteras)."""
+    return " " + " ".join(re.findall(r"\w+", s)) + " "
+
+
+def fact_key(s: str, v: str, o: str) -> Optional[FactKey]:
+    """Clave comparable de una tripleta (None si no corresponde a un hecho del esquema)."""
+    s_n, v_l, o_n = _norm(s), v.strip().lower(), _norm(o)
+    if v_l in RELATION_VERBS:
+        return (s_n, v_l, o_n)
+    if v_l == "tiene":
+        age = parse_age(o)
+        return (s_n, "edad", str(age)) if age is not None else None
+    if v_l in PROPERTY_VERBS:
+        prop, kind = PROPERTY_VERBS[v_l]
+        value = normalize_date(o_n) if kind == "date" else o_n
+        return (s_n, prop, value) if value else None
+    return None
+
+
+@dataclass
+class KnownFacts:
+    user_id: Optional[str] = None
+    facts: Dict[FactKey, Triplet] = field(default_factory=dict)    # clave -> tripleta mostrable
+    anchors: Dict[str, Triplet] = field(default_factory=dict)      # entidad -> relación que la crea
+    source: Optional[str] = None                                   # ruta absoluta de la SQLite de origen
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def add(self, s: str, v: str, o: str) -> None:
+        key = fact_key(s, v, o)
+        if key is None:
+            return
+        shown = (" ".join(s.lower().split()), v, " ".join(o.lower().split()))
+        self.facts[key] = shown
+        if v in RELATION_VERBS:
+            self.anchors.setdefault(key[2], shown)
+
+    def relevant(self, text: str, max_facts: int = 40) -> List[Triplet]:
+        """Hechos cuyo sujeto u objeto aparece en el texto como palabras completas ("ana" no casa con "mañana")."""
+        t = _words(_norm(text))
+        out: List[Triplet] = []
+        for (s, v, o), shown in self.facts.items():
+            if _words(s) in t or (v in RELATION_VERBS and _words(o) in t):
+                out.append(shown)
+                if len(out) >= max_facts:
+                    break
+        return out
+
+    def prompt_block(self, text: str, max_facts: int = 40) -> str:
+        facts = self.relevant(text, max_facts=max_facts)
+        if not facts:
+            return ""
+        lines = "\n".join(f'("{s}", "{v}", "{o}")' for s, v, o in facts)
+        return (
+            "# HECHOS YA CONOCIDOS (solo para resolver referencias)\n"
+            "No los repitas; devuelve únicamente hechos nuevos o que hayan cambiado.\n"
+            f"{lines}"
+        )
+
+    def diff(self, triplets: List[Triplet]) -> Tuple[List[Triplet], List[Triplet]]:
+        """
+        Devuelve (tripletas a compilar, tripletas descartadas por ya conocidas).
+        Una propiedad nueva necesita en el lote la relación de su entidad para que el
+        compilador la cree; si esa relación ya era conocida se conserva o se recupera.
+        """
+        keys = [fact_key(*t) for t in triplets]
+        keep = {i for i, k in enumerate(keys) if k is None or k not in self.facts}
+
+        prop_subjects = {
+            keys[i][0] for i in keep
+            if keys[i] is not None and keys[i][1] not in RELATION_VERBS and keys[i][1] != "edad"
+        }
+        anchored = set()
+        for i, k in enumerate(keys):
+            if k is not None and k[1] in RELATION_VERBS and k[2] in prop_subjects:
+                keep.add(i)
+                anchored.add(k[2])
+
+        out = [t for i, t in enumerate(triplets) if i in keep]
+        for subj in sorted(prop_subjects - anchored):
+            anchor = self.anchors.get(subj)
+            if anchor is not None:
+                out.append(anchor)
+        dropped = [t for i, t in enumerate(triplets) if i not in keep]
+        return out, dropped
+
+
+def load_known_facts(conn: sqlite3.Connection, user_id: Optional[str] = None) -> KnownFacts:
+    """Lee los hechos guardados (de un persona.user_id o de todas las personas)."""
+    known = KnownFacts(user_id=user_id)
+    where = " WHERE p.user_id = ?" if user_id else ""
+    params: Tuple = (user_id,) if user_id else ()
+    try:
+        for nombre, edad in conn.execute(f"SELECT p.nombre, p.edad FROM persona p{where}", params):
+            if nombre and edad is not None:
+                known.add(nombre, "tiene", f"{edad} años")
+
+        for verb, link, table, fk, name_col, props in _RELATIONS:
+            cols = ", ".join(f"x.{c}" for c in (name_col,) + props)
+            q = (
+                f"SELECT p.nombre, {cols} FROM persona p "
+                f"JOIN {link} l ON l.persona_id = p.id "
+                f"JOIN {table} x ON x.id = l.{fk}{where}"
+            )
+            for row in conn.execute(q, params):
+                persona, name, values = row[0], row[1], row[2:]
+                if not (persona and name):
+                    continue
+                known.add(persona, verb, name)
+                for col, value in zip(props, values):
+                    if value is not None:
+                        known.add(name, _PROP_VERB[col], str(value))
+    except sqlite3.OperationalError:
+        pass  # esquema de dominio aún no creado: no hay hechos
+    return known
+
+
+# ---------------- Snapshot en caché por fichero ----------------
+_SNAPSHOTS: Dict[Tuple[str, Optional[str]], Tuple[Tuple[int, ...], KnownFacts]] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def _db_stamp(path: str) -> Tuple[int, ...]:
+    stamp: List[int] = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            stamp += [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp += [0, 0]
+    return tuple(stamp)
+
+
+def known_facts_snapshot(sqlite_db_path: str, user_id: Optional[str] = None) -> KnownFacts:
+    """Vista cacheada; se recarga si el fichero cambia o tras invalidate_known_facts()."""
+    path = os.path.abspath(sqlite_db_path)
+    key = (path, user_id)
+    stamp = _db_stamp(path)
+    with _SNAPSHOTS_LOCK:
+        cached = _SNAPSHOTS.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    if not os.path.exists(path):
+        known = KnownFacts(user_id=user_id)
+    else:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            known = load_known_facts(conn, user_id)
+        finally:
+            conn.close()
+    known.source = path
+    with _SNAPSHOTS_LOCK:
+        _SNAPSHOTS[key] = (stamp, known)
+    return known
+
+
+def invalidate_known_facts(sqlite_db_path: Optional[str] = None) -> None:
+    with _SNAPSHOTS_LOCK:
+        if sqlite_db_path is None:
+            _SNAPSHOTS.clear()
+            return
+        path = os.path.abspath(sqlite_db_path)
+        for key in [k for k in _SNAPSHOTS if k[0] == path]:
+            del _SNAPSHOTS[key]
@@ -0,0 +1,175 @@
+# triplets2bd/utils/memory_graph.py
+"""
+Backend de grafo en memoria.
+
+Nodos Persona/Sintoma/Actividad/Medicacion y aristas TOMA/PADECE/REALIZA en
+estructuras Python indexadas, con la misma semántica de upsert que los
+generadores deterministas (se alimenta de un CypherPlan):
+  - nodo nuevo: se guardan las props no nulas
+  - nodo existente: solo props actualizables, y un null conserva el valor
+  - relación: solo si existen ambos extremos (MATCH ... MERGE)
+  - nodo creado solo por una propiedad aislada (plan.prop_only): existe en el
+    grafo, como en Neo4j, pero to_sql_plan lo omite, como compile_sql_plan
+
+Sirve para medir el camino de compilación sin disco ni Neo4j y como buffer
+rápido que después se exporta a SQLite (SqlPlan) o Neo4j (CypherPlan).
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..triplets2cypher_rule_based.plan import CypherPlan, NODE_LABELS, REL_TARGETS
+from ..triplets2sql_rule_based.plan import SqlPlan
+from utils.schema_registry import RELATIONS
+
+Triplet = Tuple[str, str, str]
+Props = Dict[str, Any]
+
+# Etiqueta -> etype (inverso de NODE_LABELS)
+_LABEL_ETYPE = {label: etype for etype, (label, *_rest) in NODE_LABELS.items()}
+
+# Tipo de relación Cypher -> tabla SQL
+_REL_SQL_TABLE = {r.rel_type: r.table for r in RELATIONS.values()}
+
+
+class MemoryGraph:
+    def __init__(self) -> None:
+        # etype -> clave -> props (incluye la clave)
+        self._nodes: Dict[str, Dict[str, Props]] = {etype: {} for etype in NODE_LABELS}
+        # tipo -> persona -> {clave destino}
+        self._out: Dict[str, Dict[str, Set[str]]] = {rel: {} for rel in REL_TARGETS}
+        # tipo -> clave destino -> {persona}
+        self._in: Dict[str, Dict[str, Set[str]]] = {rel: {} for rel in REL_TARGETS}
+        # (etype, clave) de nodos que solo conocen propiedades aisladas
+        self._prop_only: Set[Tuple[str, str]] = set()
+        self._lock = threading.RLock()
+
+    # ---------------- Escritura ----------------
+    def upsert_node(self, etype: str, row: Props, prop_only: bool = False) -> None:
+        _, key, create_props, match_props = NODE_LABELS[etype]
+        with self._lock:
+            node = self._nodes[etype].get(row[key])
+            if node is None:
+                node = {key: row[key]}
+                node.update({p: row.get(p) for p in create_props if row.get(p) is not None})
+                self._nodes[etype][row[key]] = node
+                if prop_only:
+                    self._prop_only.add((etype, row[key]))
+            else:
+                node.update({p: row.get(p) for p in match_props if row.get(p) is not None})
+            if not prop_only:
+                self._prop_only.discard((etype, row[key]))
+
+    def merge_edge(self, rel_type: str, left: str, right: str) -> bool:
+        target_etype = _LABEL_ETYPE[REL_TARGETS[rel_type][0]]
+        with self._lock:
+            if left not in self._nodes["persona"] or right not in self._nodes[target_etype]:
+                return False
+            self._out[rel_type].setdefault(left, set()).add(right)
+            self._in[rel_type].setdefault(right, set()).add(left)
+            return True
+
+    def apply_plan(self, plan: CypherPlan) -> int:
+        """Aplica un CypherPlan (nodos y después relaciones); devuelve filas aplicadas."""
+        n = 0
+        with self._lock:
+            for etype in sorted(plan.node_rows):
+                key = NODE_LABELS[etype][1]
+                for row in plan.node_rows[etype]:
+                    self.upsert_node(etype, row, (etype, row[key]) in plan.prop_only)
+                    n += 1
+            for rel_type in sorted(plan.rel_rows):
+                for row in plan.rel_rows[rel_type]:
+                    n += self.merge_edge(rel_type, row["left"], row["right"])
+        return n
+
+    def apply_triplets(self, triplets: List[Triplet]) -> int:
+        from ..triplets2cypher_rule_based import compile_cypher_plan
+        return self.apply_plan(compile_cypher_plan(triplets))
+
+    def clear(self) -> None:
+        with self._lock:
+            for d in (*self._nodes.values(), *self._out.values(), *self._in.values()):
+                d.clear()
+            self._prop_only.clear()
+
+    # ---------------- Consulta ----------------
+    def node(self, etype: str, key: str) -> Optional[Props]:
+        with self._lock:
+            node = self._nodes[etype].get(key)
+            return dict(node) if node is not None else None
+
+    def nodes(self, etype: str) -> List[Props]:
+        with self._lock:
+            return [dict(n) for _, n in sorted(self._nodes[etype].items())]
+
+    def edges(self, rel_type: Optional[str] = None) -> Iterator[Tuple[str, str, str]]:
+        """(tipo, persona, destino) en orden estable."""
+        with self._lock:
+            rels = [rel_type] if rel_type else sorted(self._out)
+            out = [(rel, left, right)
+                   for rel in rels
+                   for left in sorted(self._out[rel])
+                   for right in sorted(self._out[rel][left])]
+        return iter(out)
+
+    def related(self, user_id: str, rel_type: str) -> List[Props]:
+        """Nodos destino de una persona por tipo de relación (p.ej. sus síntomas)."""
+        target_etype = _LABEL_ETYPE[REL_TARGETS[rel_type][0]]
+        with self._lock:
+            keys = sorted(self._out[rel_type].get(user_id, ()))
+            return [dict(self._nodes[target_etype][k]) for k in keys]
+
+    def personas_with(self, rel_type: str, key: str) -> List[Props]:
+        """Personas relacionadas con un nodo destino (p.ej. quién toma X)."""
+        with self._lock:
+            users = sorted(self._in[rel_type].get(key, ()))
+            return [dict(self._nodes["persona"][u]) for u in users]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = {NODE_LABELS[e][0]: len(v) for e, v in self._nodes.items()}
+            out.update({rel: sum(len(s) for s in v.values()) for rel, v in self._out.items()})
+        return out
+
+    # ---------------- Exportación ----------------
+    def to_cypher_plan(self) -> CypherPlan:
+        plan = CypherPlan()
+        with self._lock:
+            for etype in sorted(self._nodes):
+                for _, node in sorted(self._nodes[etype].items()):
+                    plan.add_node(etype, node)
+            for rel, left, right in self.edges():
+                plan.add_relation(rel, left, right)
+        return plan
+
+    def to_sql_plan(self) -> SqlPlan:
+        """SqlPlan del grafo sin los nodos prop_only (ver plan_from_collector en SQL)."""
+        plan = SqlPlan()
+        with self._lock:
+            for etype in sorted(self._nodes):
+                for key, node in sorted(self._nodes[etype].items()):
+                    if (etype, key) in self._prop_only:
+                        continue
+                    plan.add_entity(etype, node)
+            for rel, left, right in self.edges():
+                plan.add_relation(_REL_SQL_TABLE[rel], left, right)
+        return plan
+
+
+# ---------------- Grafos con nombre (por proceso) ----------------
+_GRAPHS: Dict[str, MemoryGraph] = {}
+_GRAPHS_LOCK = threading.Lock()
+
+
+def get_memory_graph(name: str = "default") -> MemoryGraph:
+    with _GRAPHS_LOCK:
+        graph = _GRAPHS.get(name)
+        if graph is None:
+            graph = _GRAPHS[name] = MemoryGraph()
+        return graph
+
+
+def drop_memory_graph(name: str = "default") -> None:
+    with _GRAPHS_LOCK:
+        _GRAPHS.pop(name, None)
@@ -1,18 +1,73 @@
 from __future__ import annotations
-from typing import Any, Iterable
-from neo4j import GraphDatabase, basic_auth
+import atexit
+import threading
+from typing import Any, Dict, Iterable, Tuple
+from neo4j import GraphDatabase, basic_auth, Driver
 from utils.config import settings
 
+# ---------------- Registro de drivers por proceso ----------------
+# Un driver (pool de conexiones + autenticación) por (uri, usuario); se reutiliza
+# entre runs y se cierra al salir del proceso.
+_DRIVERS: Dict[Tuple[str, str], Driver] = {}
+_DRIVERS_LOCK = threading.Lock()
+
+
+def get_driver(uri: str | None = None, user: str | None = None, password: str | None = None) -> Driver:
+    uri = uri or settings.NEO4J_URI
+    user = user or settings.NEO4J_USER
+    key = (uri, user)
+    with _DRIVERS_LOCK:
+        driver = _DRIVERS.get(key)
+        if driver is None:
+            driver = GraphDatabase.driver(
+                uri,
+                auth=basic_auth(user, password or settings.NEO4J_PASSWORD),
+                max_connection_lifetime=3600,
+            )
+            _DRIVERS[key] = driver
+        return driver
+
+
+def close_drivers() -> None:
+    with _DRIVERS_LOCK:
+        drivers = list(_DRIVERS.values())
+        _DRIVERS.clear()
+    for d in drivers:
+        try:
+            d.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_drivers)
+
+
 class Neo4jClient:
-    def __init__(self, uri: str | None = None, user: str | None = None, password: str | None = None):
-        self._driver = GraphDatabase.driver(
-            uri or settings.NEO4J_URI,
-            auth=basic_auth(user or settings.NEO4J_USER, password or settings.NEO4J_PASSWORD),
-            max_connection_lifetime=3600,
-        )
+    """
+    shared=True usa el driver del registro de proceso (close() no lo cierra);
+    shared=False mantiene el comportamiento anterior (driver propio).
+    """
+    def __init__(
+        self,
+        uri: str | None = None,
+        user: str | None = None,
+        password: str | None = None,
+        shared: bool = False,
+    ):
+        self.key: Tuple[str, str] = (uri or settings.NEO4J_URI, user or settings.NEO4J_USER)
+        self._shared = shared
+        if shared:
+            self._driver = get_driver(uri, user, password)
+        else:
+            self._driver = GraphDatabase.driver(
+                uri or settings.NEO4J_URI,
+                auth=basic_auth(user or settings.NEO4J_USER, password or settings.NEO4J_PASSWORD),
+                max_connection_lifetime=3600,
+            )
 
     def close(self):
-        self._driver.close()
+        if not self._shared:
+            self._driver.close()
 
     def write_many(self, cypher_and_params: Iterable[tuple[str, dict]]):
         def _tx(tx):
@@ -26,3 +81,7 @@ class Neo4jClient:
     def write(self, cypher: str, params: dict):
         with self._driver.session() as s:
             return s.run(cypher, **params).data()
+
+    def read(self, cypher: str, params: Dict[str, Any] | None = None):
+        with self._driver.session() as s:
+            return s.execute_read(lambda tx: tx.run(cypher, **(params or {})).data())
@@ -0,0 +1,154 @@
+# triplets2bd/utils/neo4j_writer.py
+"""
+Escritura de un CypherPlan grande en transacciones acotadas y sesiones paralelas.
+
+  - Cada transacción es un UNWIND de como mucho `chunk_rows` filas: un import
+    masivo no construye una única transacción gigante en el heap de Neo4j.
+  - Fase 1 (nodos) termina entera antes de la fase 2 (relaciones): los MATCH de
+    las relaciones encuentran siempre sus nodos.
+  - Dentro de cada fase las filas se reparten entre `sessions` sesiones por hash
+    de la clave (nodos) o de la persona origen (relaciones): un mismo nodo va
+    siempre a la misma sesión y en su orden de llegada, así que las sesiones
+    paralelas no se pisan al hacer MERGE.
+  - Dos relaciones hacia el mismo destino desde sesiones distintas pueden
+    bloquearse entre sí; Neo4j aborta una con TransientError (deadlock) y aquí se
+    reintenta el trozo con espera creciente, hasta `retries` veces.
+
+Los scripts Cypher (plantillas, LLM) van aparte: split_cypher_statements +
+execute_statements, una transacción por sentencia.
+"""
+from __future__ import annotations
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from neo4j.exceptions import TransientError
+
+from .neo4j_client import Neo4jClient
+from .types import ExecutionReport
+from ..triplets2cypher_rule_based.plan import CypherPlan, NODE_LABELS, NODE_STATEMENTS, REL_STATEMENTS
+
+DEFAULT_CHUNK_ROWS = 1000
+Chunk = Tuple[str, Dict[str, Any]]
+
+
+def _partition(rows: List[Dict[str, Any]], field: str, parts: int) -> List[List[Dict[str, Any]]]:
+    """Reparto estable por hash de row[field] (crc32: igual en todos los procesos)."""
+    if parts <= 1:
+        return [rows]
+    out: List[List[Dict[str, Any]]] = [[] for _ in range(parts)]
+    for row in rows:
+        out[zlib.crc32(str(row[field]).encode("utf-8")) % parts].append(row)
+    return out
+
+
+def _phase_chunks(groups: List[Tuple[str, List[Dict[str, Any]], str]], chunk_rows: int, sessions: int) -> List[List[Chunk]]:
+    """(sentencia, filas, campo de reparto) -> lista de trozos por sesión."""
+    lanes: List[List[Chunk]] = [[] for _ in range(max(1, sessions))]
+    for stmt, rows, field in groups:
+        for lane, part in zip(lanes, _partition(rows, field, len(lanes))):
+            for i in range(0, len(part), chunk_rows):
+                lane.append((stmt, {"rows": part[i:i + chunk_rows]}))
+    return [lane for lane in lanes if lane]
+
+
+def _write_lane(db: Neo4jClient, lane: List[Chunk], retries: int) -> Tuple[int, int]:
+    """Trozos de una sesión en orden; devuelve (transacciones, reintentos)."""
+    retried = 0
+    for stmt, params in lane:
+        attempt = 0
+        while True:
+            try:
+                db.write_many([(stmt, params)])
+                break
+            except TransientError:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                retried += 1
+                time.sleep(0.05 * 2 ** attempt)
+    return len(lane), retried
+
+
+def _run_phase(db: Neo4jClient, lanes: List[List[Chunk]], retries: int, stats: Dict[str, int]) -> None:
+    if len(lanes) <= 1:
+        results = [_write_lane(db, lane, retries) for lane in lanes]
+    else:
+        with ThreadPoolExecutor(max_workers=len(lanes), thread_name_prefix="neo4j-write") as pool:
+            futures = [pool.submit(_write_lane, db, lane, retries) for lane in lanes]
+            results = [f.result() for f in futures]   # propaga el primer error tras esperar al resto
+    for tx, retried in results:
+        stats["transactions"] += tx
+        stats["retries"] += retried
+
+
+def write_plan(
+    db: Neo4jClient,
+    plan: CypherPlan,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    sessions: int = 1,
+    retries: int = 3,
+) -> Dict[str, int]:
+    """
+    Aplica `plan` en trozos de `chunk_rows` filas (una transacción por trozo) con
+    hasta `sessions` sesiones en paralelo. Devuelve {rows, transactions, retries, sessions}.
+    Un trozo confirmado no se deshace si falla otro posterior (todo son MERGE: relanzar
+    el plan completo es idempotente).
+    """
+    stats = {"rows": plan.row_count, "transactions": 0, "retries": 0, "sessions": max(1, sessions)}
+    if not plan:
+        return stats
+    chunk_rows = max(1, chunk_rows)
+    nodes = [(NODE_STATEMENTS[e], plan.node_rows[e], NODE_LABELS[e][1]) for e in sorted(plan.node_rows)]
+    rels = [(REL_STATEMENTS[t], plan.rel_rows[t], "left") for t in sorted(plan.rel_rows)]
+    _run_phase(db, _phase_chunks(nodes, chunk_rows, sessions), retries, stats)
+    _run_phase(db, _phase_chunks(rels, chunk_rows, sessions), retries, stats)
+    return stats
+
+
+def split_cypher_statements(script: str) -> List[str]:
+    """
+    Divide un script Cypher en sentencias por ';', sin cortar dentro de literales
+    ('...', "...") ni de identificadores `...`. Descarta vacías y --SKIP--.
+    """
+    out: List[str] = []
+    buf: List[str] = []
+    quote: Optional[str] = None
+    escaped = False
+    for ch in script:
+        if quote:
+            buf.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\" and quote != "`":
+                escaped = True
+            elif ch == quote:
+                quote = None
+            continue
+        if ch == ";":
+            out.append("".join(buf).strip())
+            buf = []
+            continue
+        if ch in "'\"`":
+            quote = ch
+        buf.append(ch)
+    out.append("".join(buf).strip())
+    return [s for s in out if s and s != "--SKIP--"]
+
+
+def execute_statements(db: Neo4jClient, items: List[Tuple[str, str]]) -> ExecutionReport:
+    """Sentencias Cypher (origen, texto) una a una, cada una en su transacción: un fallo no arrastra al resto."""
+    report = ExecutionReport()
+    for item, (source, stmt) in enumerate(items):
+        if not stmt.strip() or stmt.strip() == "--SKIP--":
+            report.skipped += 1
+            continue
+        t0 = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            db.write_many([(stmt, {})])
+        except Exception as e:
+            error = e
+        report.record(source, stmt, 1, (time.perf_counter() - t0) * 1000, error, item)
+    return report
@@ -0,0 +1,63 @@
+# triplets2bd/utils/persona_profile.py
+"""
+Perfil desnormalizado por persona (tabla persona_profile, migración v4).
+
+Los triggers de v4 lo mantienen en la misma transacción que los upserts (plan
+determinista, plantillas, LLM o write-behind); aquí solo quedan la lectura por
+PRIMARY KEY y la reconstrucción para backfills o tras escrituras con los
+triggers desactivados.
+"""
+from __future__ import annotations
+import json
+import sqlite3
+from typing import Iterable, Optional
+
+from .types import PersonaProfile, PersonaRef, RelatedEntity
+from .schema_sqlite_bootstrap import PROFILE_LISTS, profile_refresh_sql
+from utils.schema_registry import NODES, RELATIONS
+
+PROFILE_VERBS = frozenset(verb for verb, *_ in PROFILE_LISTS)
+
+_SELECT = (
+    "SELECT user_id, nombre, edad, "
+    + ", ".join(column for _, column, *_ in PROFILE_LISTS)
+    + " FROM persona_profile WHERE user_id = ?"
+)
+
+
+def rebuild_persona_profiles(conn: sqlite3.Connection, user_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Recalcula persona_profile (todas las personas o solo `user_ids`) en una transacción
+    y borra perfiles huérfanos. Devuelve el nº de perfiles escritos.
+    """
+    ids = list(user_ids) if user_ids is not None else None
+    with conn:
+        if ids is None:
+            conn.execute("DELETE FROM persona_profile WHERE persona_id NOT IN (SELECT id FROM persona)")
+            cur = conn.execute(profile_refresh_sql("1"))
+        else:
+            marks = ", ".join("?" for _ in ids)
+            cur = conn.execute(profile_refresh_sql(f"p.user_id IN ({marks})"), ids) if ids else None
+    return cur.rowcount if cur is not None else 0
+
+
+def _entity(verb: str, item: dict) -> RelatedEntity:
+    n = NODES[RELATIONS[verb].target]
+    return RelatedEntity(
+        etype=n.etype,
+        key=item[n.key],
+        name=item.get(n.name_prop),
+        props=tuple((p, item.get(p)) for p in n.updatable_props),
+    )
+
+
+def load_persona_profile(conn: sqlite3.Connection, user_id: str, verbs: Iterable[str]) -> Optional[PersonaProfile]:
+    """Una búsqueda por PRIMARY KEY; None si la persona no existe. `verbs` ⊆ PROFILE_VERBS."""
+    row = conn.execute(_SELECT, (user_id,)).fetchone()
+    if row is None:
+        return None
+    lists = {verb: json.loads(raw) for (verb, *_), raw in zip(PROFILE_LISTS, row[3:])}
+    return PersonaProfile(
+        persona=PersonaRef(row[0], row[1], row[2]),
+        related=tuple((verb, tuple(_entity(verb, item) for item in lists[verb])) for verb in verbs),
+    )
@@ -0,0 +1,151 @@
+# triplets2bd/utils/query_cache.py
+"""
+Caché en proceso de resultados de lectura (ver triplets2bd.query).
+
+Cada entrada pertenece a un destino (("sql", ruta absoluta) o ("neo4j", uri)) y
+lleva etiquetas con las entidades que ha leído ("persona:persona_ana",
+"sintoma:sintoma_temblor"...). run_triplets_to_bd (y el volcado del
+write-behind) invalida solo las entradas cuyas etiquetas coinciden con las
+filas del plan determinista que acaba de escribir; un script LLM / plantilla
+(entidades no conocidas de antemano) o un reset invalidan el destino entero.
+
+Una carga que coincide con una invalidación del mismo destino no se guarda
+(contador de generación), así que la caché nunca devuelve un valor anterior a
+una escritura ya confirmada por el motor. Escrituras hechas por fuera del motor
+requieren invalidate_queries().
+"""
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Set, Tuple
+
+from ..triplets2sql_rule_based.plan import SqlPlan
+from ..triplets2cypher_rule_based.plan import CypherPlan, NODE_LABELS
+from utils.schema_registry import RELATIONS
+
+Target = Tuple[str, str]
+CacheKey = Tuple[Target, Hashable]
+
+MAX_ENTRIES = 4096
+
+_ENTRIES: "OrderedDict[CacheKey, Tuple[FrozenSet[str], Any]]" = OrderedDict()
+_BY_TAG: Dict[Tuple[Target, str], Set[CacheKey]] = {}
+_GENERATION: Dict[Target, int] = {}
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
+
+# tabla de relación -> etype destino (filas (user_id, clave destino) del SqlPlan)
+_SQL_REL_TARGET = {r.table: r.target for r in RELATIONS.values()}
+_CYPHER_REL_TARGET = {r.rel_type: r.target for r in RELATIONS.values()}
+
+
+def sql_target(sqlite_db_path: str) -> Target:
+    return ("sql", os.path.abspath(sqlite_db_path))
+
+
+def neo4j_target(uri: str) -> Target:
+    return ("neo4j", uri)
+
+
+def tag(etype: str, key: str) -> str:
+    return f"{etype}:{key}"
+
+
+def cached(target: Target, key: Hashable, load: Callable[[], Tuple[Any, Iterable[str]]]) -> Any:
+    """Valor de (target, key); si no está, load() -> (valor, etiquetas) y se guarda."""
+    ck = (target, key)
+    with _LOCK:
+        hit = _ENTRIES.get(ck)
+        if hit is not None:
+            _ENTRIES.move_to_end(ck)
+            _STATS["hits"] += 1
+            return hit[1]
+        _STATS["misses"] += 1
+        generation = _GENERATION.get(target, 0)
+
+    value, tags = load()
+    tags = frozenset(tags)
+    with _LOCK:
+        if _GENERATION.get(target, 0) != generation:
+            return value   # hubo una escritura mientras se leía: no se cachea
+        _ENTRIES[ck] = (tags, value)
+        for t in tags:
+            _BY_TAG.setdefault((target, t), set()).add(ck)
+        while len(_ENTRIES) > MAX_ENTRIES:
+            _drop(next(iter(_ENTRIES)))
+    return value
+
+
+def _drop(ck: CacheKey) -> None:
+    entry = _ENTRIES.pop(ck, None)
+    if entry is None:
+        return
+    for t in entry[0]:
+        keys = _BY_TAG.get((ck[0], t))
+        if keys is not None:
+            keys.discard(ck)
+            if not keys:
+                del _BY_TAG[(ck[0], t)]
+
+
+def invalidate_queries(target: Optional[Target] = None, tags: Optional[Iterable[str]] = None) -> int:
+    """
+    Sin target: vacía la caché. Con target y sin tags: todo el destino.
+    Con tags: solo las entradas del destino que leyeron alguna de esas entidades.
+    Devuelve el nº de entradas eliminadas.
+    """
+    with _LOCK:
+        _STATS["invalidations"] += 1
+        if target is None:
+            n = len(_ENTRIES)
+            _ENTRIES.clear()
+            _BY_TAG.clear()
+            for t in _GENERATION:
+                _GENERATION[t] += 1
+            return n
+        _GENERATION[target] = _GENERATION.get(target, 0) + 1
+        if tags is None:
+            doomed = [ck for ck in _ENTRIES if ck[0] == target]
+        else:
+            doomed = set()
+            for t in tags:
+                doomed |= _BY_TAG.get((target, t), set())
+        for ck in list(doomed):
+            _drop(ck)
+        return len(doomed)
+
+
+def sql_plan_tags(plan: Optional[SqlPlan]) -> Set[str]:
+    """Entidades que toca un SqlPlan (filas de entidad y ambos extremos de cada relación)."""
+    out: Set[str] = set()
+    if not plan:
+        return out
+    for etype, rows in plan.entity_rows.items():
+        out.update(tag(etype, row[0]) for row in rows)
+    for rel_table, rows in plan.relation_rows.items():
+        target = _SQL_REL_TARGET[rel_table]
+        for left, right in rows:
+            out.add(tag("persona", left))
+            out.add(tag(target, right))
+    return out
+
+
+def cypher_plan_tags(plan: Optional[CypherPlan]) -> Set[str]:
+    out: Set[str] = set()
+    if not plan:
+        return out
+    for etype, rows in plan.node_rows.items():
+        key = NODE_LABELS[etype][1]
+        out.update(tag(etype, row[key]) for row in rows)
+    for rel_type, rows in plan.rel_rows.items():
+        target = _CYPHER_REL_TARGET[rel_type]
+        for row in rows:
+            out.add(tag("persona", row["left"]))
+            out.add(tag(target, row["right"]))
+    return out
+
+
+def query_cache_stats() -> Dict[str, int]:
+    with _LOCK:
+        return {**_STATS, "entries": len(_ENTRIES), "tags": len(_BY_TAG)}
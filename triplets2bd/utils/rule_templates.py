@@ -0,0 +1,287 @@
+# triplets2bd/utils/rule_templates.py
+"""
+Plantillas aprendidas del LLM para tripletas sobrantes (modo híbrido).
+
+Cuando el script LLM de los sobrantes se ejecuta sin error, cada sobrante
+(s, v, o) se asocia a las sentencias que mencionan su objeto (y las de su
+sujeto que no mencionan otros objetos) y se guardan parametrizadas:
+
+    {{s}} / {{s|slug}} / {{s|title}}   sujeto en minúsculas / en ids / capitalizado
+    {{o}} / {{o|slug}} / {{o|title}}   ídem para el objeto
+
+La clave es (modo, verbo normalizado, forma del objeto: numero|fecha|texto).
+Los siguientes sobrantes con una clave conocida se compilan con la plantilla
+y no llegan al LLM. Es una clave gruesa: los sobrantes de verbos polisémicos
+("tiene" sin edad: un síntoma, un objeto, un familiar...) no se aprenden ni se
+compilan con plantilla. Desactivado por defecto (EngineOptions.rule_templates).
+Las plantillas viven en la tabla `rule_template` del mismo fichero SQLite que
+el log (el reset de dominio no la borra).
+
+Revisión / exportación / purga: python -m triplets2bd.main_rule_templates
+"""
+from __future__ import annotations
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..triplets2sql_rule_based.helpers import slugify, to_title_name, normalize_date
+from ..llm_triplets_to_bd import slugify as llm_slugify
+
+Triplet = Tuple[str, str, str]
+Key = Tuple[str, str, str]  # (modo, verbo, forma)
+
+_WORD = "a-z0-9áéíóúüñ"
+
+# Solo sentencias de escritura "constructivas" pueden convertirse en plantilla
+_ALLOWED_HEADS = {
+    "sql": ("insert", "update"),
+    "neo4j": ("merge", "match", "create"),
+}
+_FORBIDDEN = re.compile(r"\b(delete|drop|detach|remove|alter|pragma)\b", re.IGNORECASE)
+
+# Motivos de sobrante cuyo verbo no basta para decidir la traducción: siempre al LLM
+_NOT_LEARNED = frozenset({"tiene_sin_edad"})
+
+
+def _now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def ensure_rule_template_table(conn) -> None:
+    if getattr(conn, "rule_template_ready", False):
+        return
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS rule_template (
+            modo         TEXT NOT NULL,
+            verbo        TEXT NOT NULL,
+            forma        TEXT NOT NULL,
+            template     TEXT NOT NULL,
+            ejemplo      TEXT,
+            hits         INTEGER NOT NULL DEFAULT 0,
+            created_at   TEXT NOT NULL,
+            last_used_at TEXT,
+            PRIMARY KEY (modo, verbo, forma)
+        );
+        """
+    )
+    conn.commit()
+    try:
+        conn.rule_template_ready = True
+    except AttributeError:
+        pass  # sqlite3.Connection no admite atributos
+
+
+# ---------------------------------------------------------------------
+# Claves
+# ---------------------------------------------------------------------
+
+def object_shape(obj: str) -> str:
+    o = obj.strip().lower()
+    if re.fullmatch(r"\d+([.,]\d+)?", o):
+        return "numero"
+    if normalize_date(o):
+        return "fecha"
+    return "texto"
+
+
+def template_key(triplet: Triplet, modo: str) -> Key:
+    _, v, o = triplet
+    return (modo, slugify(v), object_shape(o))
+
+
+# ---------------------------------------------------------------------
+# Parametrización
+# ---------------------------------------------------------------------
+
+def _split_statements(script: str, modo: str) -> List[str]:
+    if modo == "sql":
+        from .schema_sqlite_bootstrap import split_sql_statements
+        return [s.strip().rstrip(";") for s in split_sql_statements(script)]
+    from .neo4j_writer import split_cypher_statements
+    return split_cypher_statements(script)
+
+
+def _forms(value: str) -> Dict[str, str]:
+    """Texto tal como puede aparecer en el script -> tipo de marcador."""
+    low = value.strip().lower()
+    forms = {
+        slugify(low): "slug",
+        llm_slugify(low): "slug",
+        low: "",
+        to_title_name(low) or low: "title",
+    }
+    return {text: kind for text, kind in forms.items() if text}
+
+
+def _forms_regex(texts: Iterable[str]) -> "re.Pattern[str]":
+    alts = "|".join(re.escape(t) for t in sorted(set(texts), key=len, reverse=True))
+    return re.compile(rf"(?<![{_WORD}])({alts})(?![{_WORD}_])")
+
+
+def _mentions(stmt: str, value: str) -> bool:
+    return bool(_forms_regex(_forms(value)).search(stmt))
+
+
+def _parametrize(stmt: str, s: str, o: str) -> str:
+    """Sustituye en una pasada las apariciones de s/o por sus marcadores."""
+    table: Dict[str, Tuple[str, str]] = {}
+    for role, value in (("s", s), ("o", o)):
+        for text, kind in _forms(value).items():
+            table.setdefault(text, (role, kind))
+
+    def _sub(m: "re.Match[str]") -> str:
+        role, kind = table[m.group(1)]
+        # Precedido de '_' es parte de un id (persona_<slug>)
+        if m.start() > 0 and stmt[m.start() - 1] == "_":
+            kind = "slug"
+        return "{{" + role + (f"|{kind}" if kind else "") + "}}"
+
+    return _forms_regex(table).sub(_sub, stmt)
+
+
+def _valid_statement(stmt: str, modo: str) -> bool:
+    head = stmt.lstrip().lower()
+    return head.startswith(_ALLOWED_HEADS.get(modo, ())) and not _FORBIDDEN.search(stmt)
+
+
+def extract_templates(
+    leftovers: List[Tuple[Triplet, str]],
+    script: str,
+    modo: str,
+) -> Dict[Key, Tuple[str, Triplet]]:
+    """
+    Atribuye las sentencias del script LLM a cada sobrante por sus literales.
+    Solo se aprende si la atribución es inequívoca y todo el bloque es válido.
+    """
+    stmts = _split_statements(script, modo)
+    objects = {t[2].strip().lower() for (t, _) in leftovers}
+    out: Dict[Key, Tuple[str, Triplet]] = {}
+    for (t, reason) in leftovers:
+        if reason in _NOT_LEARNED:
+            continue
+        s, _, o = (x.strip().lower() for x in t)
+        if len(o) < 3 or "'" in s or "'" in o or _mentions(s, o) or _mentions(o, s):
+            continue
+        others = [x for x in objects if x != o and not _mentions(o, x)]
+        own: List[str] = []
+        for stmt in stmts:
+            if any(_mentions(stmt, x) for x in others):
+                continue  # sentencia compartida con otro sobrante: no atribuible
+            if _mentions(stmt, o) or _mentions(stmt, s):
+                own.append(stmt)
+        if not any(_mentions(stmt, o) for stmt in own):
+            continue
+        if not all(_valid_statement(stmt, modo) for stmt in own):
+            continue
+        template = ";\n".join(_parametrize(stmt, s, o) for stmt in own) + ";"
+        out.setdefault(template_key(t, modo), (template, t))
+    return out
+
+
+def render_template(template: str, triplet: Triplet, modo: str) -> str:
+    s, _, o = (x.strip().lower() for x in triplet)
+    quote = (lambda x: x.replace("'", "''")) if modo == "sql" else (lambda x: x.replace("'", "\\'"))
+    values = {
+        "s": s, "s|slug": slugify(s), "s|title": to_title_name(s) or s,
+        "o": o, "o|slug": slugify(o), "o|title": to_title_name(o) or o,
+    }
+    return re.sub(r"\{\{(s|o)(\|slug|\|title)?\}\}", lambda m: quote(values[m.group(0)[2:-2]]), template)
+
+
+# ---------------------------------------------------------------------
+# Almacén (tabla rule_template)
+# ---------------------------------------------------------------------
+
+def apply_rule_templates(
+    conn,
+    leftovers: List[Tuple[Triplet, str]],
+    modo: str,
+) -> Tuple[str, List[Tuple[Triplet, str]]]:
+    """
+    Compila los sobrantes con plantilla conocida.
+    Devuelve (script compilado, sobrantes que siguen necesitando el LLM).
+    """
+    if not leftovers:
+        return "", leftovers
+    ensure_rule_template_table(conn)
+    known: Dict[Key, str] = {
+        (m, v, f): tpl
+        for m, v, f, tpl in conn.execute(
+            "SELECT modo, verbo, forma, template FROM rule_template WHERE modo = ?", (modo,)
+        ).fetchall()
+    }
+    rendered: List[str] = []
+    used: Dict[Key, int] = {}
+    pending: List[Tuple[Triplet, str]] = []
+    for item in leftovers:
+        key = template_key(item[0], modo)
+        tpl = known.get(key) if item[1] not in _NOT_LEARNED else None
+        if tpl is None:
+            pending.append(item)
+            continue
+        rendered.append(render_template(tpl, item[0], modo))
+        used[key] = used.get(key, 0) + 1
+    if used:
+        now = _now_iso()
+        conn.executemany(
+            "UPDATE rule_template SET hits = hits + ?, last_used_at = ? WHERE modo = ? AND verbo = ? AND forma = ?",
+            [(n, now, *key) for key, n in used.items()],
+        )
+        conn.commit()
+    return "\n".join(rendered), pending
+
+
+def learn_rule_templates(
+    conn,
+    leftovers: List[Tuple[Triplet, str]],
+    script: str,
+    modo: str,
+) -> int:
+    """
+    Guarda plantillas nuevas a partir de un script LLM ya ejecutado con éxito.
+    Devuelve cuántas claves se han extraído (las ya conocidas no se sobrescriben).
+    """
+    learned = extract_templates(leftovers, script, modo)
+    if not learned:
+        return 0
+    ensure_rule_template_table(conn)
+    now = _now_iso()
+    conn.executemany(
+        "INSERT OR IGNORE INTO rule_template (modo, verbo, forma, template, ejemplo, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(*key, tpl, json.dumps(list(t), ensure_ascii=False), now) for key, (tpl, t) in learned.items()],
+    )
+    conn.commit()
+    return len(learned)
+
+
+def list_rule_templates(conn, modo: Optional[str] = None) -> List[Dict[str, Any]]:
+    ensure_rule_template_table(conn)
+    cols = ("modo", "verbo", "forma", "template", "ejemplo", "hits", "created_at", "last_used_at")
+    sql = f"SELECT {', '.join(cols)} FROM rule_template"
+    params: Tuple[Any, ...] = ()
+    if modo:
+        sql += " WHERE modo = ?"
+        params = (modo,)
+    sql += " ORDER BY hits DESC, modo, verbo, forma"
+    return [dict(zip(cols, row)) for row in conn.execute(sql, params).fetchall()]
+
+
+def delete_rule_template(conn, modo: str, verbo: str, forma: str) -> None:
+    ensure_rule_template_table(conn)
+    conn.execute("DELETE FROM rule_template WHERE modo = ? AND verbo = ? AND forma = ?", (modo, verbo, forma))
+    conn.commit()
+
+
+def evict_rule_templates(conn, unused_days: float = 30.0) -> int:
+    """Borra plantillas que no se han usado (ni creado) en los últimos `unused_days` días."""
+    ensure_rule_template_table(conn)
+    cutoff = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - unused_days * 86400))
+    cur = conn.execute(
+        "DELETE FROM rule_template WHERE COALESCE(last_used_at, created_at) < ?",
+        (cutoff,),
+    )
+    conn.commit()
+    return max(cur.rowcount, 0)
@@ -1,5 +1,9 @@
 from __future__ import annotations
+import re
+import threading
+from typing import List, Set, Tuple
 from .neo4j_client import Neo4jClient
+from utils.schema_registry import NODES
 
 
 # --- Existencia de fecha en TODAS las relaciones que usas ---
@@ -8,38 +12,74 @@ from .neo4j_client import Neo4jClient
     #"CREATE CONSTRAINT rel_fecha_realiza IF NOT EXISTS FOR ()-[r:REALIZA]-() REQUIRE r.fecha IS NOT NULL",
     #"CREATE CONSTRAINT rel_fecha_conoce IF NOT EXISTS FOR ()-[r:CONOCE]-() REQUIRE r.fecha IS NOT NULL",
 
-# Claves naturales por id
+# Claves naturales por id y nombre obligatorio (desde utils.schema_registry)
 CONSTRAINTS = [
-    #UNICIDAD
-    "CREATE CONSTRAINT persona_id IF NOT EXISTS FOR (n:Persona) REQUIRE n.user_id IS UNIQUE",
-    "CREATE CONSTRAINT sintoma_id IF NOT EXISTS FOR (n:Sintoma) REQUIRE n.sintoma_id IS UNIQUE",
-    "CREATE CONSTRAINT actividad_id IF NOT EXISTS FOR (n:Actividad) REQUIRE n.actividad_id IS UNIQUE",
-    "CREATE CONSTRAINT medicacion_id IF NOT EXISTS FOR (n:Medicacion) REQUIRE n.medicacion_id IS UNIQUE",
-
-    #PROPIEDAD NOT NULL
-    "CREATE CONSTRAINT persona_nombre_req IF NOT EXISTS FOR (n:Persona) REQUIRE n.nombre IS NOT NULL",
-    "CREATE CONSTRAINT sintoma_tipo_req IF NOT EXISTS FOR (n:Sintoma) REQUIRE n.tipo IS NOT NULL",
-    "CREATE CONSTRAINT actividad_nombre_req IF NOT EXISTS FOR (n:Actividad) REQUIRE n.nombre IS NOT NULL",
-    "CREATE CONSTRAINT medicacion_tipo_req IF NOT EXISTS FOR (n:Medicacion) REQUIRE n.tipo IS NOT NULL",
+    # UNICIDAD
+    *(f"CREATE CONSTRAINT {n.etype}_id IF NOT EXISTS FOR (n:{n.label}) REQUIRE n.{n.key} IS UNIQUE"
+      for n in NODES.values()),
+    # PROPIEDAD NOT NULL
+    *(f"CREATE CONSTRAINT {n.etype}_{n.name_prop}_req IF NOT EXISTS FOR (n:{n.label}) REQUIRE n.{n.name_prop} IS NOT NULL"
+      for n in NODES.values()),
 ]
 
+# Un índice por la prop que nombra cada nodo
+INDEXES = [
+    f"CREATE INDEX {n.etype}_{n.name_prop} IF NOT EXISTS FOR (n:{n.label}) ON (n.{n.name_prop})"
+    for n in NODES.values()
+]
 
 
-INDEXES = [
-    # Persona
-    "CREATE INDEX persona_nombre IF NOT EXISTS FOR (n:Persona) ON (n.nombre)",
+def bootstrap(db: Neo4jClient):
+    for cy in CONSTRAINTS + INDEXES:
+        db.write(cy, {})
 
-    # Sintoma
-    "CREATE INDEX sintoma_tipo IF NOT EXISTS FOR (n:Sintoma) ON (n.tipo)",
 
-    # Actividad
-    "CREATE INDEX actividad_nombre IF NOT EXISTS FOR (n:Actividad) ON (n.nombre)",
+# ---------------- Bootstrap una vez por proceso ----------------
+_NAME_RE = re.compile(r"^CREATE\s+(?:CONSTRAINT|INDEX)\s+(\w+)", re.IGNORECASE)
+_BOOTSTRAPPED: Set[Tuple[str, str]] = set()
+_BOOTSTRAP_LOCK = threading.Lock()
 
-    # Medicacion
-    "CREATE INDEX medicacion_tipo IF NOT EXISTS FOR (n:Medicacion) ON (n.tipo)",
-]
 
+def _existing_names(db: Neo4jClient) -> Set[str]:
+    names: Set[str] = set()
+    for q in ("SHOW CONSTRAINTS YIELD name", "SHOW INDEXES YIELD name"):
+        names |= {row["name"] for row in db.write(q, {})}
+    return names
 
-def bootstrap(db: Neo4jClient):
+
+def missing_statements(db: Neo4jClient) -> List[str]:
+    """Sentencias de CONSTRAINTS + INDEXES cuyo nombre aún no existe en la BD."""
+    existing = _existing_names(db)
+    out = []
     for cy in CONSTRAINTS + INDEXES:
-        db.write(cy, {})
\ No newline at end of file
+        m = _NAME_RE.match(cy)
+        if m is None or m.group(1) not in existing:
+            out.append(cy)
+    return out
+
+
+def ensure_schema(db: Neo4jClient) -> int:
+    """
+    Como bootstrap(), pero solo la primera vez por (uri, usuario) en el proceso:
+    consulta SHOW CONSTRAINTS/INDEXES y crea únicamente lo que falte.
+    Devuelve el nº de sentencias ejecutadas.
+    """
+    key = getattr(db, "key", None)
+    with _BOOTSTRAP_LOCK:
+        if key is not None and key in _BOOTSTRAPPED:
+            return 0
+        stmts = missing_statements(db)
+        for cy in stmts:
+            db.write(cy, {})
+        if key is not None:
+            _BOOTSTRAPPED.add(key)
+        return len(stmts)
+
+
+def forget_schema(db: Neo4jClient | None = None) -> None:
+    """Olvida la caché de bootstrap (todas las BDs o la de `db`)."""
+    with _BOOTSTRAP_LOCK:
+        if db is None:
+            _BOOTSTRAPPED.clear()
+        else:
+            _BOOTSTRAPPED.discard(getattr(db, "key", None))
\ No newline at end of file
@@ -1,7 +1,11 @@
 # schema_sqlite_bootstrap.py
 from __future__ import annotations
+import sqlite3
 from textwrap import dedent
 from sqlite3 import Connection
+from typing import List, Tuple
+
+from utils.schema_registry import NODES, RELATIONS
 
 DDL = dedent("""
 PRAGMA foreign_keys = ON;
@@ -174,24 +178,238 @@ def reset_sql(conn: Connection) -> None:
     for v in vistas:
         cur.execute(f"DROP VIEW IF EXISTS {v};")
 
-    # 2) Tablas de relación -> tablas base -> tablas auxiliares (incluye 'log')
+    # 2) Perfil desnormalizado -> tablas de relación -> tablas base
     tablas = (
-        "persona_realiza_actividad",
-        "persona_padece_sintoma",
-        "persona_toma_medicacion",
-        "medicacion",
-        "actividad",
-        "sintoma",
-        "persona",
+        "persona_profile",
+        *reversed([r.table for r in RELATIONS.values()]),
+        *reversed(list(NODES)),
     )
     for t in tablas:
         cur.execute(f"DROP TABLE IF EXISTS {t};")
 
+    # 3) El esquema vuelve a la versión 0 (el próximo bootstrap lo recrea)
+    cur.execute("PRAGMA user_version = 0;")
     cur.execute("PRAGMA foreign_keys = ON;")
     conn.commit()
 
 
 
-def bootstrap_sqlite(conn: Connection) -> None:
-    conn.executescript(DDL)
-    conn.commit()
+# ==============
+# Migraciones (PRAGMA user_version)
+# ==============
+# Pasos ordenados (versión destino, script). El paso 1 es el DDL original, idempotente,
+# así que una BD creada antes del versionado se adopta sin cambios.
+# Para cambiar el esquema: añadir (n+1, "ALTER ...") al final; no editar pasos ya publicados.
+# v2: los upserts deterministas ya fijan updated_at en la misma sentencia; los triggers
+# solo actúan si un UPDATE no lo tocó (evita la segunda escritura por fila).
+_TRIGGERS_V2 = "\n".join(
+    dedent(f"""
+    DROP TRIGGER IF EXISTS trg_{t}_updated;
+    CREATE TRIGGER trg_{t}_updated
+    AFTER UPDATE ON {t}
+    WHEN NEW.updated_at IS OLD.updated_at
+    BEGIN
+      UPDATE {t} SET updated_at = datetime('now') WHERE id = NEW.id;
+    END;
+    """)
+    for t in ("persona", "sintoma", "actividad", "medicacion")
+)
+
+
+# v3: índices cubrientes para las lecturas de triplets2bd.query. "Personas con X" recorre
+# (destino, persona) sin ir a la tabla N:M; el perfil ya va por la PRIMARY KEY de la N:M.
+# Sobraban idx_persona_user_id (duplica el UNIQUE) y los índices por persona_id de las
+# N:M (prefijo de su PRIMARY KEY): menos índices que mantener en cada upsert.
+_COVERING_V3 = dedent("""
+DROP INDEX IF EXISTS idx_persona_user_id;
+
+DROP INDEX IF EXISTS idx_toma_persona;
+DROP INDEX IF EXISTS idx_toma_medicacion;
+CREATE INDEX IF NOT EXISTS idx_toma_medicacion_persona ON persona_toma_medicacion(medicacion_id, persona_id);
+
+DROP INDEX IF EXISTS idx_padece_persona;
+DROP INDEX IF EXISTS idx_padece_sintoma;
+CREATE INDEX IF NOT EXISTS idx_padece_sintoma_persona ON persona_padece_sintoma(sintoma_id, persona_id);
+
+DROP INDEX IF EXISTS idx_realiza_persona;
+DROP INDEX IF EXISTS idx_realiza_actividad;
+CREATE INDEX IF NOT EXISTS idx_realiza_actividad_persona ON persona_realiza_actividad(actividad_id, persona_id);
+""")
+
+
+# v4: persona_profile, perfil desnormalizado (una fila por persona, listas en JSON) que
+# mantienen los triggers en la misma transacción que los upserts; leerlo es una búsqueda
+# por PRIMARY KEY en lugar de tres joins de las vistas vw_persona_*.
+# Columnas fijas (v4 publicado): un tipo nuevo del registro necesita su propio paso.
+# (verbo, columna JSON, tabla N:M, tabla destino, clave destino, columnas del destino)
+PROFILE_LISTS: Tuple[Tuple[str, str, str, str, str, Tuple[str, ...]], ...] = (
+    ("toma", "medicaciones", "persona_toma_medicacion", "medicacion", "medicacion_id",
+     ("tipo", "periodicidad")),
+    ("padece", "sintomas", "persona_padece_sintoma", "sintoma", "sintoma_id",
+     ("tipo", "fecha_inicio", "fecha_fin", "categoria", "frecuencia", "gravedad")),
+    ("realiza", "actividades", "persona_realiza_actividad", "actividad", "actividad_id",
+     ("nombre", "categoria", "frecuencia")),
+)
+
+
+def _profile_list_sql(spec: Tuple[str, str, str, str, str, Tuple[str, ...]], persona_id: str) -> str:
+    """Subconsulta con la lista JSON (ordenada por nombre) de una relación de la persona `persona_id`."""
+    _, _, link, target, key, cols = spec
+    fields = ", ".join(f"'{c}', x.{c}" for c in (key,) + cols)
+    return (
+        f"(SELECT json_group_array(json_object({fields})) FROM "
+        f"(SELECT x.* FROM {link} l JOIN {target} x ON x.id = l.{key} "
+        f"WHERE l.persona_id = {persona_id} ORDER BY x.{cols[0]}) x)"
+    )
+
+
+def profile_refresh_sql(where: str) -> str:
+    """Recalcula por completo las filas de persona_profile de las personas `p` que cumplen `where`."""
+    columns = [column for _, column, *_ in PROFILE_LISTS]
+    updates = ", ".join(f"{c} = excluded.{c}" for c in ["persona_id", "nombre", "edad", *columns, "updated_at"])
+    # Upsert y no INSERT OR REPLACE: dentro de un trigger manda la política de conflicto de
+    # la sentencia exterior (el INSERT OR IGNORE de las relaciones la convertiría en IGNORE)
+    return (
+        f"INSERT INTO persona_profile (user_id, persona_id, nombre, edad, {', '.join(columns)}, updated_at)\n"
+        f"SELECT p.user_id, p.id, p.nombre, p.edad,\n  "
+        + ",\n  ".join(_profile_list_sql(spec, "p.id") for spec in PROFILE_LISTS)
+        + f",\n  datetime('now')\nFROM persona p WHERE {where}\n"
+        + f"ON CONFLICT(user_id) DO UPDATE SET {updates};"
+    )
+
+
+def _profile_v4() -> str:
+    json_cols = "".join(f"  {column} TEXT NOT NULL DEFAULT '[]',\n" for _, column, *_ in PROFILE_LISTS)
+    out = [
+        "CREATE TABLE IF NOT EXISTS persona_profile (\n"
+        "  user_id    TEXT PRIMARY KEY,\n"
+        "  persona_id INTEGER NOT NULL UNIQUE,\n"
+        "  nombre     TEXT,\n"
+        "  edad       INTEGER,\n"
+        f"{json_cols}"
+        "  updated_at TEXT NOT NULL DEFAULT (datetime('now'))\n"
+        ") WITHOUT ROWID;",
+        # Persona: alta (listas vacías; las rellenan los triggers de relación), cambio de nombre/edad, baja
+        "CREATE TRIGGER IF NOT EXISTS trg_profile_persona_ins AFTER INSERT ON persona\n"
+        "BEGIN\n  INSERT INTO persona_profile (user_id, persona_id, nombre, edad)\n"
+        "  VALUES (NEW.user_id, NEW.id, NEW.nombre, NEW.edad)\n"
+        "  ON CONFLICT(user_id) DO UPDATE SET persona_id = excluded.persona_id, nombre = excluded.nombre,\n"
+        "    edad = excluded.edad, updated_at = datetime('now');\nEND;",
+        "CREATE TRIGGER IF NOT EXISTS trg_profile_persona_upd AFTER UPDATE OF nombre, edad ON persona\n"
+        "BEGIN\n  UPDATE persona_profile SET nombre = NEW.nombre, edad = NEW.edad, updated_at = datetime('now')\n"
+        "  WHERE persona_id = NEW.id;\nEND;",
+        "CREATE TRIGGER IF NOT EXISTS trg_profile_persona_del AFTER DELETE ON persona\n"
+        "BEGIN\n  DELETE FROM persona_profile WHERE persona_id = OLD.id;\nEND;",
+    ]
+    for spec in PROFILE_LISTS:
+        verb, column, link, target, key, cols = spec
+        # Relación nueva o borrada: solo la lista de esa relación y esa persona
+        # (un INSERT OR IGNORE repetido no inserta, así que no dispara)
+        for event, row in (("ins", "NEW"), ("del", "OLD")):
+            out.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_profile_{verb}_{event} "
+                f"AFTER {'INSERT' if event == 'ins' else 'DELETE'} ON {link}\n"
+                f"BEGIN\n  UPDATE persona_profile SET {column} = "
+                f"{_profile_list_sql(spec, f'{row}.persona_id')}, updated_at = datetime('now')\n"
+                f"  WHERE persona_id = {row}.persona_id;\nEND;"
+            )
+        # Cambio de props del destino: las personas enlazadas (índice cubriente de v3). El
+        # upsert condicional no actualiza si nada cambia, así que repetir hechos no dispara.
+        out.append(
+            f"CREATE TRIGGER IF NOT EXISTS trg_profile_{target}_upd AFTER UPDATE OF {', '.join(cols)} ON {target}\n"
+            f"BEGIN\n  UPDATE persona_profile SET {column} = "
+            f"{_profile_list_sql(spec, 'persona_profile.persona_id')}, updated_at = datetime('now')\n"
+            f"  WHERE persona_id IN (SELECT persona_id FROM {link} WHERE {key} = NEW.id);\nEND;"
+        )
+    # Perfiles de las personas ya guardadas
+    out.append(profile_refresh_sql("1"))
+    return "\n\n".join(out) + "\n"
+
+
+_PROFILE_V4 = _profile_v4()
+
+
+# v5: la guarda de v2 compara textos de resolución de segundo; un upsert en el mismo
+# segundo que la escritura anterior deja updated_at igual y el trigger volvía a escribir
+# la fila. Ahora solo actúa si además el valor guardado es anterior a ahora, es decir,
+# si su UPDATE cambiaría algo (mismo formato datetime() en ambos lados).
+_TRIGGERS_V5 = "\n".join(
+    dedent(f"""
+    DROP TRIGGER IF EXISTS trg_{t}_updated;
+    CREATE TRIGGER trg_{t}_updated
+    AFTER UPDATE ON {t}
+    WHEN NEW.updated_at IS OLD.updated_at AND OLD.updated_at < datetime('now')
+    BEGIN
+      UPDATE {t} SET updated_at = datetime('now') WHERE id = NEW.id;
+    END;
+    """)
+    for t in ("persona", "sintoma", "actividad", "medicacion")
+)
+
+
+# v1..v5 están publicados tal cual. Un tipo nuevo en utils.schema_registry se añade con
+# un paso más (n+1, DDL de su tabla y su tabla de relación).
+MIGRATIONS: List[Tuple[int, str]] = [
+    (1, DDL),
+    (2, _TRIGGERS_V2),
+    (3, _COVERING_V3),
+    (4, _PROFILE_V4),
+    (5, _TRIGGERS_V5),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def split_sql_statements(script: str) -> List[str]:
+    """
+    Divide un script en sentencias completas. Se corta en cada ';' que cierra
+    sentencia según SQLite, así que no confunden los ';' dentro de literales,
+    identificadores o comentarios, ni los BEGIN...END de los triggers.
+    """
+    out: List[str] = []
+    start = 0
+    pos = script.find(";")
+    while pos != -1:
+        buf = script[start:pos + 1]
+        if sqlite3.complete_statement(buf):
+            if buf.strip():
+                out.append(buf.strip())
+            start = pos + 1
+        pos = script.find(";", pos + 1)
+    if script[start:].strip():
+        out.append(script[start:].strip())
+    return out
+
+
+def schema_version(conn: Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def bootstrap_sqlite(conn: Connection) -> int:
+    """
+    Lleva el esquema de dominio a SCHEMA_VERSION aplicando solo los pasos pendientes.
+    Si ya está al día, es una única lectura de PRAGMA user_version (sin DDL ni bloqueos).
+    Con una transacción del llamador abierta no migra (lanza RuntimeError): confirmarla
+    aquí publicaría a medias su trabajo. Devuelve la versión final.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    if conn.in_transaction:
+        raise RuntimeError("bootstrap_sqlite: hay una transacción abierta; confírmala o reviértela antes de migrar")
+    # BEGIN IMMEDIATE: otro proceso no puede migrar a la vez; se relee la versión dentro
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(conn)
+        for version, script in MIGRATIONS:
+            if version <= current:
+                continue
+            for stmt in split_sql_statements(script):
+                conn.execute(stmt)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            current = version
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return current
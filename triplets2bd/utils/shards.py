@@ -0,0 +1,239 @@
+# triplets2bd/utils/shards.py
+"""
+Almacenamiento SQLite por usuario (un fichero por usuario).
+
+  data/shards/<id>.sqlite   (id = USER_BASE_ID o nombre del usuario, en slug)
+
+Cada usuario tiene su propio bloqueo de escritura, así que las escrituras de
+usuarios distintos dejan de serializarse sobre un único fichero. ShardManager
+mantiene una caché LRU de conexiones abiertas (con cierre por inactividad), que
+el motor usa en los runs con opts.shards_dir, y ofrece consultas e informes
+sobre todos los shards.
+"""
+from __future__ import annotations
+import glob
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .sqlite_client import SqliteClient
+from .schema_sqlite_bootstrap import bootstrap_sqlite
+from ..triplets2sql_rule_based.helpers import slugify
+from utils.schema_registry import NODES
+
+# Directorio propio: ./data/users guarda la SQLite compartida (demo.sqlite), que no es un shard
+DEFAULT_SHARDS_DIR = "./data/shards"
+
+
+def shard_id(user: str) -> str:
+    """'user_Ana García' / 'persona_ana_garcia' / 'P001' -> id de fichero estable."""
+    u = user.strip()
+    for prefix in ("user_", "persona_"):
+        if u.lower().startswith(prefix):
+            u = u[len(prefix):]
+    return slugify(u) or "default"
+
+
+def shard_path(user: str, shards_dir: str = DEFAULT_SHARDS_DIR) -> str:
+    return os.path.join(shards_dir, f"{shard_id(user)}.sqlite")
+
+
+def list_shards(shards_dir: str = DEFAULT_SHARDS_DIR) -> List[Tuple[str, str]]:
+    """[(id, ruta)] de los shards existentes (se ignoran ficheros auxiliares -wal/-shm)."""
+    out = []
+    for path in sorted(glob.glob(os.path.join(shards_dir, "*.sqlite"))):
+        out.append((os.path.splitext(os.path.basename(path))[0], path))
+    return out
+
+
+class _Shard:
+    __slots__ = ("idle", "leased", "last_used")
+
+    def __init__(self) -> None:
+        self.idle: List[SqliteClient] = []   # conexiones libres (ya con esquema)
+        self.leased = 0                      # conexiones prestadas ahora mismo
+        self.last_used = time.monotonic()
+
+
+class ShardClient:
+    """
+    Conexión prestada por ShardManager (misma interfaz que SqliteClient para el
+    motor): close() la devuelve a la caché en lugar de cerrarla.
+    """
+
+    def __init__(self, manager: "ShardManager", path: str, client: SqliteClient):
+        self._manager = manager
+        self._client: Optional[SqliteClient] = client
+        self.path = path
+        self.conn = client.conn
+
+    def run(self, fn, *, raw: bool = False):
+        return fn(self.conn)
+
+    def executescript(self, sql: str) -> None:
+        self._client.executescript(sql)
+
+    def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            self._manager._release(self.path, client)
+
+
+class ShardManager:
+    """
+    Caché LRU de conexiones por shard.
+      - max_open: nº máximo de shards con conexiones abiertas (se cierra el menos usado)
+      - idle_close_s: cierra las conexiones de shards sin uso durante ese tiempo
+    Cada préstamo es una conexión propia (un run, un hilo); al devolverla queda
+    libre para el siguiente run del mismo usuario, sin reabrir ni re-migrar.
+    """
+
+    def __init__(self, shards_dir: str = DEFAULT_SHARDS_DIR, max_open: int = 32, idle_close_s: float = 300.0):
+        self.shards_dir = shards_dir
+        self.max_open = max_open
+        self.idle_close_s = idle_close_s
+        self._open: "OrderedDict[str, _Shard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, user: str) -> str:
+        return shard_path(user, self.shards_dir)
+
+    def _evict(self, keep: Optional[str] = None) -> List[SqliteClient]:
+        # Llamar con self._lock tomado; solo se cierran shards sin préstamos
+        now = time.monotonic()
+        closing: List[SqliteClient] = []
+        for key in list(self._open):
+            shard = self._open[key]
+            if key == keep or shard.leased:
+                continue
+            if now - shard.last_used > self.idle_close_s or len(self._open) > self.max_open:
+                del self._open[key]
+                closing.extend(shard.idle)
+        return closing
+
+    def client(self, user: str) -> ShardClient:
+        """Conexión del shard de `user` (devolver con close())."""
+        path = self.path_for(user)
+        with self._lock:
+            shard = self._open.get(path)
+            if shard is None:
+                shard = self._open[path] = _Shard()
+            self._open.move_to_end(path)
+            shard.leased += 1
+            shard.last_used = time.monotonic()
+            client = shard.idle.pop() if shard.idle else None
+            closing = self._evict(keep=path)
+        for old in closing:
+            old.close()
+        if client is None:
+            try:
+                client = SqliteClient(path, check_same_thread=False)
+                bootstrap_sqlite(client.conn)
+            except BaseException:
+                self._release(path, None)
+                raise
+        return ShardClient(self, path, client)
+
+    def _release(self, path: str, client: Optional[SqliteClient]) -> None:
+        if client is not None and client.conn.in_transaction:
+            client.conn.rollback()
+        with self._lock:
+            shard = self._open.get(path)
+            if shard is not None:
+                shard.leased -= 1
+                shard.last_used = time.monotonic()
+                if client is not None:
+                    shard.idle.append(client)
+                    client = None
+        if client is not None:
+            client.close()   # el shard se desalojó mientras estaba prestada
+
+    @contextmanager
+    def connection(self, user: str) -> Iterator[ShardClient]:
+        """Cliente del shard de `user` mientras dura el with."""
+        client = self.client(user)
+        try:
+            yield client
+        finally:
+            client.close()
+
+    def close_idle(self) -> int:
+        with self._lock:
+            closing = self._evict()
+        for old in closing:
+            old.close()
+        return len(closing)
+
+    def close_all(self) -> None:
+        with self._lock:
+            closing = [c for shard in self._open.values() for c in shard.idle]
+            for shard in self._open.values():
+                shard.idle = []
+            self._open = OrderedDict((k, v) for k, v in self._open.items() if v.leased)
+        for old in closing:
+            old.close()
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    # ---------------- Consultas entre shards ----------------
+    def query_all(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[str, Tuple[Any, ...]]]:
+        """Ejecuta una consulta de solo lectura en cada shard: [(id_shard, fila)]."""
+        out: List[Tuple[str, Tuple[Any, ...]]] = []
+        for sid, path in list_shards(self.shards_dir):
+            conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError:
+                rows = []  # shard sin esquema de dominio
+            finally:
+                conn.close()
+            out.extend((sid, tuple(r)) for r in rows)
+        return out
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Filas por tabla de dominio en cada shard."""
+        result: Dict[str, Dict[str, int]] = {}
+        for t in NODES:
+            for sid, (n,) in self.query_all(f"SELECT COUNT(*) FROM {t}"):
+                result.setdefault(sid, {})[t] = n
+        return result
+
+    def reports(self, sample_limit: int = 15) -> List[str]:
+        """Genera <shard>_report.txt para cada shard; devuelve las rutas."""
+        from utils.make_sqlite_report import make_content_only_report
+        paths = []
+        for _, path in list_shards(self.shards_dir):
+            out_path = path.replace(".sqlite", "_report.txt")
+            make_content_only_report(path, out_path, sample_limit)
+            paths.append(out_path)
+        return paths
+
+
+# ---------------- Gestor por defecto (por proceso) ----------------
+_MANAGERS: Dict[str, ShardManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+def get_shard_manager(shards_dir: str = DEFAULT_SHARDS_DIR) -> ShardManager:
+    key = os.path.abspath(shards_dir)
+    with _MANAGERS_LOCK:
+        manager = _MANAGERS.get(key)
+        if manager is None:
+            manager = _MANAGERS[key] = ShardManager(shards_dir)
+        return manager
+
+
+def resolve_sqlite_path(
+    sqlite_db_path: str,
+    user: Optional[str],
+    shards_dir: Optional[str],
+) -> str:
+    """Ruta efectiva: el shard del usuario si hay shards_dir, si no la ruta fija."""
+    if shards_dir and user:
+        return shard_path(user, shards_dir)
+    return sqlite_db_path
@@ -0,0 +1,99 @@
+# triplets2bd/utils/sql_executor.py
+"""
+Ejecución de un run SQLite en UNA transacción explícita con SAVEPOINT por sentencia.
+
+  - El plan determinista va por lotes (executemany por tabla), un savepoint por lote.
+  - Los scripts (plantillas, LLM) se dividen con split_sql_statements (no se
+    confunden con ';' dentro de literales) y cada sentencia va en su savepoint:
+    una sentencia LLM mal formada se deshace sola y el resto del run continúa.
+  - Se omiten sentencias vacías / solo comentarios / --SKIP-- y el control de
+    transacción que pueda traer el LLM (BEGIN, COMMIT, ROLLBACK...).
+  - ExecutionReport: recuentos exactos (ejecutadas / fallidas / omitidas) y
+    tiempos por sentencia. Los fallos se registran con utils.sql_log.log_failure
+    DESPUÉS del commit (el log puede ir por otra conexión al mismo fichero).
+"""
+from __future__ import annotations
+import re
+import time
+from typing import Optional, Sequence, Tuple
+
+from .types import ExecutionReport
+from .schema_sqlite_bootstrap import split_sql_statements
+from ..triplets2sql_rule_based.plan import SqlPlan
+
+_TX_CONTROL = re.compile(r"^(begin|commit|end|rollback|savepoint|release)\b", re.IGNORECASE)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+
+EXECUTE_STAGE = "triplet2bd_execute"
+
+
+def is_skippable(stmt: str) -> bool:
+    body = _COMMENTS.sub("", stmt).strip().rstrip(";").strip()
+    return not body or bool(_TX_CONTROL.match(body))
+
+
+def execute_run(
+    conn,
+    plan: Optional[SqlPlan] = None,
+    scripts: Sequence[Tuple[str, str]] = (),
+) -> ExecutionReport:
+    """
+    Aplica `plan` y después cada script (origen, texto) en una sola transacción.
+    Si la conexión ya está dentro de una (p.ej. el escritor único), se usa esa.
+    """
+    report = ExecutionReport()
+    own_tx = not conn.in_transaction
+    if own_tx:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        n = 0
+        if plan:
+            for stmt, rows in plan.batches():
+                n += 1
+                _run_one(conn, report, f"sp_{n}", "det", stmt, rows)
+        for item, (source, script) in enumerate(scripts):
+            for stmt in split_sql_statements(script) if script else ():
+                if is_skippable(stmt):
+                    report.skipped += 1
+                    continue
+                n += 1
+                _run_one(conn, report, f"sp_{n}", source, stmt, None, item)
+        if own_tx:
+            conn.commit()
+    except BaseException:
+        if own_tx and conn.in_transaction:
+            conn.rollback()
+        raise
+    return report
+
+
+def _run_one(conn, report: ExecutionReport, sp: str, source: str, stmt: str, rows, item: Optional[int] = None) -> None:
+    t0 = time.perf_counter()
+    conn.execute(f"SAVEPOINT {sp}")
+    error: Optional[Exception] = None
+    try:
+        if rows is not None:
+            conn.executemany(stmt, rows)
+        else:
+            conn.execute(stmt)
+        conn.execute(f"RELEASE {sp}")
+    except Exception as e:
+        conn.execute(f"ROLLBACK TO {sp}")
+        conn.execute(f"RELEASE {sp}")
+        error = e
+    report.record(source, stmt, len(rows) if rows is not None else 1, (time.perf_counter() - t0) * 1000, error, item)
+
+
+def log_execution_failures(log_conn, report: ExecutionReport, run_id: Optional[str]) -> None:
+    """Un WARN por sentencia fallida (vía log_failure), con el error y su origen."""
+    from utils.sql_log import log_failure
+    for err in report.errors:
+        log_failure(
+            log_conn,
+            run_id=run_id,
+            stage=EXECUTE_STAGE,
+            reason=err["reason"],
+            failed_object=err["sql"],
+            message="Sentencia fallida (revertida con su savepoint)",
+            extra_metadata={"source": err["source"], "rows": err["rows"], "error": err["error"]},
+        )
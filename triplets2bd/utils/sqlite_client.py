@@ -2,7 +2,35 @@
 from __future__ import annotations
 import sqlite3
 from pathlib import Path
-from typing import Iterable, Tuple, Dict, Any
+from typing import Iterable, Tuple, Dict, Any, Optional
+
+from utils.config import settings
+
+# Perfiles de conexión (PRAGMA -> valor)
+SQLITE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    # WAL: lectores no bloquean al escritor; NORMAL: fsync solo en checkpoint
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,          # ms esperando el lock en vez de "database is locked"
+        "cache_size": -65536,          # 64 MiB (negativo = KiB)
+        "mmap_size": 268435456,        # 256 MiB de E/S mapeada en memoria
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def apply_profile(conn: sqlite3.Connection, profile: Optional[str] = None) -> None:
+    """Aplica los PRAGMA del perfil (por defecto, settings.SQLITE_PROFILE)."""
+    name = profile or settings.SQLITE_PROFILE
+    try:
+        pragmas = SQLITE_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Perfil SQLite desconocido: {name!r} (opciones: {sorted(SQLITE_PROFILES)})")
+    for key, value in pragmas.items():
+        conn.execute(f"PRAGMA {key} = {value};")
+
 
 class SqliteClient:
     """
@@ -10,12 +38,19 @@ class SqliteClient:
       - write(query, params)
       - write_many(batch)
       - executescript(sql)
+      - run(fn)
     """
-    def __init__(self, db_path: str | Path = "./kggen.sqlite") -> None:
+    def __init__(
+        self,
+        db_path: str | Path = "./kggen.sqlite",
+        check_same_thread: bool = True,
+        profile: Optional[str] = None,
+    ) -> None:
         self.path = Path(db_path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.path))
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=check_same_thread)
         self.conn.execute("PRAGMA foreign_keys = ON;")
+        apply_profile(self.conn, profile)
         self.conn.text_factory = str
 
     def write(self, query: str, params: Dict[str, Any] | Tuple[Any, ...] | None = None):
@@ -33,6 +68,10 @@ class SqliteClient:
             cur.execute(q, p)
         self.conn.commit()
 
+    def run(self, fn, *, raw: bool = False):
+        """fn(conn) sobre esta conexión (misma firma que WriterClient.run)."""
+        return fn(self.conn)
+
     def executescript(self, sql: str):
         self.conn.executescript(sql)
         self.conn.commit()
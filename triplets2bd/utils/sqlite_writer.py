@@ -0,0 +1,350 @@
+# triplets2bd/utils/sqlite_writer.py
+"""
+Escritor único por fichero SQLite.
+
+Un hilo dedicado con su propia conexión (perfil "production": WAL, synchronous
+NORMAL, busy_timeout...) serializa todas las escrituras de los distintos canales
+(dominio, log) y las agrupa en transacciones: cada trabajo corre en un SAVEPOINT
+dentro de una transacción común que se confirma cuando la cola se vacía o se
+alcanza max_batch. Así los workers concurrentes no compiten por el lock
+("database is locked") ni pagan un fsync por línea de log.
+
+Uso:
+    writer = get_writer(path)
+    writer.call(lambda conn: plan.execute(conn))     # trabajo de dominio (espera)
+    log_conn = writer.channel("log")                  # conexión "falsa" para utils.sql_log
+    log_event(log_conn, level="INFO", message="...")  # se encola; no bloquea
+    log_conn.execute("DELETE ...").rowcount           # leer el resultado sí espera al escritor
+
+Desde el propio hilo escritor (un trabajo que usa un canal) todo se ejecuta en
+línea sobre la transacción en curso: nada espera a la cola que ese hilo vacía.
+"""
+from __future__ import annotations
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .sqlite_client import SqliteClient
+from .schema_sqlite_bootstrap import split_sql_statements
+
+_READ_PREFIXES = ("select", "pragma", "with", "explain")
+
+
+def _is_read(sql: str) -> bool:
+    head = sql.lstrip().lower()
+    return head.startswith(_READ_PREFIXES) and not (head.startswith("pragma") and "=" in head)
+
+
+class _TxConn:
+    """
+    Conexión que ven los trabajos dentro de la transacción agrupada:
+    commit() no hace nada (confirma el escritor) y executescript se ejecuta
+    sentencia a sentencia (sin el COMMIT implícito de sqlite3).
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql: str, rows):
+        return self._conn.executemany(sql, rows)
+
+    def executescript(self, script: str) -> None:
+        for stmt in split_sql_statements(script):
+            self._conn.execute(stmt)
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def commit(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    @property
+    def in_transaction(self) -> bool:
+        return True
+
+
+class _Job:
+    __slots__ = ("fn", "future", "raw")
+
+    def __init__(self, fn: Callable[[Any], Any], raw: bool):
+        self.fn = fn
+        self.future: Future = Future()
+        self.raw = raw
+
+
+class SqliteWriter:
+    def __init__(self, path: str, profile: str = "production", max_batch: int = 256):
+        self.path = path
+        self.max_batch = max_batch
+        self._profile = profile
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{os.path.basename(path)}", daemon=True)
+        self._closed = False
+        self._tx: Optional[_TxConn] = None      # conexión de los trabajos (solo la usa el hilo escritor)
+        self.transactions = 0
+        self.jobs = 0
+        self._thread.start()
+
+    # ---------------- API ----------------
+    def submit(self, fn: Callable[[Any], Any], *, raw: bool = False) -> Future:
+        """
+        Encola fn(conn). Con raw=True fn recibe la conexión real fuera de cualquier
+        transacción (bootstrap/migraciones que gestionan la suya propia).
+        """
+        if threading.current_thread() is self._thread:
+            # Llamada desde un trabajo en curso: en línea (encolarla bloquearía al propio escritor)
+            job = _Job(fn, raw)
+            self._run_job(job, self._tx._conn if raw else self._tx)
+            return job.future
+        if self._closed:
+            raise RuntimeError("SqliteWriter cerrado")
+        job = _Job(fn, raw)
+        self._queue.put(job)
+        return job.future
+
+    def call(self, fn: Callable[[Any], Any], *, raw: bool = False) -> Any:
+        return self.submit(fn, raw=raw).result()
+
+    def channel(self, name: str = "log") -> "WriterChannel":
+        return WriterChannel(self, name)
+
+    def flush(self) -> None:
+        """Espera a que todo lo encolado hasta ahora esté confirmado."""
+        self.call(lambda conn: None)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    # ---------------- Hilo escritor ----------------
+    def _run(self) -> None:
+        client = SqliteClient(self.path, profile=self._profile)
+        conn = client.conn
+        conn.isolation_level = None  # BEGIN/COMMIT explícitos
+        tx = self._tx = _TxConn(conn)
+        stop = False
+        while not stop:
+            job = self._queue.get()
+            if job is None:
+                break
+            if job.raw:
+                self._run_job(job, conn)
+                continue
+
+            batch: List[_Job] = [job]
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                if nxt.raw:
+                    # Se ejecuta tras confirmar el grupo actual
+                    self._commit_batch(conn, tx, batch)
+                    batch = []
+                    self._run_job(nxt, conn)
+                    continue
+                batch.append(nxt)
+            if batch:
+                self._commit_batch(conn, tx, batch)
+        client.close()
+
+    @staticmethod
+    def _run_job(job: _Job, conn) -> None:
+        try:
+            job.future.set_result(job.fn(conn))
+        except BaseException as e:
+            job.future.set_exception(e)
+
+    def _commit_batch(self, conn: sqlite3.Connection, tx: _TxConn, batch: List[_Job]) -> None:
+        results: List[Tuple[_Job, bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    value = job.fn(tx)
+                    conn.execute("RELEASE job")
+                    results.append((job, True, value))
+                except BaseException as e:
+                    # Solo se deshace este trabajo; el resto del grupo sigue
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((job, False, e))
+            conn.execute("COMMIT")
+        except BaseException as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(job, False, e) for job in batch]
+        self.transactions += 1
+        self.jobs += len(batch)
+        for job, ok, value in results:
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+
+class _Rows:
+    """Resultado materializado de una sentencia hecha en el hilo escritor (filas, rowcount, lastrowid)."""
+
+    def __init__(self, rows: List[Tuple[Any, ...]], rowcount: int = -1, lastrowid: Optional[int] = None):
+        self._rows = rows
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+    @classmethod
+    def of(cls, cur) -> "_Rows":
+        return cls(cur.fetchall() if cur.description else [], cur.rowcount, cur.lastrowid)
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        return list(self._rows)
+
+    def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        return self._rows[0] if self._rows else None
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _PendingRows:
+    """
+    Resultado de una escritura encolada: se devuelve enseguida y solo espera al
+    escritor si se lee (rowcount, lastrowid, filas); un error se relanza al leerlo.
+    """
+
+    def __init__(self, future: Future):
+        self.future = future
+
+    def _rows(self) -> _Rows:
+        return self.future.result()
+
+    @property
+    def rowcount(self) -> int:
+        return self._rows().rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._rows().lastrowid
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        return self._rows().fetchall()
+
+    def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        return self._rows().fetchone()
+
+    def __iter__(self):
+        return iter(self._rows())
+
+
+def _report_error(name: str):
+    def _cb(fut: Future) -> None:
+        exc = fut.exception()
+        if exc is not None:
+            sys.stderr.write(f"[sqlite-writer:{name}] {type(exc).__name__}: {exc}\n")
+    return _cb
+
+
+class WriterChannel:
+    """
+    Sustituto de sqlite3.Connection para productores (p. ej. utils.sql_log):
+      - escrituras: se encolan y vuelven enseguida con un resultado diferido
+        (rowcount / lastrowid / error al leerlo; si nadie lo lee, el error va a stderr)
+      - lecturas (SELECT/PRAGMA): esperan al escritor y devuelven las filas
+      - commit(): no hace nada; el escritor agrupa las transacciones
+    """
+
+    def __init__(self, writer: SqliteWriter, name: str):
+        self.writer = writer
+        self.name = name
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        if _is_read(sql):
+            return self.writer.call(lambda c: _Rows.of(c.execute(sql, params)))
+        return self._queued(self.writer.submit(lambda c: _Rows.of(c.execute(sql, params))))
+
+    def executemany(self, sql: str, rows) -> _PendingRows:
+        rows = list(rows)
+        return self._queued(self.writer.submit(lambda c: _Rows.of(c.executemany(sql, rows))))
+
+    def _queued(self, future: Future) -> _PendingRows:
+        future.add_done_callback(_report_error(self.name))
+        return _PendingRows(future)
+
+    def executescript(self, script: str) -> None:
+        self.writer.submit(lambda c: c.executescript(script)).add_done_callback(_report_error(self.name))
+
+    def commit(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class WriterClient:
+    """
+    Misma interfaz que SqliteClient sobre un escritor compartido:
+      - conn: WriterChannel (para utils.sql_log, lecturas de siembra, etc.)
+      - run(fn) / executescript(sql): esperan a que el grupo se confirme
+      - close(): no cierra nada (el escritor vive lo que el proceso)
+    """
+
+    def __init__(self, writer: SqliteWriter, channel: str):
+        self.writer = writer
+        self.conn = writer.channel(channel)
+
+    def run(self, fn: Callable[[Any], Any], *, raw: bool = False) -> Any:
+        return self.writer.call(fn, raw=raw)
+
+    def executescript(self, sql: str) -> None:
+        self.writer.call(lambda c: c.executescript(sql))
+
+    def close(self) -> None:
+        pass
+
+
+# ---------------- Un escritor por fichero (por proceso) ----------------
+_WRITERS: Dict[str, SqliteWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_writer(path: str, profile: str = "production") -> SqliteWriter:
+    key = os.path.abspath(path)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = SqliteWriter(path, profile=profile)
+        return writer
+
+
+def close_writers() -> None:
+    with _WRITERS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for w in writers:
+        w.close()
+
+
+atexit.register(close_writers)
@@ -1,9 +1,9 @@
 # triplets2bd/utils/types.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Tuple, Literal, Optional, Dict, Any
 
 Triplet = Tuple[str, str, str]
-Backend = Literal["sql", "neo4j"]
+Backend = Literal["sql", "neo4j", "memory", "both"]
 Mode = Literal["hybrid", "llm", "deterministic"]
 
 @dataclass
@@ -16,6 +16,20 @@ class EngineOptions:
     generate_report: bool = True
     report_sample_limit: int = 15
     report_path: Optional[str] = None  # si None -> <sqlite-db>_report.txt
+    canonicalize: bool = False         # fusionar alias de entidades antes de compilar
+    skip_known_facts: bool = False     # no reescribir hechos ya guardados (vista de utils.known_facts)
+    facts_user_id: Optional[str] = None  # persona.user_id (persona_<slug>) de la vista de hechos (None = todas)
+    render_sql_script: bool = True     # det_script en texto (solo depuración; se ejecuta el plan SQL/Cypher)
+    memory_graph: str = "default"      # backend="memory": nombre del grafo en proceso (utils.memory_graph)
+    shards_dir: Optional[str] = None   # SQLite por usuario: <shards_dir>/<shard_user>.sqlite (ver utils.shards)
+    shard_user: Optional[str] = None   # clave del shard (usuario de la conversación o USER_BASE_ID)
+    sqlite_writer: bool = False        # escrituras (dominio + log) por el hilo escritor único del fichero
+    llm_deadline_s: Optional[float] = None  # hybrid: plazo del LLM de sobrantes (None = esperar); vencido -> solo log
+    llm_repair_attempts: int = 1       # reintentos de reparación de sentencias LLM fallidas (0 = desactivado)
+    rule_templates: bool = False       # hybrid: sobrantes con plantilla aprendida del LLM no pasan por el LLM (utils.rule_templates; revisar con main_rule_templates)
+    write_behind: bool = False         # encolar el plan y volver; commit agrupado en segundo plano (ver write_behind)
+    neo4j_chunk_rows: int = 1000       # Neo4j: filas por transacción del plan determinista (ver utils.neo4j_writer)
+    neo4j_sessions: int = 1            # Neo4j: sesiones de escritura en paralelo (nodos y después relaciones)
 
 @dataclass
 class EngineResult:
@@ -24,7 +38,106 @@ class EngineResult:
     run_id: Optional[str]
     det_script: str
     llm_script: str
-    executed_statements: int
+    executed_statements: int           # escritas ya (write_behind: 0; lo encolado en extras["write_behind"]["queued"])
     leftovers: List[Tuple[Triplet, str]]
     reset: bool
     extras: Dict[str, Any]  # incluirá extras["report_path"] si se generó
+    failed_statements: int = 0         # SQLite: sentencias revertidas por su savepoint
+    skipped_statements: int = 0        # SQLite: vacías / comentarios / --SKIP-- / control de transacción
+    statement_timings: List[Dict[str, Any]] = field(default_factory=list)  # {source, sql, rows, ms, ok, item}
+    # backend="both": {"sql"|"neo4j": {executed, failed, skipped, det_script, llm_script, error, extras}}
+    backend_results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+@dataclass
+class ExecutionReport:
+    executed: int = 0                  # filas/sentencias aplicadas
+    failed: int = 0
+    skipped: int = 0
+    timings: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def record(
+        self, source: str, sql: str, rows: int, ms: float,
+        error: Optional[Exception] = None, item: Optional[int] = None,
+    ) -> None:
+        """
+        Anota el resultado de una sentencia (o lote de `rows` filas). `item`: posición del
+        script/sentencia en la lista que se ejecutó (None para los lotes del plan).
+        """
+        if error is None:
+            self.executed += rows
+        else:
+            self.failed += rows
+            self.errors.append({
+                "source": source, "sql": sql, "rows": rows,
+                "error": f"{type(error).__name__}: {error}", "reason": type(error).__name__,
+                "item": item,
+            })
+        short = " ".join(sql.split())
+        self.timings.append({
+            "source": source,
+            "sql": short if len(short) <= 200 else short[:200] + "...",
+            "rows": rows,
+            "ms": round(ms, 3),
+            "ok": error is None,
+            "item": item,
+        })
+
+    def merge(self, other: "ExecutionReport") -> "ExecutionReport":
+        self.executed += other.executed
+        self.failed += other.failed
+        self.skipped += other.skipped
+        self.timings.extend(other.timings)
+        self.errors.extend(other.errors)
+        return self
+
+@dataclass
+class BulkImportResult:
+    backend: Backend
+    mode: Mode
+    rows: int                 # tripletas leídas
+    chunks: int
+    executed_statements: int
+    leftovers: int            # solo el recuento (las tripletas quedan en el log)
+    elapsed_s: float
+
+    @property
+    def rows_per_s(self) -> float:
+        return self.rows / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+# ---------------- Lecturas (ver triplets2bd.query) ----------------
+@dataclass(frozen=True)
+class PersonaRef:
+    user_id: str
+    nombre: str
+    edad: Optional[int] = None
+
+@dataclass(frozen=True)
+class RelatedEntity:
+    etype: str                          # sintoma | actividad | medicacion ...
+    key: str                            # sintoma_id / actividad_id / medicacion_id
+    name: str                           # tipo / nombre
+    props: Tuple[Tuple[str, Any], ...]  # (prop, valor) restantes, en el orden del esquema
+
+    def prop(self, name: str) -> Any:
+        return dict(self.props).get(name)
+
+@dataclass(frozen=True)
+class PersonaProfile:
+    persona: PersonaRef
+    related: Tuple[Tuple[str, Tuple[RelatedEntity, ...]], ...]   # (verbo, entidades) por relación
+
+    def get(self, verb: str) -> Tuple[RelatedEntity, ...]:
+        return dict(self.related).get(verb, ())
+
+    @property
+    def medicaciones(self) -> Tuple[RelatedEntity, ...]:
+        return self.get("toma")
+
+    @property
+    def sintomas(self) -> Tuple[RelatedEntity, ...]:
+        return self.get("padece")
+
+    @property
+    def actividades(self) -> Tuple[RelatedEntity, ...]:
+        return self.get("realiza")
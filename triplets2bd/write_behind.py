@@ -0,0 +1,448 @@
+# triplets2bd/write_behind.py
+"""
+Cola de escritura diferida (write-behind) con commit agrupado.
+
+run_triplets_to_bd(opts.write_behind=True) ya no escribe en la ruta crítica:
+encola el plan compilado (SqlPlan / CypherPlan) y los scripts LLM y vuelve.
+Un hilo de volcado junta lo pendiente de muchos runs y lo confirma en UNA
+transacción por destino SQLite cada `flush_interval_s` o al superar
+`max_pending_rows`. Con ráfagas de turnos, el nº de commits deja de crecer con
+el nº de turnos.
+
+  - Aislamiento: en SQLite cada entrada va en su SAVEPOINT y sus sentencias
+    pasan por utils.sql_executor.execute_run (savepoint por lote/sentencia, sin
+    el BEGIN/COMMIT que pueda traer el LLM). En Neo4j cada entrada se escribe
+    por separado (plan en trozos acotados, script sentencia a sentencia). Una
+    sentencia mala no deshace las entradas de otros runs.
+  - Durabilidad: cada entrada se añade a un fichero JSONL (spill) antes de
+    volver; tras cada volcado se reescribe con lo que sigue pendiente. Al
+    arrancar, recover() reencola lo que quedó sin confirmar.
+  - Reintentos: de una entrada solo vuelve a la cola lo que falló (sus
+    sentencias fallidas, o la entrada entera si no llegó a aplicarse); tras
+    max_attempts se aparta a <spill>.failed con el último error.
+  - Escritor único: las entradas encoladas con writer=True (opts.sqlite_writer)
+    se confirman por el hilo escritor del fichero (utils.sqlite_writer).
+  - Reset: discard() saca de la cola y del spill lo pendiente de un destino
+    antes de borrarlo, para que un volcado posterior no resucite datos previos.
+  - Cierre: flush al salir del proceso (atexit) y en close().
+  - Métricas: stats() -> pendientes, commits, retraso (lag) medio y máximo.
+
+Orden: dentro de un destino las entradas se aplican en orden de llegada.
+"""
+from __future__ import annotations
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from .triplets2sql_rule_based.plan import SqlPlan
+from .triplets2cypher_rule_based.plan import CypherPlan
+
+DEFAULT_SPILL_PATH = "./data/write_behind.jsonl"
+
+Target = Tuple[str, str]  # (backend, destino) -> ("sql", ruta) | ("neo4j", uri)
+
+
+@dataclass
+class PendingWrite:
+    backend: str                       # "sql" | "neo4j"
+    target: str                        # ruta SQLite o URI Neo4j ("" = settings)
+    plan: Optional[Dict[str, Any]] = None   # SqlPlan/CypherPlan.to_dict()
+    script: str = ""                   # script LLM (SQL o Cypher)
+    rows: int = 0
+    attempts: int = 0                  # volcados fallidos
+    enqueued_at: float = field(default_factory=time.time)
+    writer: bool = False               # SQLite: confirmar por el escritor único del fichero
+    error: str = ""                    # último error (queda en <spill>.failed)
+
+    def retry(self, error: str, plan: Optional[Dict[str, Any]] = None, script: Optional[str] = None) -> "PendingWrite":
+        """Lo que queda por aplicar tras un volcado fallido (por defecto, la entrada entera)."""
+        return replace(
+            self,
+            plan=self.plan if plan is None else plan or None,
+            script=self.script if script is None else script,
+            attempts=self.attempts + 1,
+            error=error,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(self.__dict__, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PendingWrite":
+        return cls(**json.loads(line))
+
+
+def _applied(item: PendingWrite, retry: Optional[PendingWrite]) -> bool:
+    """La entrada se confirmó entera o en parte (vuelve a la cola con menos de lo que tenía)."""
+    return retry is None or retry.plan != item.plan or retry.script != item.script
+
+
+def _same_target(item: PendingWrite, backend: str, target: Optional[str]) -> bool:
+    if item.backend != backend:
+        return False
+    if target is None:
+        return True
+    if backend == "sql":
+        return os.path.abspath(item.target) == os.path.abspath(target)
+    return item.target == target
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        spill_path: Optional[str] = DEFAULT_SPILL_PATH,
+        flush_interval_s: float = 0.5,
+        max_pending_rows: int = 5000,
+        max_attempts: int = 5,
+        fsync: bool = False,
+    ):
+        self.spill_path = spill_path
+        self.flush_interval_s = flush_interval_s
+        self.max_pending_rows = max_pending_rows
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+
+        self._pending: List[PendingWrite] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # un volcado a la vez
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+        # Métricas
+        self.enqueued = 0
+        self.flushed = 0
+        self.commits = 0
+        self.errors = 0
+        self.dead = 0
+        self.last_error: Optional[str] = None
+        self._lag_sum = 0.0
+        self.max_lag_s = 0.0
+
+        # Conexiones del hilo de volcado (por (propia|escritor, ruta))
+        self._sqlite: Dict[Tuple[str, str], Any] = {}
+
+        if spill_path:
+            os.makedirs(os.path.dirname(os.path.abspath(spill_path)), exist_ok=True)
+            self.recover()
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # ---------------- Productores ----------------
+    def enqueue(self, item: PendingWrite) -> None:
+        with self._lock:
+            self._pending.append(item)
+            self.enqueued += 1
+            if self.spill_path:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write(item.to_json() + "\n")
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            pending_rows = sum(p.rows for p in self._pending)
+        if pending_rows >= self.max_pending_rows:
+            self._wake.set()
+
+    def enqueue_sql(self, sqlite_db_path: str, plan: Optional[SqlPlan], script: str = "", writer: bool = False) -> int:
+        rows = plan.statement_count if plan else 0
+        if rows or script:
+            self.enqueue(PendingWrite("sql", sqlite_db_path, plan.to_dict() if plan else None, script, rows, writer=writer))
+        return rows
+
+    def enqueue_cypher(self, uri: str, plan: Optional[CypherPlan], script: str = "") -> int:
+        rows = plan.row_count if plan else 0
+        if rows or script:
+            self.enqueue(PendingWrite("neo4j", uri or "", plan.to_dict() if plan else None, script, rows))
+        return rows
+
+    def discard(self, backend: str, target: Optional[str] = None) -> int:
+        """
+        Descarta lo pendiente de un destino (de todo el backend si target es None),
+        p. ej. antes de un reset. Espera al volcado en curso. Devuelve entradas descartadas.
+        """
+        with self._flush_lock:
+            with self._lock:
+                keep = [item for item in self._pending if not _same_target(item, backend, target)]
+                n = len(self._pending) - len(keep)
+                if n:
+                    self._pending = keep
+                    self._rewrite_spill()
+        return n
+
+    # ---------------- Durabilidad ----------------
+    def recover(self) -> int:
+        """Reencola lo que quedó en el spill (runs no confirmados de un proceso anterior)."""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+        items: List[PendingWrite] = []
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    items.append(PendingWrite.from_json(line))
+                except (ValueError, TypeError):
+                    continue  # línea truncada por un corte: se descarta
+        with self._lock:
+            self._pending = items + self._pending
+        return len(items)
+
+    def _rewrite_spill(self) -> None:
+        # Llamar con self._lock tomado
+        if not self.spill_path:
+            return
+        tmp = self.spill_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for item in self._pending:
+                f.write(item.to_json() + "\n")
+        os.replace(tmp, self.spill_path)
+
+    def _dead_letter(self, items: List[PendingWrite]) -> None:
+        if not self.spill_path:
+            return
+        with open(self.spill_path + ".failed", "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(item.to_json() + "\n")
+
+    # ---------------- Volcado ----------------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # ya contado en errors; se reintenta en la próxima ventana
+
+    def flush(self) -> int:
+        """Confirma todo lo pendiente (una transacción por destino SQLite). Devuelve entradas confirmadas."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+            if not batch:
+                return 0
+
+            groups: Dict[Target, List[PendingWrite]] = {}
+            for item in batch:
+                groups.setdefault((item.backend, item.target), []).append(item)
+
+            done: List[PendingWrite] = []
+            failed: List[PendingWrite] = []
+            for (backend, target), items in groups.items():
+                try:
+                    if backend == "sql":
+                        rest = self._flush_sqlite(target, items)
+                    else:
+                        rest = self._flush_neo4j(target, items)
+                except Exception as e:
+                    # El destino entero no está disponible (conexión, bloqueo...)
+                    rest = [item.retry(f"{type(e).__name__}: {e}") for item in items]
+                if any(_applied(item, retry) for item, retry in zip(items, rest)):
+                    self.commits += 1   # el volcado confirmó algo en este destino
+                for item, retry in zip(items, rest):
+                    if retry is None:
+                        done.append(item)
+                        continue
+                    self.errors += 1
+                    self.last_error = retry.error
+                    sys.stderr.write(f"[write-behind] {backend}:{target} -> {retry.error}\n")
+                    failed.append(retry)
+
+            now = time.time()
+            for item in done:
+                lag = now - item.enqueued_at
+                self._lag_sum += lag
+                self.max_lag_s = max(self.max_lag_s, lag)
+            self.flushed += len(done)
+
+            # Tras max_attempts fallos la entrada pasa a <spill>.failed (no bloquea la cola)
+            dead = [i for i in failed if i.attempts >= self.max_attempts]
+            if dead:
+                self.dead += len(dead)
+                self._dead_letter(dead)
+                failed = [i for i in failed if i.attempts < self.max_attempts]
+
+            with self._lock:
+                # Los fallidos vuelven delante (mantienen su orden respecto a lo nuevo)
+                self._pending = failed + self._pending
+                self._rewrite_spill()
+            return len(done)
+
+    def _sqlite_client(self, path: str, writer: bool):
+        from .utils.sqlite_client import SqliteClient
+        from .utils.sqlite_writer import WriterClient, get_writer
+        from .utils.schema_sqlite_bootstrap import bootstrap_sqlite
+
+        key = ("writer" if writer else "own", path)
+        client = self._sqlite.get(key)
+        if client is None:
+            if writer:
+                client = WriterClient(get_writer(path), "write_behind")
+            else:
+                client = SqliteClient(path, check_same_thread=False)
+            client.run(bootstrap_sqlite, raw=True)
+            self._sqlite[key] = client
+        return client
+
+    @staticmethod
+    def _apply_sqlite(conn, items: List[PendingWrite]) -> List[Optional[PendingWrite]]:
+        """Cada entrada en su SAVEPOINT dentro de la transacción ya abierta; devuelve lo que queda por reintentar."""
+        from .utils.sql_executor import execute_run
+
+        out: List[Optional[PendingWrite]] = []
+        for item in items:
+            conn.execute("SAVEPOINT wb_item")
+            try:
+                plan = SqlPlan.from_dict(item.plan) if item.plan else None
+                report = execute_run(conn, plan, [("write_behind", item.script)])
+                conn.execute("RELEASE wb_item")
+            except Exception as e:
+                conn.execute("ROLLBACK TO wb_item")
+                conn.execute("RELEASE wb_item")
+                out.append(item.retry(f"{type(e).__name__}: {e}"))
+                continue
+            if not report.errors:
+                out.append(None)
+                continue
+            # Se reintenta solo lo fallido: el plan (idempotente) si falló un lote, y las sentencias del script
+            det_failed = any(e["source"] == "det" for e in report.errors)
+            out.append(item.retry(
+                report.errors[-1]["error"],
+                plan=item.plan if det_failed else {},
+                script="\n".join(e["sql"] for e in report.errors if e["source"] != "det"),
+            ))
+        return out
+
+    def _flush_sqlite(self, path: str, items: List[PendingWrite]) -> List[Optional[PendingWrite]]:
+        from .utils.sqlite_writer import WriterClient
+        from .utils.known_facts import invalidate_known_facts
+        from .utils.query_cache import invalidate_queries, sql_target, sql_plan_tags
+
+        client = self._sqlite_client(path, any(item.writer for item in items))
+        if isinstance(client, WriterClient):
+            # El escritor ya abre la transacción (y el SAVEPOINT del trabajo)
+            rest = client.run(lambda conn: self._apply_sqlite(conn, items))
+        else:
+            conn = client.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rest = self._apply_sqlite(conn, items)
+                conn.commit()
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+
+        invalidate_known_facts(path)
+        if any(item.script for item in items):
+            invalidate_queries(sql_target(path))
+        else:
+            tags = set()
+            for item in items:
+                tags |= sql_plan_tags(SqlPlan.from_dict(item.plan) if item.plan else None)
+            invalidate_queries(sql_target(path), tags)
+        return rest
+
+    def _flush_neo4j(self, uri: str, items: List[PendingWrite]) -> List[Optional[PendingWrite]]:
+        from .utils.neo4j_client import Neo4jClient
+        from .utils.neo4j_writer import write_plan, execute_statements, split_cypher_statements
+        from .utils.query_cache import invalidate_queries, neo4j_target, cypher_plan_tags
+        from .utils.schema_bootstrap import ensure_schema
+
+        db = Neo4jClient(uri=uri or None, shared=True)
+        ensure_schema(db)
+        rest: List[Optional[PendingWrite]] = []
+        tags = set()
+        scripts = False
+        for item in items:
+            # Cada entrada por separado: plan en trozos acotados, script sentencia a sentencia
+            plan = CypherPlan.from_dict(item.plan) if item.plan else None
+            try:
+                if plan:
+                    write_plan(db, plan)
+            except Exception as e:
+                rest.append(item.retry(f"{type(e).__name__}: {e}"))
+                continue
+            tags |= cypher_plan_tags(plan)
+            stmts = split_cypher_statements(item.script) if item.script else []
+            scripts = scripts or bool(stmts)
+            report = execute_statements(db, [("write_behind", s) for s in stmts])
+            if report.errors:
+                rest.append(item.retry(
+                    report.errors[-1]["error"],
+                    plan={},
+                    script=";\n".join(e["sql"] for e in report.errors) + ";",
+                ))
+            else:
+                rest.append(None)
+        invalidate_queries(neo4j_target(db.key[0]), None if scripts else tags)
+        return rest
+
+    # ---------------- Métricas / cierre ----------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = list(self._pending)
+        now = time.time()
+        return {
+            "pending": len(pending),
+            "pending_rows": sum(p.rows for p in pending),
+            "oldest_pending_s": (now - min(p.enqueued_at for p in pending)) if pending else 0.0,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "commits": self.commits,
+            "errors": self.errors,
+            "dead": self.dead,
+            "mean_lag_s": self._lag_sum / self.flushed if self.flushed else 0.0,
+            "max_lag_s": self.max_lag_s,
+        }
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        for client in self._sqlite.values():
+            client.close()
+        self._sqlite.clear()
+
+
+# ---------------- Cola por proceso ----------------
+_QUEUE: Optional[WriteBehindQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_write_behind(**kwargs: Any) -> WriteBehindQueue:
+    """Cola compartida del proceso (los kwargs solo se usan al crearla)."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = WriteBehindQueue(**kwargs)
+        return _QUEUE
+
+
+def discard_pending(backend: str, target: Optional[str] = None) -> int:
+    """
+    WriteBehindQueue.discard sobre la cola del proceso. Si aún no existe pero hay spill
+    de un proceso anterior, se crea (y se recupera) para filtrarlo igualmente.
+    """
+    if _QUEUE is None and not os.path.exists(DEFAULT_SPILL_PATH):
+        return 0
+    return get_write_behind().discard(backend, target)
+
+
+def close_write_behind() -> None:
+    global _QUEUE
+    with _QUEUE_LOCK:
+        q, _QUEUE = _QUEUE, None
+    if q is not None:
+        q.close()
+
+
+atexit.register(close_write_behind)
@@ -22,4 +22,7 @@ class Settings:
 
     USER_BASE_ID: str = os.getenv("USER_BASE_ID", "P001")
 
+    # Perfil de conexión SQLite: "default" (journal clásico) o "production" (WAL + pragmas)
+    SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "default")
+
 settings = Settings()
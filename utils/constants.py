@@ -1,6 +1,7 @@
 # triplets2bd/triplets2cypher_rule_based/constants.py
+from utils.schema_registry import RELATIONS
 
-ALLOWED_REL = {"padece", "toma", "realiza"}
+ALLOWED_REL = set(RELATIONS)
 ALLOWED_PROP = {"categoria", "frecuencia", "gravedad", "inicio", "fecha_inicio", "fin", "se toma", "periodicidad"}
 
 PROPERTY_VERBS = {
@@ -13,10 +14,6 @@ PROPERTY_VERBS = {
     "periodicidad": ("periodicidad", "node"),
 }
 
-RELATION_VERBS = {
-    "toma": "TOMA",
-    "padece": "PADECE",
-    "realiza": "REALIZA"
-}
+RELATION_VERBS = {verb: r.rel_type for verb, r in RELATIONS.items()}
 
 _DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y")
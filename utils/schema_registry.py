@@ -0,0 +1,169 @@
+# utils/schema_registry.py
+"""
+Registro declarativo del esquema de dominio (nodos y relaciones).
+
+Es la única fuente de verdad del esquema: de aquí se precalculan, una vez al
+importar, las tablas de consulta y plantillas de sentencias de ambos backends
+(ENTITY_TABLES / RELATION_TABLES del plan SQL, NODE_LABELS / REL_TARGETS del
+plan Cypher, CONSTRAINTS / INDEXES de Neo4j, el modelo compacto del Collector)
+y las líneas de esquema de los prompts del LLM.
+
+Un tipo de nodo nuevo es una entrada en NODES (y su relación en RELATIONS);
+en SQLite además necesita su paso de migración (ver schema_sqlite_bootstrap).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PropSpec:
+    name: str
+    sql_type: str = "TEXT"
+    min_value: Optional[int] = None      # CHECK (prop >= min_value)
+    allowed: Tuple[str, ...] = ()        # CHECK (prop IN (...))
+
+    def sql_check(self) -> Optional[str]:
+        if self.min_value is not None:
+            return f"{self.name} >= {self.min_value}"
+        if self.allowed:
+            # Literales SQL entre comillas: el texto va tal cual a los prompts (SYSTEM_REPAIR_SQL)
+            values = ",".join("'" + v.replace("'", "''") + "'" for v in self.allowed)
+            return f"{self.name} IN ({values})"
+        return None
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    etype: str                    # persona | sintoma | ... (también nombre de la tabla SQL)
+    label: str                    # etiqueta Neo4j
+    key: str                      # id natural (UNIQUE en ambos backends)
+    name_prop: str                # prop obligatoria que nombra la entidad
+    props: Tuple[PropSpec, ...]   # columnas tras la clave, en orden (incluye name_prop)
+
+    @property
+    def prop_names(self) -> Tuple[str, ...]:
+        return tuple(p.name for p in self.props)
+
+    @property
+    def updatable_props(self) -> Tuple[str, ...]:
+        """Props que un MATCH posterior puede actualizar (todas salvo el nombre)."""
+        return tuple(p.name for p in self.props if p.name != self.name_prop)
+
+
+@dataclass(frozen=True)
+class RelationSpec:
+    verb: str                     # verbo de la tripleta (persona, verbo, destino)
+    rel_type: str                 # tipo de relación Neo4j
+    table: str                    # tabla N:M en SQLite
+    target: str                   # etype destino (el origen es siempre persona)
+    alias: str                    # alias SQL del destino en el INSERT ... SELECT
+    copy: Tuple[Tuple[str, str], ...] = ()   # (columna de la relación, columna del destino) copiadas al insertar
+
+
+NODES: Dict[str, NodeSpec] = {
+    "persona": NodeSpec(
+        "persona", "Persona", "user_id", "nombre",
+        (PropSpec("nombre"), PropSpec("edad", "INTEGER", min_value=0)),
+    ),
+    "sintoma": NodeSpec(
+        "sintoma", "Sintoma", "sintoma_id", "tipo",
+        (
+            PropSpec("tipo"),
+            PropSpec("fecha_inicio"),
+            PropSpec("fecha_fin"),
+            PropSpec("categoria", allowed=(
+                "motor", "cognitivo", "afectivo", "sueno", "autonomico",
+                "habla_voz", "deglucion", "dolor_fatiga", "otros_no_motor",
+            )),
+            PropSpec("frecuencia"),
+            PropSpec("gravedad", allowed=("leve", "moderada", "grave")),
+        ),
+    ),
+    "actividad": NodeSpec(
+        "actividad", "Actividad", "actividad_id", "nombre",
+        (PropSpec("nombre"), PropSpec("categoria"), PropSpec("frecuencia")),
+    ),
+    "medicacion": NodeSpec(
+        "medicacion", "Medicacion", "medicacion_id", "tipo",
+        (PropSpec("tipo"), PropSpec("periodicidad")),
+    ),
+}
+
+RELATIONS: Dict[str, RelationSpec] = {
+    "toma": RelationSpec("toma", "TOMA", "persona_toma_medicacion", "medicacion", "m", (("pauta", "periodicidad"),)),
+    "padece": RelationSpec("padece", "PADECE", "persona_padece_sintoma", "sintoma", "s", (("desde", "fecha_inicio"),)),
+    "realiza": RelationSpec("realiza", "REALIZA", "persona_realiza_actividad", "actividad", "a"),
+}
+
+# ---------------- Tablas derivadas ----------------
+# Tipos que pueden ser sujeto de una propiedad (orden de búsqueda en la pasada de props)
+PROPERTY_SUBJECTS: Tuple[str, ...] = tuple(e for e in NODES if e != "persona")
+
+# prop -> primer tipo (de PROPERTY_SUBJECTS) que la tiene: tipo supuesto de una prop aislada
+PROP_OWNER: Dict[str, str] = {}
+for _etype in PROPERTY_SUBJECTS:
+    for _p in NODES[_etype].prop_names:
+        PROP_OWNER.setdefault(_p, _etype)
+
+
+def relation_by_type(rel_type: str) -> RelationSpec:
+    return next(r for r in RELATIONS.values() if r.rel_type == rel_type)
+
+
+# ---------------- Líneas de esquema para prompts ----------------
+def prompt_nodes_cypher(annotated: bool = False) -> str:
+    """Persona{user_id, nombre, edad} | ... (annotated: UNIQUE / NOT NULL)."""
+    parts = []
+    for n in NODES.values():
+        if annotated:
+            fields = [f"{n.key} UNIQUE"] + [f"{p} NOT NULL" if p == n.name_prop else p for p in n.prop_names]
+        else:
+            fields = [n.key, *n.prop_names]
+        parts.append(f"{n.label}{{{', '.join(fields)}}}")
+    return " | ".join(parts)
+
+
+def prompt_relations_cypher() -> str:
+    return " | ".join(f"(Persona)-[:{r.rel_type}]->({NODES[r.target].label})" for r in RELATIONS.values())
+
+
+def prompt_tables_sql(annotated: bool = False) -> str:
+    """persona(id, user_id, nombre, edad) | ... (annotated: restricciones de columna)."""
+    parts = []
+    for n in NODES.values():
+        if annotated:
+            fields = [f"{n.key} UNIQUE"]
+            for p in n.props:
+                check = p.sql_check()
+                fields.append(check if check else f"{p.name} NOT NULL" if p.name == n.name_prop else p.name)
+        else:
+            fields = ["id", n.key, *n.prop_names]
+        parts.append(f"{n.etype}({', '.join(fields)})")
+    return " | ".join(parts)
+
+
+def prompt_relation_tables_sql(with_copies: bool = False) -> str:
+    parts = []
+    for r in RELATIONS.values():
+        cols = ["persona_id", NODES[r.target].key] + ([c for c, _ in r.copy] if with_copies else [])
+        parts.append(f"{r.table}({', '.join(cols)})")
+    return " | ".join(parts)
+
+
+def prompt_id_rules(capitalized_prefix: bool = False) -> str:
+    lines = []
+    for n in NODES.values():
+        prefix = n.label if capitalized_prefix else n.etype
+        lines.append(f"   - {n.label}: '{prefix}_' + slug({n.name_prop}) → {n.key}\n")
+    return "".join(lines)
+
+
+def prompt_required_props() -> str:
+    return "".join(f"   - {n.label}.{n.name_prop} (obligatorio)\n" for n in NODES.values())
+
+
+def prompt_allowed_relations_sql() -> str:
+    return "".join(
+        f" - (Persona)-[{r.verb}]->({NODES[r.target].label}) → {r.table}\n" for r in RELATIONS.values()
+    )
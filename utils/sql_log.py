@@ -24,6 +24,9 @@ def ensure_sql_log_table(conn) -> None:
     Esquema objetivo (sin 'triplet'):
       id, ts, level, message, reason, run_id, stage, metadata
     """
+    # Conexiones que lo recuerdan (p.ej. canales del escritor único): una sola vez
+    if getattr(conn, "log_table_ready", False):
+        return
     # 1) Crear si no existe (con el esquema objetivo)
     conn.executescript(
         """
@@ -46,6 +49,10 @@ def ensure_sql_log_table(conn) -> None:
     # 3) Migración destructiva pero segura: si existe 'triplet', reconstruir la tabla sin esa columna
     _migrate_remove_triplet_if_present(conn)
     conn.commit()
+    try:
+        conn.log_table_ready = True
+    except AttributeError:
+        pass  # sqlite3.Connection no admite atributos
 
 def _table_columns(conn, table: str) -> Dict[str, Dict[str, Any]]:
     cur = conn.execute(f"PRAGMA table_info({table});")